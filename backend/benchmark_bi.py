@@ -0,0 +1,202 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+import pandas as pd
+
+from bi_service import BIService, PARQUET_AVAILABLE
+from bi_synthetic import SyntheticReportGenerator
+from bi_store_service import BIStoreService
+from bi_employee_service import BIEmployeeService
+
+# Benchmark da Base BI em relatórios sintéticos (bi_synthetic.py): leitura (_read_file_safe),
+# mesclagem (merge_reports), preenchimento (_fill_missing_values) e exportação.
+# Cada execução acrescenta uma linha em --output (JSONL) e compara com a última de mesma escala.
+# Uso: python benchmark_bi.py [--people 300] [--months 3] [--repeat 3] [--modes vectorized,streaming]
+
+DEFAULT_OUTPUT = os.path.join('cache', 'bi', 'benchmarks.jsonl')
+MERGE_MODES = ('rows', 'vectorized', 'streaming')
+
+
+class _BenchmarkConfig:
+    """Configuração fixa: pasta raiz gerada, sem sidecars nem base analítica (só o trabalho medido)"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def load_config(self):
+        return {'pontomais': {'destine': self.root},
+                'bi': {'parquet_sidecars': False, 'analytics_store': False}}
+
+
+def _service(root: str) -> BIService:
+    service = BIService(_BenchmarkConfig(root))
+    # Sem cache de dialetos em disco: cada repetição detecta os dialetos de novo
+    service.dialect_service.persist = False
+    # Dimensão de colaboradores da pasta gerada, fora da base analítica real
+    service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+    return service
+
+
+def _timed(func, repeat: int) -> tuple:
+    """(resultado da última execução, tempos em segundos)"""
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def _summary(times: list, rows: int) -> dict:
+    best = min(times)
+    return {
+        'seconds': round(best, 4),
+        'median_seconds': round(statistics.median(times), 4),
+        'rows': rows,
+        'rows_per_second': round(rows / best) if best else None,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmarks(root: str, files: list, modes: list, repeat: int) -> dict:
+    """Executa as etapas medidas e retorna {etapa: resumo}"""
+    results = {}
+
+    def read_all():
+        service = _service(root)
+        return sum(len(service._read_file_safe(f['full_path'])) for f in files)
+
+    rows, times = _timed(read_all, repeat)
+    results['read'] = _summary(times, rows)
+
+    merged = None
+    for mode in modes:
+        service = _service(root)
+        df, times = _timed(lambda: service.merge_reports(files, vectorized=(mode == 'vectorized'), use_cache=False,
+                                                         streaming=(mode == 'streaming')), repeat)
+        results[f'merge_{mode}'] = _summary(times, len(df))
+        results[f'merge_{mode}']['peak_rss_mb'] = service.last_merge_stats.get('peak_rss_mb')
+        merged = df if merged is None else merged
+
+    # Preenchimento isolado sobre a consolidação (antes do preenchimento) das mesmas pastas
+    service = _service(root)
+    files_by_folder = {}
+    for file_info in files:
+        files_by_folder.setdefault(file_info['folder'], []).append(file_info)
+    run = service._new_run()
+    run.employee_resolver = service._load_employee_resolver(use_cache=False)
+    consolidated = service._merge_in_memory(files_by_folder, run, use_cache=False, vectorized=True)
+    _, times = _timed(lambda: service._fill_missing_values(consolidated.copy()), repeat)
+    results['fill_missing_values'] = _summary(times, len(consolidated))
+
+    if merged is not None and not merged.empty:
+        formats = ['csv', 'csv.gz'] + (['parquet'] if PARQUET_AVAILABLE else [])
+        for export_format in formats:
+            # Nome diferente a cada repetição: sem o atalho de "conteúdo igual"
+            counter = iter(range(repeat))
+            _, times = _timed(lambda: service.export_merged_data(
+                merged, f"bench_{next(counter)}_{export_format.replace('.', '_')}", export_format), repeat)
+            results[f'export_{export_format}'] = _summary(times, len(merged))
+    return results
+
+
+def _previous_record(output: str, scale: dict):
+    """Última execução gravada com a mesma escala (None se não houver)"""
+    if not os.path.exists(output):
+        return None
+    previous = None
+    with open(output, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('scale') == scale:
+                previous = record
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da Base BI com relatórios sintéticos")
+    parser.add_argument('--people', type=int, default=300, help="Colaboradores gerados")
+    parser.add_argument('--months', type=int, default=3, help="Meses por relatório com período")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="Repetições por etapa (vale a melhor)")
+    parser.add_argument('--modes', default='vectorized,streaming', help=f"Modos de mesclagem ({', '.join(MERGE_MODES)})")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Arquivo JSONL com o histórico de resultados")
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help="Aumento de tempo tolerado sobre a última execução de mesma escala (0.25 = 25%%)")
+    parser.add_argument('--keep', help="Gera os relatórios nesta pasta e não apaga ao final")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    invalid = [mode for mode in modes if mode not in MERGE_MODES]
+    if invalid:
+        parser.error(f"modos inválidos: {', '.join(invalid)}")
+
+    root = args.keep or tempfile.mkdtemp(prefix="bi_bench_")
+    scale = {'people': args.people, 'months': args.months, 'seed': args.seed}
+    try:
+        start = time.perf_counter()
+        files = SyntheticReportGenerator(people=args.people, months=args.months, seed=args.seed).generate(root)
+        size_mb = sum(os.path.getsize(f['full_path']) for f in files) / (1024 * 1024)
+        print(f"Gerados {len(files)} arquivos ({size_mb:.1f} MB) em {time.perf_counter() - start:.1f}s: {root}")
+
+        results = run_benchmarks(root, files, modes, args.repeat)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'cpus': os.cpu_count(),
+        'scale': scale,
+        'files': len(files),
+        'input_mb': round(size_mb, 2),
+        'results': results,
+    }
+    previous = _previous_record(args.output, scale)
+
+    regressions = []
+    for stage, result in results.items():
+        line = f"{stage:24s} {result['seconds']:8.3f}s  {result['rows']:9d} linhas"
+        before = (previous or {}).get('results', {}).get(stage)
+        if before and before.get('seconds'):
+            change = result['seconds'] / before['seconds'] - 1
+            line += f"  {change:+.0%} vs {previous.get('commit') or previous['timestamp']}"
+            if change > args.max_regression:
+                regressions.append(stage)
+                line += "  ✗ REGRESSÃO"
+        print(line)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    print(f"Resultados gravados em {args.output}")
+
+    if regressions:
+        print(f"Etapas mais lentas que o tolerado: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
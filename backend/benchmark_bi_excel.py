@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+
+import pandas as pd
+from openpyxl import Workbook
+
+from excel_reader import read_excel_fast, CALAMINE_AVAILABLE
+
+# Compara a leitura de planilhas .xlsx do PontoMais (preâmbulo "Relatório" + tabela):
+# pd.read_excel duas vezes (leitura antiga) contra a leitura única de excel_reader.py
+# com openpyxl somente leitura e, se instalado, python-calamine.
+# Uso: python benchmark_bi_excel.py [--files 3] [--rows 60000]
+
+NOMES = ['ANA SILVA', 'BRUNO COSTA', 'CARLA SOUZA', 'DIEGO LIMA', 'ELISA ROCHA', 'FABIO NUNES']
+EQUIPES = ['ULTRA POPULAR CODO C02', 'MEGA POPULAR BELEM ICOARACI', 'HIPER FARMA ACAILANDIA C03']
+MOTIVOS = ['FOLGA/ESCALA', 'FOLGA/BANCO DE HORAS', 'ATESTADO', 'FALTA INJUSTIFICADA']
+HEADER = ['Nome', 'CPF', 'Equipe', 'Data', 'Motivo', 'Horas']
+PREAMBLE_ROWS = 4
+
+
+def generate_workbooks(folder: str, files: int, rows: int, seed: int = 0) -> list:
+    """Gera relatórios de Faltas em .xlsx com o preâmbulo do PontoMais antes do cabeçalho"""
+    rng = random.Random(seed)
+    paths = []
+    for idx in range(files):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Relatório")
+        sheet.append(["Relatório de Faltas"])
+        sheet.append(["Por SISTEMA BOT em 08/11/2025"])
+        sheet.append([f"Arquivo {idx + 1}"])
+        sheet.append([])
+        sheet.append(HEADER)
+        start = datetime(2025, 1, 1)
+        for _ in range(rows):
+            sheet.append([
+                f"{rng.choice(NOMES)} {rng.randint(1, 500)}",
+                f"{rng.randint(0, 99999999999):011d}",
+                rng.choice(EQUIPES),
+                start + timedelta(days=rng.randint(0, 364)),
+                rng.choice(MOTIVOS),
+                round(rng.uniform(0, 12), 2),
+            ])
+        path = os.path.join(folder, f"Pontomais_-_Faltas_{idx:03d}.xlsx")
+        workbook.save(path)
+        paths.append(path)
+    return paths
+
+
+def read_legacy(path: str) -> pd.DataFrame:
+    """Leitura anterior: lê a planilha inteira para achar o cabeçalho e lê de novo com skiprows"""
+    df = pd.read_excel(path)
+    if 'Relatório' in str(df.columns[0]):
+        for i in range(min(5, len(df))):
+            if 'NOME' in [str(value).upper() for value in df.iloc[i]]:
+                return pd.read_excel(path, skiprows=i + 1)
+    return df
+
+
+def measure(reader, paths: list) -> tuple:
+    frames = []
+    start = time.perf_counter()
+    for path in paths:
+        frames.append(reader(path))
+    return frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura de planilhas .xlsx da Base BI")
+    parser.add_argument('--files', type=int, default=3, help="Quantidade de planilhas")
+    parser.add_argument('--rows', type=int, default=60000, help="Linhas por planilha")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bi_excel_bench_")
+    try:
+        print(f"Gerando {args.files} planilhas com {args.rows} linhas em {folder}...")
+        paths = generate_workbooks(folder, args.files, args.rows)
+        size_mb = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+        print(f"{size_mb:.1f} MB no total")
+
+        legacy, legacy_elapsed = measure(read_legacy, paths)
+        rows = sum(len(df) for df in legacy)
+        print(f"{'read_excel x2':14s} {legacy_elapsed:7.2f}s  {size_mb / legacy_elapsed:6.1f} MB/s  "
+              f"{rows / legacy_elapsed:10.0f} linhas/s")
+
+        engines = ['openpyxl'] + (['calamine'] if CALAMINE_AVAILABLE else [])
+        failed = False
+        for engine in engines:
+            fast, elapsed = measure(lambda path: read_excel_fast(path, engine=engine), paths)
+            same = all(a.equals(b) for a, b in zip(legacy, fast))
+            failed = failed or not same
+            print(f"{engine:14s} {elapsed:7.2f}s  {size_mb / elapsed:6.1f} MB/s  {rows / elapsed:10.0f} linhas/s  "
+                  f"x{legacy_elapsed / elapsed:4.1f}  {'✓ mesmo resultado' if same else '✗ RESULTADO DIFERENTE'}")
+        if not CALAMINE_AVAILABLE:
+            print("python-calamine não instalado: leitura única usa openpyxl")
+        if failed:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
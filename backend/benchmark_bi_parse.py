@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import calendar
+
+from bi_service import BIService, BIRun, BI_DEFAULT_SETTINGS, PARSE_MODES
+
+# Compara a leitura serial e paralela da etapa 1 da Base BI (uma pasta com relatórios mensais gerados).
+# Uso: python benchmark_bi_parse.py [--files 120] [--rows 8000] [--workers 0]
+
+NOMES = ['ANA SILVA', 'BRUNO COSTA', 'CARLA SOUZA', 'DIEGO LIMA', 'ELISA ROCHA', 'FABIO NUNES']
+EQUIPES = ['ULTRA POPULAR CODO C02', 'MEGA POPULAR BELEM ICOARACI', 'HIPER FARMA ACAILANDIA C03']
+MOTIVOS = ['FOLGA/ESCALA', 'FOLGA/BANCO DE HORAS', 'ATESTADO', 'FALTA INJUSTIFICADA']
+DIAS = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+
+def generate_monthly_files(folder: str, files: int, rows: int, seed: int = 0):
+    """Gera relatórios de Faltas mensais no formato do PontoMais (preâmbulo + CSV)"""
+    rng = random.Random(seed)
+    year, month = 2017, 1
+    for _ in range(files):
+        last_day = calendar.monthrange(year, month)[1]
+        period = f"01.{month:02d}.{year}_-_{last_day:02d}.{month:02d}.{year}"
+        filename = f"Pontomais_-_Faltas_({period})_-_{rng.getrandbits(32):08x}.csv"
+
+        lines = [
+            "Relatório de Faltas",
+            "Por SISTEMA BOT em 08/11/2025",
+            f"De 01/{month:02d}/{year} até {last_day:02d}/{month:02d}/{year}",
+            "",
+            "Nome,Equipe,Data,Motivo",
+        ]
+        for _ in range(rows):
+            day = rng.randint(1, last_day)
+            lines.append(
+                f'{rng.choice(NOMES)} {rng.randint(1, 500)},{rng.choice(EQUIPES)},'
+                f'"{rng.choice(DIAS)}, {day:02d}/{month:02d}/{year}",{rng.choice(MOTIVOS)}'
+            )
+        with open(os.path.join(folder, filename), 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+def run(mode: str, folder: str, file_infos: list, workers: int) -> tuple:
+    service = BIService()
+    run = BIRun(dict(BI_DEFAULT_SETTINGS, parse_mode=mode, parse_workers=workers, parquet_sidecars=False))
+    # Sem cache de dialetos em disco: todos os modos detectam o dialeto de cada arquivo
+    service.dialect_service.persist = False
+    with service._parse_pool(run):
+        start = time.perf_counter()
+        df = service._merge_files_from_same_folder(file_infos, 'Faltas', run, use_cache=False)
+        elapsed = time.perf_counter() - start
+    return df, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura paralela da Base BI")
+    parser.add_argument('--files', type=int, default=120, help="Quantidade de relatórios mensais")
+    parser.add_argument('--rows', type=int, default=8000, help="Linhas por relatório")
+    parser.add_argument('--workers', type=int, default=0, help="Workers (0 = número de núcleos)")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bi_parse_bench_")
+    try:
+        print(f"Gerando {args.files} arquivos com {args.rows} linhas em {folder}...")
+        generate_monthly_files(folder, args.files, args.rows)
+        file_infos = [
+            {'filename': name, 'full_path': os.path.join(folder, name), 'folder': 'Faltas'}
+            for name in sorted(os.listdir(folder))
+        ]
+
+        baseline = None
+        for mode in PARSE_MODES:
+            df, elapsed = run(mode, folder, file_infos, args.workers)
+            if baseline is None:
+                baseline = (df, elapsed)
+            same = df.equals(baseline[0])
+            print(f"{mode:8s} {elapsed:7.2f}s  {args.files / elapsed:7.1f} arquivos/s  "
+                  f"{len(df) / elapsed:10.0f} linhas/s  x{baseline[1] / elapsed:4.1f}  "
+                  f"{'✓ mesmo resultado' if same else '✗ RESULTADO DIFERENTE'}")
+            if not same:
+                sys.exit(1)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+from typing import Dict, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Coluna de texto vira categórica quando tem no máximo esta fração de valores distintos
+CATEGORY_MAX_RATIO = 0.5
+# Colunas muito pequenas não compensam o custo das categorias
+CATEGORY_MIN_ROWS = 50
+
+# Identificadores ficam em texto mesmo quando só têm dígitos (zeros à esquerda)
+IDENTIFIER_COLUMNS = ('CPF', 'PIS', 'Matrícula', 'Matricula')
+
+# Data do PontoMais ("Sex, 03/10/2025") ou simples ("03/10/2025")
+DATE_VALUE_PATTERN = r'^(?:(?:Seg|Ter|Qua|Qui|Sex|Sáb|Sab|Dom),?\s*)?(\d{2}/\d{2}/\d{4})$'
+
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _only_strings(series: pd.Series) -> bool:
+    """Todos os valores não nulos são str (colunas com tipos misturados ficam como estão)"""
+    values = series.dropna()
+    return values.map(type).eq(str).all() if len(values) else False
+
+
+def _to_category(series: pd.Series) -> pd.Series:
+    if len(series) < CATEGORY_MIN_ROWS or not _only_strings(series):
+        return series
+    if series.nunique(dropna=True) > len(series) * CATEGORY_MAX_RATIO:
+        return series
+    return series.astype('category')
+
+
+def _downcast_integer(series: pd.Series) -> pd.Series:
+    """int64 sem nulos -> menor inteiro que comporta os valores (mesmo texto no CSV)"""
+    if pd.api.types.is_integer_dtype(series.dtype) and not isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        return pd.to_numeric(series, downcast='integer')
+    return series
+
+
+def _to_datetime(series: pd.Series) -> pd.Series:
+    """Datas do PontoMais em texto -> datetime64 (None se a coluna não for só de datas)"""
+    values = series.dropna()
+    if not len(values) or not _only_strings(series):
+        return None
+    extracted = series.astype(object).where(series.notna()).str.extract(DATE_VALUE_PATTERN, expand=False)
+    if extracted[series.notna()].isna().any():
+        return None
+    return pd.to_datetime(extracted, format='%d/%m/%Y', errors='coerce')
+
+
+def _to_nullable_number(series: pd.Series) -> pd.Series:
+    """Texto numérico ou float com valores inteiros -> Int64/Float64 (None se não for numérica)"""
+    if _is_text(series):
+        if not _only_strings(series):
+            return None
+        stripped = series.str.strip()
+        if stripped.str.match(r'^0\d', na=False).any():
+            return None
+        numbers = pd.to_numeric(stripped, errors='coerce')
+        if numbers[series.notna()].isna().any():
+            return None
+    elif pd.api.types.is_float_dtype(series.dtype):
+        numbers = series
+    else:
+        return None
+
+    if not numbers.notna().any():
+        return None
+    non_null = numbers.dropna()
+    if (non_null == np.floor(non_null)).all() and non_null.abs().max() < 2 ** 53:
+        return numbers.astype('Int64')
+    return numbers.astype('Float64')
+
+
+def optimize_dtypes(df: pd.DataFrame, typed: bool = False) -> pd.DataFrame:
+    """
+    Reduz a memória do frame trocando os tipos das colunas
+
+    Sem typed, as trocas não mudam o texto exportado: textos repetidos viram
+    categóricos e inteiros sem nulos usam o menor tipo inteiro.
+    Com typed, também converte datas do PontoMais para datetime64 e números
+    (em texto ou float) para Int64/Float64 anuláveis; o CSV passa a ter
+    datas ISO e inteiros sem ".0".
+    """
+    columns = {}
+    for pos, col in enumerate(df.columns):
+        series = df.iloc[:, pos]
+        if typed and str(col).split('_')[0] not in IDENTIFIER_COLUMNS:
+            converted = _to_datetime(series) if _is_text(series) else None
+            if converted is None:
+                converted = _to_nullable_number(series)
+            if converted is not None:
+                columns[pos] = converted
+                continue
+        if _is_text(series):
+            columns[pos] = _to_category(series)
+        else:
+            columns[pos] = _downcast_integer(series)
+
+    optimized = pd.concat([columns[pos] for pos in range(len(df.columns))], axis=1) if len(df.columns) else df.copy()
+    optimized.columns = df.columns
+    optimized.index = df.index
+    return optimized
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Memória do frame em MB, contando o conteúdo dos objetos Python"""
+    return round(float(df.memory_usage(deep=True, index=True).sum()) / (1024 * 1024), 2)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict:
+    """Memória antes/depois da otimização e quantas colunas mudaram de tipo"""
+    before_mb = memory_mb(before)
+    after_mb = memory_mb(after)
+    changed = {
+        str(col): str(after[col].dtype)
+        for col in after.columns
+        if not after.columns.duplicated().any() and str(before[col].dtype) != str(after[col].dtype)
+    }
+    return {
+        'before_mb': before_mb,
+        'after_mb': after_mb,
+        'saved_pct': round(100 * (1 - after_mb / before_mb), 1) if before_mb else 0.0,
+        'changed_columns': changed,
+    }
+
+
+def optimize_with_report(df: pd.DataFrame, label: str, typed: bool = False) -> Tuple[pd.DataFrame, Dict]:
+    """optimize_dtypes + memory_report, com log do resultado"""
+    optimized = optimize_dtypes(df, typed=typed)
+    report = memory_report(df, optimized)
+    logger.info(f"Tipos otimizados ({label}): {report['before_mb']} MB -> {report['after_mb']} MB "
+                f"({report['saved_pct']}% menos, {len(report['changed_columns'])} colunas)")
+    return optimized, report
@@ -0,0 +1,315 @@
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+from bi_store_service import BIStoreService, TEAM_CODE_PATTERN, normalize_names
+
+logger = logging.getLogger(__name__)
+
+# Relatórios que alimentam a dimensão (tipo de relatório -> fonte)
+EMPLOYEE_SOURCES = {
+    'Colaboradores': 'colaboradores',
+    'Consulta trainee': 'trainee',
+}
+
+# A exportação de trainees traz o nome ("apelido") cortado em 30 caracteres
+TRAINEE_NAME_LENGTH = 30
+
+
+def normalize_teams(teams: pd.Series) -> pd.Series:
+    """Equipe para comparação: sem o código da loja, maiúsculas e sem acentos"""
+    text = normalize_names(teams)
+    text = text.str.replace(TEAM_CODE_PATTERN, '', regex=True).str.strip()
+    return text.where(text != '')
+
+
+@lru_cache(maxsize=65536)
+def _normalize_one(value: str, team: bool = False) -> Optional[str]:
+    normalized = (normalize_teams if team else normalize_names)(pd.Series([value], dtype=object)).iloc[0]
+    return normalized if isinstance(normalized, str) and normalized else None
+
+
+class EmployeeResolver:
+    """
+    Resolução nome (+ equipe) -> CPF em memória, por dicionário
+
+    Nome normalizado com um único CPF na dimensão resolve direto; homônimos
+    só resolvem pela equipe (atual ou do histórico) de um deles.
+    """
+
+    def __init__(self, names: pd.DataFrame, teams: pd.DataFrame):
+        cpfs_per_name = names.groupby('nome_norm')['cpf'].nunique()
+        unique_names = names[names['nome_norm'].isin(cpfs_per_name.index[cpfs_per_name == 1])]
+        self.by_name = dict(zip(unique_names['nome_norm'], unique_names['cpf']))
+
+        pairs = names.merge(teams, on='cpf')[['nome_norm', 'equipe_norm', 'cpf']].drop_duplicates()
+        counts = pairs.groupby(['nome_norm', 'equipe_norm'])['cpf'].transform('size')
+        pairs = pairs[counts == 1]
+        self.by_name_team = dict(zip(zip(pairs['nome_norm'], pairs['equipe_norm']), pairs['cpf']))
+
+    def __len__(self):
+        return len(self.by_name) + len(self.by_name_team)
+
+    def resolve(self, nomes: pd.Series, equipes: Optional[pd.Series] = None) -> pd.Series:
+        """CPF de cada linha (NaN quando o nome não resolve); normaliza só os pares distintos"""
+        nome_codes, nome_uniques = pd.factorize(nomes.astype(object).fillna('').to_numpy())
+        if equipes is not None:
+            equipe_codes, equipe_uniques = pd.factorize(equipes.astype(object).fillna('').to_numpy())
+        else:
+            equipe_codes, equipe_uniques = np.zeros(len(nomes), dtype=np.intp), np.array([''], dtype=object)
+        if len(nome_uniques) == 0:
+            return pd.Series(np.nan, index=nomes.index, dtype=object)
+
+        # Par (nome, equipe) como um inteiro: cada nome e cada equipe distintos são normalizados uma vez
+        width = len(equipe_uniques)
+        codes, pairs = pd.factorize(nome_codes.astype(np.int64) * width + equipe_codes)
+        nome_norm = normalize_names(pd.Series(nome_uniques, dtype=object).replace('', np.nan)).to_numpy()
+        equipe_norm = normalize_teams(pd.Series(equipe_uniques, dtype=object).replace('', np.nan)).to_numpy()
+        resolved = [
+            self.by_name_team.get((nome_norm[pair // width], equipe_norm[pair % width]))
+            or self.by_name.get(nome_norm[pair // width])
+            for pair in pairs
+        ]
+        values = np.array(resolved, dtype=object)[codes]
+        return pd.Series(values, index=nomes.index, dtype=object).where(pd.notna(values), np.nan)
+
+    def resolve_one(self, nome, equipe=None) -> Optional[str]:
+        """Versão de resolve para uma linha (consolidação linha a linha)"""
+        if pd.isna(nome) or str(nome).strip() == '':
+            return None
+        nome_norm = _normalize_one(str(nome))
+        equipe_norm = _normalize_one(str(equipe), team=True) if not pd.isna(equipe) and str(equipe).strip() else None
+        return self.by_name_team.get((nome_norm, equipe_norm)) or self.by_name.get(nome_norm)
+
+
+class BIEmployeeService:
+    """
+    Dimensão de colaboradores persistente na base analítica
+
+    dim_colaborador guarda CPF, nome, equipe atual e login de cada colaborador
+    do relatório Colaboradores; dim_colaborador_nome os nomes normalizados de
+    cada CPF (inclusive os nomes cortados da exportação de trainees) e
+    dim_colaborador_equipe o histórico de equipes (primeira e última vez em
+    que cada equipe apareceu). Nomes e equipes antigos não são apagados: quem
+    muda de equipe continua resolvendo para o mesmo CPF. dim_fontes guarda a
+    versão (tamanho/mtime) de cada arquivo lido.
+    """
+
+    def __init__(self, store: BIStoreService):
+        self.store = store
+        self._resolver = None
+
+    def _ensure_tables(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dim_colaborador (
+                cpf TEXT PRIMARY KEY,
+                nome TEXT,
+                nome_norm TEXT,
+                equipe TEXT,
+                login TEXT,
+                atualizado_em TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dim_colaborador_nome (
+                nome_norm TEXT NOT NULL,
+                cpf TEXT NOT NULL,
+                fonte TEXT NOT NULL,
+                PRIMARY KEY (nome_norm, cpf)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dim_colaborador_equipe (
+                cpf TEXT NOT NULL,
+                equipe_norm TEXT NOT NULL,
+                equipe TEXT,
+                fonte TEXT NOT NULL,
+                primeira_vez TEXT NOT NULL,
+                ultima_vez TEXT NOT NULL,
+                PRIMARY KEY (cpf, equipe_norm)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dim_fontes (
+                caminho TEXT PRIMARY KEY,
+                fonte TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                linhas INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_dim_colaborador_nome_norm ON dim_colaborador (nome_norm)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_dim_colaborador_login ON dim_colaborador (login)")
+
+    def _colaboradores(self, df: pd.DataFrame) -> pd.DataFrame:
+        """CPF, nome, equipe e login (e-mail antes do @) das linhas com CPF válido"""
+        columns = {str(col).strip().lower(): col for col in df.columns}
+        if 'cpf' not in columns or 'nome' not in columns:
+            return pd.DataFrame(columns=['cpf', 'nome', 'nome_norm', 'equipe', 'equipe_norm', 'login'])
+        cpf = df[columns['cpf']].astype(object).where(df[columns['cpf']].notna())
+        cpf = cpf.where(cpf.isna(), cpf.astype(str).str.replace(r'\D', '', regex=True))
+        rows = pd.DataFrame({
+            'cpf': cpf.where(cpf.str.len() == 11),
+            'nome': df[columns['nome']].astype(object).where(df[columns['nome']].notna()),
+            'equipe': df[columns['equipe']].astype(object).where(df[columns['equipe']].notna())
+                      if 'equipe' in columns else None,
+        })
+        if 'e-mail' in columns:
+            email = df[columns['e-mail']].astype(object).where(df[columns['e-mail']].notna())
+            rows['login'] = email.where(email.isna(), email.astype(str).str.split('@').str[0].str.strip())
+        else:
+            rows['login'] = None
+        rows['nome'] = rows['nome'].where(rows['nome'].isna(), rows['nome'].astype(str).str.strip())
+        rows['nome_norm'] = normalize_names(rows['nome'])
+        rows['equipe_norm'] = normalize_teams(rows['equipe'])
+        return rows.dropna(subset=['cpf', 'nome_norm']).drop_duplicates('cpf', keep='last')
+
+    def _trainees(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Login, nome normalizado e equipe das linhas da exportação de trainees (sem CPF; ver _link_trainees)"""
+        columns = {str(col).strip().lower(): col for col in df.columns}
+        if 'apelido' not in columns:
+            return pd.DataFrame(columns=['login', 'nome_norm', 'equipe', 'equipe_norm'])
+        login = df[columns['login']].astype(object) if 'login' in columns else pd.Series(None, index=df.index)
+        rows = pd.DataFrame({
+            'login': login.where(login.isna(), login.astype(str).str.strip()),
+            'nome_norm': normalize_names(df[columns['apelido']]),
+            'equipe': df[columns['loja cadastro']].astype(object) if 'loja cadastro' in columns else None,
+        })
+        rows['equipe_norm'] = normalize_teams(rows['equipe'])
+        return rows
+
+    def _link_trainees(self, conn, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Trainees ligados a um CPF pelo login (e-mail do cadastro) ou, sem login
+        conhecido, pelo nome cortado em TRAINEE_NAME_LENGTH caracteres
+        """
+        known = pd.DataFrame(conn.execute("SELECT cpf, nome_norm, login FROM dim_colaborador").fetchall(),
+                             columns=['cpf', 'nome_norm', 'login'])
+        by_login = known.dropna(subset=['login']).drop_duplicates('login', keep=False).set_index('login')['cpf']
+        short = known['nome_norm'].str[:TRAINEE_NAME_LENGTH].str.strip()
+        by_short_name = known.assign(nome_norm=short).drop_duplicates('nome_norm', keep=False).set_index('nome_norm')['cpf']
+        rows = rows.assign(cpf=rows['login'].map(by_login).fillna(rows['nome_norm'].map(by_short_name)))
+        return rows.dropna(subset=['cpf', 'nome_norm'])
+
+    def refresh(self, sources: List[Dict], load: Callable[[str], pd.DataFrame]) -> Dict:
+        """
+        Incorpora arquivos de Colaboradores/trainees novos ou alterados à dimensão
+
+        Os arquivos são lidos antes de travar a base analítica: o lock e a transação
+        ficam só com a gravação (atualizações da base e consultas não esperam a leitura).
+
+        Args:
+            sources: Arquivos do catálogo ({'full_path', 'report_type', 'size_bytes', 'mtime_ns'});
+                     Colaboradores vêm antes dos trainees, que dependem dos logins do cadastro
+            load: Lê um arquivo e retorna o frame do relatório
+
+        Returns:
+            Dict com updated (arquivos lidos), skipped e employees
+        """
+        sources = sorted((s for s in sources if s.get('report_type') in EMPLOYEE_SOURCES),
+                         key=lambda s: list(EMPLOYEE_SOURCES).index(s['report_type']))
+        stats = {'updated': 0, 'skipped': 0, 'employees': 0}
+        with self.store.transaction() as conn:
+            self._ensure_tables(conn)
+            known = {path: (size, mtime) for path, size, mtime
+                     in conn.execute("SELECT caminho, tamanho, mtime_ns FROM dim_fontes")}
+
+        parsed = []
+        for source in sources:
+            path = os.path.abspath(source['full_path'])
+            if known.get(path) == (source['size_bytes'], source['mtime_ns']):
+                stats['skipped'] += 1
+                continue
+            try:
+                df = load(source['full_path'])
+            except Exception as e:
+                logger.error(f"Dimensão de colaboradores: erro ao ler {path}: {str(e)}")
+                continue
+            kind = EMPLOYEE_SOURCES[source['report_type']]
+            rows = self._colaboradores(df) if kind == 'colaboradores' else self._trainees(df)
+            parsed.append((path, source, kind, rows))
+
+        with self.store.lock, self.store.transaction() as conn:
+            for path, source, kind, rows in parsed:
+                seen = datetime.fromtimestamp(source['mtime_ns'] / 1e9).strftime('%Y-%m-%d')
+                if kind == 'trainee':
+                    # Logins do cadastro já gravado (inclusive o desta atualização)
+                    rows = self._link_trainees(conn, rows)
+                self._upsert(conn, rows, kind, seen)
+                conn.execute("INSERT OR REPLACE INTO dim_fontes (caminho, fonte, tamanho, mtime_ns, linhas) "
+                             "VALUES (?, ?, ?, ?, ?)", (path, kind, source['size_bytes'], source['mtime_ns'], len(rows)))
+                stats['updated'] += 1
+            stats['employees'] = conn.execute("SELECT COUNT(*) FROM dim_colaborador").fetchone()[0]
+
+        if stats['updated']:
+            self._resolver = None
+            logger.info(f"Dimensão de colaboradores: {stats['updated']} arquivo(s) incorporado(s), "
+                        f"{stats['employees']} colaborador(es)")
+        return stats
+
+    def _upsert(self, conn, rows: pd.DataFrame, kind: str, seen: str):
+        values = rows.astype(object).where(rows.notna(), None)
+        if kind == 'colaboradores':
+            updated_at = datetime.now().isoformat(timespec='seconds')
+            conn.executemany(
+                "INSERT INTO dim_colaborador (cpf, nome, nome_norm, equipe, login, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(cpf) DO UPDATE SET nome = excluded.nome, "
+                "nome_norm = excluded.nome_norm, equipe = excluded.equipe, "
+                "login = COALESCE(excluded.login, dim_colaborador.login), atualizado_em = excluded.atualizado_em",
+                ((r.cpf, r.nome, r.nome_norm, r.equipe, r.login, updated_at) for r in values.itertuples(index=False)))
+        conn.executemany("INSERT OR IGNORE INTO dim_colaborador_nome (nome_norm, cpf, fonte) VALUES (?, ?, ?)",
+                         ((r.nome_norm, r.cpf, kind) for r in values.itertuples(index=False)))
+        conn.executemany(
+            "INSERT INTO dim_colaborador_equipe (cpf, equipe_norm, equipe, fonte, primeira_vez, ultima_vez) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(cpf, equipe_norm) DO UPDATE SET "
+            "primeira_vez = MIN(primeira_vez, excluded.primeira_vez), ultima_vez = MAX(ultima_vez, excluded.ultima_vez)",
+            ((r.cpf, r.equipe_norm, r.equipe, kind, seen, seen)
+             for r in values.itertuples(index=False) if r.equipe_norm is not None))
+
+    def resolver(self) -> EmployeeResolver:
+        """Dicionários de resolução, recarregados só quando a dimensão muda"""
+        if self._resolver is None:
+            with self.store.transaction() as conn:
+                self._ensure_tables(conn)
+                names = pd.DataFrame(conn.execute("SELECT nome_norm, cpf FROM dim_colaborador_nome").fetchall(),
+                                     columns=['nome_norm', 'cpf'])
+                teams = pd.DataFrame(conn.execute("SELECT cpf, equipe_norm FROM dim_colaborador_equipe").fetchall(),
+                                     columns=['cpf', 'equipe_norm'])
+            self._resolver = EmployeeResolver(names, teams)
+        return self._resolver
+
+    def lookup(self, cpf: Optional[str] = None, nome: Optional[str] = None) -> List[Dict]:
+        """
+        Colaboradores da dimensão por CPF ou nome (normalizado), com nomes e histórico de equipes
+
+        Raises:
+            ValueError: Nem CPF nem nome informados
+        """
+        if not cpf and not nome:
+            raise ValueError("Informe cpf ou nome")
+        with self.store.transaction() as conn:
+            self._ensure_tables(conn)
+            if cpf:
+                cpfs = [''.join(filter(str.isdigit, cpf))]
+            else:
+                cpfs = [row[0] for row in conn.execute("SELECT DISTINCT cpf FROM dim_colaborador_nome "
+                                                       "WHERE nome_norm = ? ORDER BY cpf", (_normalize_one(nome),))]
+            result = []
+            for value in cpfs:
+                row = conn.execute("SELECT cpf, nome, equipe, login, atualizado_em FROM dim_colaborador "
+                                   "WHERE cpf = ?", (value,)).fetchone()
+                if not row:
+                    continue
+                names = [name for (name,) in conn.execute(
+                    "SELECT nome_norm FROM dim_colaborador_nome WHERE cpf = ? ORDER BY nome_norm", (value,))]
+                teams = [dict(zip(('equipe', 'fonte', 'primeira_vez', 'ultima_vez'), team)) for team in conn.execute(
+                    "SELECT equipe, fonte, primeira_vez, ultima_vez FROM dim_colaborador_equipe "
+                    "WHERE cpf = ? ORDER BY ultima_vez, primeira_vez, equipe", (value,))]
+                result.append({**dict(zip(('cpf', 'nome', 'equipe', 'login', 'atualizado_em'), row)),
+                               'nomes': names, 'equipes': teams})
+        return result
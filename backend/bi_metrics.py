@@ -0,0 +1,269 @@
+import os
+import sys
+import time
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _windows_memory_counters():
+    """PROCESS_MEMORY_COUNTERS do processo atual via psapi (sem dependências extras)"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Memória residente atual do processo (None se não for possível medir)"""
+    try:
+        if sys.platform == 'win32':
+            counters = _windows_memory_counters()
+            return counters.WorkingSetSize if counters else None
+        if os.path.exists('/proc/self/statm'):
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        pass
+    return None
+
+
+def process_peak_rss_bytes() -> Optional[int]:
+    """Pico de memória residente desde o início do processo"""
+    try:
+        if sys.platform == 'win32':
+            counters = _windows_memory_counters()
+            return counters.PeakWorkingSetSize if counters else None
+        if resource:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux informa em KB, macOS em bytes
+            return peak if sys.platform == 'darwin' else peak * 1024
+    except Exception:
+        pass
+    return None
+
+
+class PeakRSSMonitor:
+    """
+    Mede o pico de memória residente durante um trecho de código
+
+    O pico do processo (ru_maxrss/PeakWorkingSetSize) inclui mesclagens
+    anteriores do servidor, então uma thread amostra a memória atual.
+
+    Uso:
+        with PeakRSSMonitor() as monitor:
+            ...
+        monitor.peak_mb
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start_bytes = None
+        self.peak_bytes = None
+        self._stop = threading.Event()
+        self._thread = None
+        # Janelas abertas por etapa (token -> pico dentro da janela)
+        self._windows = {}
+        self._next_window = 0
+        self._lock = threading.Lock()
+
+    def _sample(self):
+        rss = current_rss_bytes()
+        if rss is None:
+            return
+        with self._lock:
+            if self.peak_bytes is None or rss > self.peak_bytes:
+                self.peak_bytes = rss
+            for token, peak in self._windows.items():
+                if peak is None or rss > peak:
+                    self._windows[token] = rss
+
+    def open_window(self) -> int:
+        """Começa a medir o pico de uma etapa (amostrado também fora do monitor ativo, na abertura e no fechamento)"""
+        with self._lock:
+            token = self._next_window
+            self._next_window += 1
+            self._windows[token] = None
+        self._sample()
+        return token
+
+    def close_window(self, token: int) -> Optional[int]:
+        """Pico de memória residente (bytes) do processo desde open_window"""
+        self._sample()
+        with self._lock:
+            return self._windows.pop(token, None)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start_bytes = current_rss_bytes()
+        self._sample()
+        if self.start_bytes is None:
+            # Sem medição da memória atual: usa o pico do processo no fim
+            logger.info("Memória atual indisponível, usando pico do processo")
+        else:
+            self._thread = threading.Thread(target=self._run, name='bi-rss-monitor', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._sample()
+        if self.peak_bytes is None:
+            self.peak_bytes = process_peak_rss_bytes()
+        return False
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        return round(self.peak_bytes / (1024 * 1024), 1) if self.peak_bytes is not None else None
+
+    @property
+    def start_mb(self) -> Optional[float]:
+        return round(self.start_bytes / (1024 * 1024), 1) if self.start_bytes is not None else None
+
+
+# Etapas instrumentadas da mesclagem, na ordem em que acontecem
+# (dialeto faz parte de leitura_arquivo; chaves faz parte de consolidacao)
+MERGE_METRIC_STAGES = ('dimensao_colaboradores', 'esquema_pasta', 'dialeto', 'leitura_arquivo', 'concat_pasta',
+                       'otimizacao_tipos', 'chaves', 'consolidacao', 'preenchimento', 'ordenacao_colunas', 'exportacao')
+
+
+def _round_mb(value: Optional[int]) -> Optional[float]:
+    return round(value / (1024 * 1024), 1) if value is not None else None
+
+
+class StageMetrics:
+    """
+    Tempo, CPU, linhas e memória por etapa de uma mesclagem da Base BI
+
+    Cada etapa registra wall time, tempo de CPU da thread que a executou,
+    linhas de entrada/saída e o pico de memória residente do processo durante
+    a etapa (amostrado pelo PeakRSSMonitor da mesclagem). Etapas podem rodar
+    em paralelo (leitura em threads); os registros são protegidos por lock.
+
+    Uso:
+        metrics = StageMetrics('vectorized', monitor)
+        with metrics.stage('concat_pasta', folder='Faltas', rows_in=10) as record:
+            ...
+            record['rows_out'] = len(df)
+        metrics.summary()
+    """
+
+    def __init__(self, mode: Optional[str] = None, monitor: Optional[PeakRSSMonitor] = None):
+        self.mode = mode
+        self.monitor = monitor or PeakRSSMonitor()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+        self._wall_start = time.perf_counter()
+        self.wall_s = None
+
+    @contextmanager
+    def stage(self, name: str, folder: Optional[str] = None, file: Optional[str] = None,
+              rows_in: Optional[int] = None):
+        """Mede o bloco como uma etapa; o registro pode receber rows_out e outros campos"""
+        record = {'stage': name, 'folder': folder, 'file': file, 'rows_in': rows_in, 'rows_out': None}
+        window = self.monitor.open_window()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = round(time.perf_counter() - wall, 4)
+            record['cpu_s'] = round(time.thread_time() - cpu, 4)
+            record['peak_rss_mb'] = _round_mb(self.monitor.close_window(window))
+            self.add(record)
+
+    def add(self, record: Dict):
+        """Registra uma etapa medida fora do processo (ex: leitura no pool de processos)"""
+        record.setdefault('peak_rss_mb', None)
+        with self._lock:
+            self.records.append(record)
+
+    def finish(self):
+        """Fecha o tempo total da mesclagem"""
+        self.wall_s = round(time.perf_counter() - self._wall_start, 4)
+
+    def _aggregate(self, records: List[Dict]) -> Dict[str, Dict]:
+        totals = {}
+        for record in records:
+            total = totals.setdefault(record['stage'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                        'rows_in': None, 'rows_out': None, 'peak_rss_mb': None})
+            total['calls'] += 1
+            total['wall_s'] += record.get('wall_s') or 0.0
+            total['cpu_s'] += record.get('cpu_s') or 0.0
+            for key in ('rows_in', 'rows_out'):
+                if record.get(key) is not None:
+                    total[key] = (total[key] or 0) + record[key]
+            peak = record.get('peak_rss_mb')
+            if peak is not None and (total['peak_rss_mb'] is None or peak > total['peak_rss_mb']):
+                total['peak_rss_mb'] = peak
+        order = {name: pos for pos, name in enumerate(MERGE_METRIC_STAGES)}
+        return {
+            name: {**total, 'wall_s': round(total['wall_s'], 4), 'cpu_s': round(total['cpu_s'], 4)}
+            for name, total in sorted(totals.items(), key=lambda item: order.get(item[0], len(order)))
+        }
+
+    def summary(self, detail: bool = True) -> Dict:
+        """
+        Totais por etapa; com detail, também por pasta e por arquivo
+
+        Returns:
+            Dict com mode, started_at, wall_s, stages e (detail) folders e files
+        """
+        with self._lock:
+            records = list(self.records)
+        result = {
+            'mode': self.mode,
+            'started_at': self.started_at,
+            'wall_s': self.wall_s,
+            'stages': self._aggregate(records),
+        }
+        if detail:
+            folders = {}
+            for record in records:
+                if record.get('folder'):
+                    folders.setdefault(record['folder'], []).append(record)
+            result['folders'] = {folder: self._aggregate(items) for folder, items in folders.items()}
+            dialect_s = {}
+            for record in records:
+                if record['stage'] == 'dialeto':
+                    dialect_s[record['file']] = dialect_s.get(record['file'], 0.0) + record['wall_s']
+            result['files'] = [
+                {**{key: value for key, value in record.items() if key not in ('stage', 'rows_in')},
+                 'dialect_s': round(dialect_s[record['file']], 4) if record['file'] in dialect_s else None}
+                for record in records if record['stage'] == 'leitura_arquivo'
+            ]
+        return result
@@ -0,0 +1,308 @@
+import re
+import json
+import base64
+from typing import Dict, List, Optional
+import logging
+
+import pandas as pd
+
+from bi_store_service import BIStoreService, normalize_names, quote_identifier
+
+logger = logging.getLogger(__name__)
+
+BASE_TABLE = "base_consolidada"
+# Colunas calculadas na carga (filtros indexados); não fazem parte da base exportada
+BASE_HELPER_COLUMNS = ['_cpf', '_nome_norm', '_equipe_norm', '_data']
+BASE_INDEXES = [('_cpf',), ('_nome_norm',), ('_equipe_norm',), ('_data',)]
+
+QUERY_DEFAULT_LIMIT = 100
+QUERY_MAX_LIMIT = 5000
+# Métricas de agregação: count, count_distinct:<coluna>, min:<coluna>, max:<coluna>, sum:<coluna>, avg:<coluna>
+METRIC_PATTERN = re.compile(r'^(count|count_distinct|min|max|sum|avg)(?::(.+))?$')
+BASE_DATE_PATTERN = r'(\d{2})/(\d{2})/(\d{4})'
+# Data já em ISO (coluna datetime64 de bi.typed_columns exportada como texto)
+BASE_ISO_DATE_PATTERN = r'(\d{4})-(\d{2})-(\d{2})'
+
+
+class BIQueryService:
+    """
+    Consultas à base consolidada sem baixar o CSV inteiro
+
+    A base é carregada na tabela base_consolidada da base analítica (SQLite)
+    a cada mesclagem, com colunas auxiliares indexadas (CPF, nome e equipe
+    normalizados, data ISO). Filtros, projeção, ordenação, agregação e
+    paginação por cursor (keyset) rodam no SQLite.
+    """
+
+    def __init__(self, store: BIStoreService):
+        self.store = store
+
+    def _meta(self, conn, key: str) -> Optional[str]:
+        conn.execute("CREATE TABLE IF NOT EXISTS base_meta (chave TEXT PRIMARY KEY, valor TEXT)")
+        row = conn.execute("SELECT valor FROM base_meta WHERE chave = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def loaded_signature(self) -> Optional[str]:
+        """Assinatura (arquivo, tamanho, mtime) da base carregada, ou None se não houver base"""
+        with self.store.transaction() as conn:
+            return self._meta(conn, 'assinatura')
+
+    def load_base(self, df: pd.DataFrame, signature: str) -> bool:
+        """
+        Substitui a tabela base_consolidada (nada muda se a assinatura for a mesma)
+
+        Args:
+            df: Base consolidada (como exportada)
+            signature: Identifica a versão da base (ex: caminho:tamanho:mtime do arquivo exportado)
+
+        Returns:
+            True se a tabela foi recarregada
+        """
+        if self.loaded_signature() == signature:
+            return False
+
+        values = df.reset_index(drop=True).astype(object)
+        values = values.where(values.notna(), None)
+        # Textos como no CSV exportado (datas, números e categorias)
+        for col in values.columns:
+            non_null = values[col].notna()
+            values.loc[non_null, col] = df[col].reset_index(drop=True)[non_null].astype(str)
+
+        helpers = pd.DataFrame(index=values.index)
+        cpf = values['CPF'] if 'CPF' in values.columns else pd.Series(None, index=values.index, dtype=object)
+        helpers['_cpf'] = cpf.where(cpf.isna(), cpf.astype(str).str.replace(r'\D', '', regex=True))
+        helpers['_nome_norm'] = normalize_names(values['Nome']) if 'Nome' in values.columns else None
+        helpers['_equipe_norm'] = normalize_names(values['Equipe']) if 'Equipe' in values.columns else None
+        if 'Data' in values.columns:
+            helpers['_data'] = self._iso_dates(df['Data'].reset_index(drop=True))
+        else:
+            helpers['_data'] = None
+        values = pd.concat([values, helpers.astype(object).where(helpers.notna(), None)], axis=1)
+
+        columns = list(values.columns)
+        column_defs = ', '.join(f"{quote_identifier(col)} TEXT" for col in columns)
+        insert = (f"INSERT INTO {BASE_TABLE} ({', '.join(quote_identifier(c) for c in columns)}) "
+                  f"VALUES ({', '.join('?' for _ in columns)})")
+
+        with self.store.lock, self.store.transaction() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {BASE_TABLE}")
+            conn.execute(f"CREATE TABLE {BASE_TABLE} (_id INTEGER PRIMARY KEY, {column_defs})")
+            conn.executemany(insert, values.itertuples(index=False, name=None))
+            # Índices depois da carga (mais rápido que atualizar a cada linha)
+            for index_cols in BASE_INDEXES:
+                conn.execute(f"CREATE INDEX idx_{BASE_TABLE}{'_'.join(index_cols)} ON {BASE_TABLE} ({', '.join(index_cols)})")
+            self._meta(conn, 'assinatura')
+            conn.execute("INSERT OR REPLACE INTO base_meta (chave, valor) VALUES ('assinatura', ?)", (signature,))
+        logger.info(f"Base consolidada carregada para consultas: {len(values)} registros")
+        return True
+
+    def _iso_dates(self, series: pd.Series) -> pd.Series:
+        """Data ISO (AAAA-MM-DD) de cada linha: datetime64, "Dia, DD/MM/AAAA" ou texto ISO; None se não houver"""
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            iso = series.dt.strftime('%Y-%m-%d')
+        else:
+            text = series.astype(object).where(series.notna(), None).astype(str)
+            parts = text.str.extract(BASE_DATE_PATTERN)
+            iso = parts[2] + '-' + parts[1] + '-' + parts[0]
+            parts = text.str.extract(BASE_ISO_DATE_PATTERN)
+            iso = iso.where(iso.notna(), parts[0] + '-' + parts[1] + '-' + parts[2])
+        return iso.astype(object).where(iso.notna(), None)
+
+    def columns(self) -> List[str]:
+        """Colunas da base carregada (sem as auxiliares)"""
+        with self.store.transaction() as conn:
+            names = [row[1] for row in conn.execute(f"PRAGMA table_info({BASE_TABLE})")]
+        return [name for name in names if name != '_id' and name not in BASE_HELPER_COLUMNS]
+
+    def _encode_cursor(self, values: list) -> str:
+        return base64.urlsafe_b64encode(json.dumps(values, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+    def _decode_cursor(self, cursor: str) -> list:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except Exception:
+            raise ValueError("Cursor inválido")
+        if not isinstance(values, list) or len(values) != 2:
+            raise ValueError("Cursor inválido")
+        return values
+
+    def _check_column(self, name: str, available: List[str]) -> str:
+        if name not in available:
+            raise ValueError(f"Coluna inexistente: {name}")
+        return quote_identifier(name)
+
+    def query(self, cpf: Optional[str] = None, equipe: Optional[str] = None, nome: Optional[str] = None,
+              start: Optional[str] = None, end: Optional[str] = None, report: Optional[str] = None,
+              columns: Optional[List[str]] = None, sort: Optional[str] = None,
+              group_by: Optional[List[str]] = None, metrics: Optional[List[str]] = None,
+              limit: int = QUERY_DEFAULT_LIMIT, cursor: Optional[str] = None) -> Dict:
+        """
+        Consulta a base consolidada
+
+        Args:
+            cpf: CPF (com ou sem formatação)
+            equipe, nome: Igualdade sem diferenciar maiúsculas/acentos; nome terminado em * busca por prefixo
+            start, end: Período (AAAA-MM-DD, inclusive) pela coluna Data
+            report: Pasta de origem (ex: Faltas) presente em _source_files
+            columns: Projeção (padrão: todas)
+            sort: Coluna de ordenação; prefixo '-' para decrescente
+            group_by, metrics: Agregação (ex: group_by=['Equipe'], metrics=['count', 'max:Data']);
+                               min/max de Data em AAAA-MM-DD, sum/avg de horas (HH:MM) em minutos
+            limit: Linhas por página (máx. QUERY_MAX_LIMIT)
+            cursor: next_cursor da página anterior (só consultas sem agregação)
+
+        Returns:
+            Dict com rows, count, next_cursor (None na última página) e columns
+
+        Raises:
+            ValueError: Parâmetro inválido
+            LookupError: Base consolidada ainda não carregada
+        """
+        available = self.columns()
+        if not available:
+            raise LookupError("Base consolidada ainda não gerada: execute a mesclagem da Base BI")
+        if limit < 1 or limit > QUERY_MAX_LIMIT:
+            raise ValueError(f"limit deve estar entre 1 e {QUERY_MAX_LIMIT}")
+
+        where, params = [], []
+        if cpf:
+            digits = re.sub(r'\D', '', cpf)
+            if len(digits) != 11:
+                raise ValueError("CPF inválido")
+            where.append("_cpf = ?")
+            params.append(digits)
+        if equipe:
+            where.append("_equipe_norm = ?")
+            params.append(normalize_names(pd.Series([equipe])).iloc[0])
+        if nome:
+            normalized = normalize_names(pd.Series([nome.rstrip('*')])).iloc[0]
+            if nome.endswith('*'):
+                # Prefixo usa o índice: intervalo [prefixo, prefixo + maior caractere)
+                where.append("_nome_norm >= ? AND _nome_norm < ?")
+                params.extend([normalized, normalized + '￿'])
+            else:
+                where.append("_nome_norm = ?")
+                params.append(normalized)
+        for value, operator in ((start, '>='), (end, '<=')):
+            if value:
+                if not re.match(r'^\d{4}-\d{2}-\d{2}$', value):
+                    raise ValueError(f"Data inválida: {value} (use AAAA-MM-DD)")
+                where.append(f"_data {operator} ?")
+                params.append(value)
+        if report:
+            if '_source_files' not in available:
+                raise ValueError("Base sem coluna _source_files")
+            where.append("('; ' || _source_files || '; ') LIKE ?")
+            params.append(f"%; {report}; %")
+
+        if group_by or metrics:
+            return self._aggregate(available, where, params, group_by or [], metrics or ['count'], sort, limit)
+
+        projection = [self._check_column(col, available) for col in columns] if columns else \
+            [quote_identifier(col) for col in available]
+        sort_col, descending = None, False
+        if sort:
+            descending = sort.startswith('-')
+            sort_col = self._check_column(sort.lstrip('-'), available)
+            if sort_col == quote_identifier('Data'):
+                # "Sex, 03/10/2025" não ordena como texto: usa a data ISO
+                sort_col = '_data'
+
+        # Keyset: (coluna de ordenação, _id) da última linha da página anterior
+        operator = '<' if descending else '>'
+        if cursor:
+            last_value, last_id = self._decode_cursor(cursor)
+            if sort_col:
+                # NULLs ficam no início em ordem crescente (fim na decrescente), como no SQLite
+                if last_value is None:
+                    where.append(f"(({sort_col} IS NULL AND _id {operator} ?) OR {sort_col} IS NOT NULL)"
+                                 if not descending else f"({sort_col} IS NULL AND _id {operator} ?)")
+                    params.append(last_id)
+                else:
+                    null_clause = f" OR {sort_col} IS NULL" if descending else ''
+                    where.append(f"({sort_col} {operator} ? OR ({sort_col} = ? AND _id {operator} ?){null_clause})")
+                    params.extend([last_value, last_value, last_id])
+            else:
+                where.append(f"_id {operator} ?")
+                params.append(last_id)
+
+        direction = 'DESC' if descending else 'ASC'
+        order = f"{sort_col} {direction}, _id {direction}" if sort_col else f"_id {direction}"
+        select_sort = f", {sort_col} AS _sort_value" if sort_col else ", NULL AS _sort_value"
+        sql = (f"SELECT _id{select_sort}, {', '.join(projection)} FROM {BASE_TABLE}"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {order} LIMIT ?")
+
+        with self.store.transaction() as conn:
+            rows = conn.execute(sql, params + [limit + 1]).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        names = [col.strip('"').replace('""', '"') for col in projection]
+        next_cursor = self._encode_cursor([rows[-1][1], rows[-1][0]]) if has_more else None
+        return {
+            'columns': names,
+            'rows': [dict(zip(names, row[2:])) for row in rows],
+            'count': len(rows),
+            'next_cursor': next_cursor,
+        }
+
+    def _number_expression(self, col: str) -> str:
+        """Valor numérico da coluna para sum/avg: horas do PontoMais (HH:MM, com sinal) em minutos, demais com ',' decimal"""
+        text = f"TRIM({col})"
+        body = f"TRIM(LTRIM({text}, '-'))"
+        minutes = (f"(CAST(SUBSTR({body}, 1, INSTR({body}, ':') - 1) AS INTEGER) * 60"
+                   f" + CAST(SUBSTR({body}, INSTR({body}, ':') + 1, 2) AS INTEGER))")
+        return (f"CASE WHEN INSTR({col}, ':') > 0 THEN (CASE WHEN {text} LIKE '-%' THEN -1 ELSE 1 END) * {minutes}"
+                f" ELSE CAST(REPLACE({col}, ',', '.') AS REAL) END")
+
+    def _aggregate(self, available: List[str], where: List[str], params: list, group_by: List[str],
+                   metrics: List[str], sort: Optional[str], limit: int) -> Dict:
+        """Agregação agrupada pelas colunas de group_by (sem paginação; limitada por limit)"""
+        group_cols = [self._check_column(col, available) for col in group_by]
+        selects, names = list(group_cols), list(group_by)
+        for metric in metrics:
+            match = METRIC_PATTERN.match(metric)
+            if not match:
+                raise ValueError(f"Métrica inválida: {metric}")
+            function, column = match.groups()
+            if function == 'count' and not column:
+                selects.append("COUNT(*)")
+            elif not column:
+                raise ValueError(f"Métrica {function} exige coluna (ex: {function}:Data)")
+            else:
+                col = self._check_column(column, available)
+                if function == 'count_distinct':
+                    selects.append(f"COUNT(DISTINCT {col})")
+                elif function in ('sum', 'avg'):
+                    selects.append(f"{function.upper()}({self._number_expression(col)})")
+                elif col == quote_identifier('Data'):
+                    # "Sex, 03/10/2025" não compara como texto: min/max pela data ISO
+                    selects.append(f"{function.upper()}(_data)")
+                else:
+                    selects.append(f"{function.upper()}({col})")
+            names.append(metric)
+
+        order = ''
+        if sort:
+            key = sort.lstrip('-')
+            if key not in names:
+                raise ValueError(f"Ordenação deve usar uma coluna do group_by ou uma métrica: {key}")
+            order = f" ORDER BY {names.index(key) + 1} {'DESC' if sort.startswith('-') else 'ASC'}"
+            # Empates em ordem das colunas do group_by
+            order += ''.join(f", {pos + 1}" for pos in range(len(group_cols)))
+        elif group_cols:
+            order = " ORDER BY " + ', '.join(str(pos + 1) for pos in range(len(group_cols)))
+
+        sql = (f"SELECT {', '.join(selects)} FROM {BASE_TABLE}"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''}"
+               f"{' GROUP BY ' + ', '.join(group_cols) if group_cols else ''}{order} LIMIT ?")
+        with self.store.transaction() as conn:
+            rows = conn.execute(sql, params + [limit + 1]).fetchall()
+
+        return {
+            'columns': names,
+            'rows': [dict(zip(names, row)) for row in rows[:limit]],
+            'count': min(len(rows), limit),
+            'truncated': len(rows) > limit,
+            'next_cursor': None,
+        }
@@ -0,0 +1,331 @@
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import logging
+
+import pandas as pd
+
+from bi_store_service import BIStoreService, TEAM_CODE_PATTERN, fact_table_name, normalize_names, quote_identifier
+from timeline_service import NUMERIC_NAME_PATTERN
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "rollup_equipe_mes"
+ROLLUP_BASENAME = "rollup_equipe_mes"
+
+# Relatórios usados nos agregados: papel -> colunas candidatas (a primeira existente na tabela fato)
+ROLLUP_SOURCES = {
+    'Faltas': {'motivo': ['Motivo']},
+    'Banco de horas': {'saldo': ['Saldo BH', 'Saldo de B. H.', 'Saldo']},
+    'Absenteísmo': {'previsto': ['Previsto'], 'ausencia': ['Ausência']},
+    'Jornada': {'extras': ['Total de H. extras', 'Horas extras']},
+    'Assinaturas': {'assinado': ['Assinado?'], 'colaborador': ['Colaborador']},
+}
+
+# Motivos da Faltas que não são ausência (folgas da escala e do banco de horas)
+NON_ABSENCE_PATTERN = r'^(FOLGA|DAY OFF)'
+MEDICAL_PATTERN = r'ATESTADO'
+UNJUSTIFIED_MOTIVE = 'FALTA'
+
+# Equipe dos agregados para linhas sem equipe (o código da loja sai pelo TEAM_CODE_PATTERN)
+NO_TEAM = 'SEM EQUIPE'
+
+# Horas no formato do PontoMais (ex: "07:31", "-46:34", "212:40")
+HOURS_PATTERN = r'^\s*(-?)\s*(\d+):(\d{2})'
+
+# Colunas da tabela de agregados (mes = AAAA-MM)
+ROLLUP_COLUMNS = {
+    'mes': 'TEXT NOT NULL',
+    'equipe': 'TEXT NOT NULL',
+    'colaboradores': 'INTEGER',
+    'ausencias': 'INTEGER',
+    'faltas': 'INTEGER',
+    'atestados': 'INTEGER',
+    'previsto_min': 'INTEGER',
+    'ausencia_min': 'INTEGER',
+    'absenteismo_pct': 'REAL',
+    'saldo_bh_min': 'INTEGER',
+    'bh_negativo': 'INTEGER',
+    'horas_extras_min': 'INTEGER',
+    'espelhos': 'INTEGER',
+    'espelhos_assinados': 'INTEGER',
+    'assinatura_pct': 'REAL',
+    'atualizado_em': 'TEXT',
+}
+COUNT_COLUMNS = [col for col, kind in ROLLUP_COLUMNS.items() if kind == 'INTEGER']
+
+
+def hours_to_minutes(values: pd.Series) -> pd.Series:
+    """Horas "HH:MM" (com sinal) -> minutos (NaN quando não é hora)"""
+    parts = values.astype(object).where(values.notna()).astype(str).str.extract(HOURS_PATTERN)
+    minutes = pd.to_numeric(parts[1], errors='coerce') * 60 + pd.to_numeric(parts[2], errors='coerce')
+    return minutes.where(parts[0] != '-', -minutes)
+
+
+class BIRollupService:
+    """
+    Agregados por equipe e mês materializados na base analítica
+
+    A tabela rollup_equipe_mes traz, por equipe e mês, ausências da Faltas,
+    horas previstas/ausentes do Absenteísmo, saldo do banco de horas no fim
+    do mês, horas extras da Jornada e espelhos assinados. A tabela
+    rollup_arquivos guarda a versão (tamanho/mtime) e os meses de cada
+    arquivo agregado: só os meses de arquivos novos, alterados ou removidos
+    são recalculados.
+    """
+
+    def __init__(self, store: BIStoreService, describe: Optional[Callable[[str], Dict]] = None):
+        self.store = store
+        # Nome do arquivo -> metadados com 'period_start' (mês das linhas sem data)
+        self.describe = describe
+
+    def _ensure_tables(self, conn):
+        definition = ', '.join(f"{col} {kind}" for col, kind in ROLLUP_COLUMNS.items())
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} ({definition}, PRIMARY KEY (mes, equipe))")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_arquivos (
+                arquivo_id INTEGER PRIMARY KEY,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                meses TEXT NOT NULL
+            )
+        """)
+
+    def _period_month(self, path: str) -> Optional[str]:
+        """Mês (AAAA-MM) do período no nome do arquivo"""
+        if self.describe is None:
+            return None
+        period_start = self.describe(os.path.basename(path)).get('period_start')
+        return period_start[:7] if period_start else None
+
+    def _source_columns(self, conn) -> Dict[str, Dict[str, str]]:
+        """Tabela fato existente -> papel -> coluna do relatório"""
+        sources = {}
+        for report_type, roles in ROLLUP_SOURCES.items():
+            table = fact_table_name(report_type)
+            existing = {col.lower(): col for col in self.store._table_columns(conn, table)}
+            if not existing:
+                continue
+            sources[table] = {role: next((existing[c.lower()] for c in candidates if c.lower() in existing), None)
+                              for role, candidates in roles.items()}
+        return sources
+
+    def _file_months(self, conn, table: str, file_id: int, period_month: Optional[str]) -> List[str]:
+        months = set()
+        for (month,) in conn.execute(f"SELECT DISTINCT substr(data, 1, 7) FROM {quote_identifier(table)} "
+                                     f"WHERE arquivo_id = ?", (file_id,)):
+            month = month or period_month
+            if month:
+                months.add(month)
+        return sorted(months)
+
+    def _month_rows(self, conn, table: str, columns: Dict[str, str], month: str,
+                    period_files: List[int]) -> pd.DataFrame:
+        """Linhas do mês: data no mês ou, sem data, arquivo cujo período começa no mês"""
+        selected = ['nome_norm', 'equipe'] + [quote_identifier(col) for col in columns.values() if col]
+        names = ['nome_norm', 'equipe'] + [role for role, col in columns.items() if col]
+        where = "data >= ? AND data < ?"
+        params = [f"{month}-01", f"{month}-32"]
+        if period_files:
+            where += f" OR (data IS NULL AND arquivo_id IN ({', '.join('?' for _ in period_files)}))"
+            params += period_files
+        rows = conn.execute(f"SELECT {', '.join(selected)}, data FROM {quote_identifier(table)} WHERE {where}",
+                            params).fetchall()
+        df = pd.DataFrame(rows, columns=names + ['data'])
+        if 'colaborador' in df.columns:
+            # Assinaturas traz o nome na coluna "Colaborador"
+            df['nome_norm'] = df['nome_norm'].fillna(normalize_names(df['colaborador']))
+        # Rodapés numéricos soltos no lugar do nome não entram nos agregados
+        return df[~df['nome_norm'].fillna('').str.match(NUMERIC_NAME_PATTERN)]
+
+    def _team_of(self, df: pd.DataFrame, registry: pd.Series) -> pd.Series:
+        """Equipe sem o código da loja; sem equipe no relatório, a do cadastro de Colaboradores"""
+        equipe = df['equipe'].astype(object).where(df['equipe'].notna())
+        equipe = equipe.where(equipe.isna(), equipe.astype(str).str.replace(TEAM_CODE_PATTERN, '', regex=True).str.strip())
+        equipe = equipe.where(equipe != '')
+        equipe = equipe.fillna(df['nome_norm'].map(registry))
+        return equipe.fillna(NO_TEAM)
+
+    def _registry(self, conn) -> pd.Series:
+        """Nome normalizado -> equipe pelo cadastro de Colaboradores"""
+        table = fact_table_name('Colaboradores')
+        if not self.store._table_columns(conn, table):
+            return pd.Series(dtype=object)
+        rows = conn.execute(f"SELECT nome_norm, equipe FROM {quote_identifier(table)} "
+                            f"WHERE nome_norm IS NOT NULL AND equipe IS NOT NULL ORDER BY arquivo_id").fetchall()
+        registry = pd.DataFrame(rows, columns=['nome_norm', 'equipe']).drop_duplicates('nome_norm', keep='last')
+        return registry.set_index('nome_norm')['equipe']
+
+    def _aggregate(self, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Agregados de um mês por equipe a partir das linhas de cada relatório"""
+        parts = []
+        people = []
+
+        faltas = frames.get(fact_table_name('Faltas'))
+        if faltas is not None and 'motivo' in faltas.columns:
+            motivo = faltas['motivo'].fillna('').astype(str).str.strip().str.upper()
+            absence = ~motivo.str.match(NON_ABSENCE_PATTERN)
+            parts.append(pd.DataFrame({
+                'ausencias': absence,
+                'faltas': motivo.eq(UNJUSTIFIED_MOTIVE) | motivo.eq(''),
+                'atestados': motivo.str.contains(MEDICAL_PATTERN),
+            }).groupby(faltas['equipe']).sum())
+
+        absenteismo = frames.get(fact_table_name('Absenteísmo'))
+        if absenteismo is not None:
+            values = pd.DataFrame({
+                f"{role}_min": hours_to_minutes(absenteismo[role]) for role in ('previsto', 'ausencia')
+                if role in absenteismo.columns
+            }, index=absenteismo.index)
+            parts.append(values.groupby(absenteismo['equipe']).sum(min_count=1))
+
+        banco = frames.get(fact_table_name('Banco de horas'))
+        if banco is not None and 'saldo' in banco.columns:
+            # Saldo de cada colaborador no último dia do mês com saldo
+            banco = banco.assign(saldo=hours_to_minutes(banco['saldo'])).dropna(subset=['saldo', 'nome_norm'])
+            last = banco.sort_values('data', kind='stable').drop_duplicates('nome_norm', keep='last')
+            parts.append(pd.DataFrame({
+                'saldo_bh_min': last['saldo'],
+                'bh_negativo': last['saldo'] < 0,
+            }).groupby(last['equipe']).agg({'saldo_bh_min': 'sum', 'bh_negativo': 'sum'}))
+
+        jornada = frames.get(fact_table_name('Jornada'))
+        if jornada is not None and 'extras' in jornada.columns:
+            extras = hours_to_minutes(jornada['extras'])
+            parts.append(extras.groupby(jornada['equipe']).sum(min_count=1).rename('horas_extras_min').to_frame())
+
+        assinaturas = frames.get(fact_table_name('Assinaturas'))
+        if assinaturas is not None and 'assinado' in assinaturas.columns:
+            signed = assinaturas['assinado'].fillna('').astype(str).str.strip().str.upper()
+            parts.append(pd.DataFrame({
+                'espelhos': signed.ne(''),
+                'espelhos_assinados': signed.eq('SIM'),
+            }).groupby(assinaturas['equipe']).sum())
+
+        for df in frames.values():
+            people.append(df[['equipe', 'nome_norm']].dropna())
+        if not parts:
+            return pd.DataFrame(columns=list(ROLLUP_COLUMNS))
+
+        rollup = pd.concat(parts, axis=1, sort=True)
+        if people:
+            rollup['colaboradores'] = pd.concat(people).drop_duplicates().groupby('equipe').size()
+        rollup.index.name = 'equipe'
+        rollup = rollup.reset_index()
+
+        for col in COUNT_COLUMNS:
+            if col not in rollup.columns:
+                rollup[col] = None
+            elif col not in ('previsto_min', 'ausencia_min', 'saldo_bh_min', 'horas_extras_min'):
+                rollup[col] = rollup[col].fillna(0)
+        rollup['absenteismo_pct'] = (rollup['ausencia_min'] / rollup['previsto_min'].where(rollup['previsto_min'] > 0) * 100).round(2)
+        rollup['assinatura_pct'] = (rollup['espelhos_assinados'] / rollup['espelhos'].where(rollup['espelhos'] > 0) * 100).round(2)
+        return rollup
+
+    def refresh(self, force: bool = False) -> Dict:
+        """
+        Recalcula os agregados dos meses com arquivos novos, alterados ou removidos
+
+        Args:
+            force: Recalcula todos os meses
+
+        Returns:
+            Dict com months (recalculados), files (alterados/removidos) e rows (linhas gravadas)
+        """
+        with self.store.lock, self.store.transaction() as conn:
+            self._ensure_tables(conn)
+            sources = self._source_columns(conn)
+            files = [row for row in conn.execute(
+                "SELECT id, caminho, tabela, tamanho, mtime_ns FROM arquivos_ingeridos").fetchall()
+                if row[2] in sources]
+            known = {file_id: (size, mtime, months) for file_id, size, mtime, months
+                     in conn.execute("SELECT arquivo_id, tamanho, mtime_ns, meses FROM rollup_arquivos")}
+
+            dirty = set()
+            versions = {}
+            period_files = {}
+            for file_id, path, table, size, mtime in files:
+                period_month = self._period_month(path)
+                if period_month:
+                    period_files.setdefault(period_month, []).append(file_id)
+                previous = known.pop(file_id, None)
+                if previous and not force and previous[:2] == (size, mtime):
+                    continue
+                months = self._file_months(conn, table, file_id, period_month)
+                versions[file_id] = (size, mtime, ','.join(months))
+                dirty.update(months)
+                if previous and previous[2]:
+                    dirty.update(previous[2].split(','))
+            # Arquivos que saíram da base analítica
+            for _, _, months in known.values():
+                if months:
+                    dirty.update(months.split(','))
+            if force:
+                dirty.update(month for (month,) in conn.execute(f"SELECT DISTINCT mes FROM {ROLLUP_TABLE}"))
+
+            registry = self._registry(conn) if dirty else None
+            written = 0
+            updated_at = datetime.now().isoformat(timespec='seconds')
+            for month in sorted(dirty):
+                frames = {}
+                for table, columns in sources.items():
+                    df = self._month_rows(conn, table, columns, month, period_files.get(month, []))
+                    if not df.empty:
+                        df['equipe'] = self._team_of(df, registry)
+                        frames[table] = df
+                rollup = self._aggregate(frames)
+                conn.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE mes = ?", (month,))
+                if rollup.empty:
+                    continue
+                rollup['mes'] = month
+                rollup['atualizado_em'] = updated_at
+                rollup = rollup[list(ROLLUP_COLUMNS)]
+                values = rollup.astype(object).where(rollup.notna(), None)
+                conn.executemany(f"INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_COLUMNS)}) "
+                                 f"VALUES ({', '.join('?' for _ in ROLLUP_COLUMNS)})",
+                                 values.itertuples(index=False, name=None))
+                written += len(rollup)
+
+            if known:
+                conn.executemany("DELETE FROM rollup_arquivos WHERE arquivo_id = ?", ((file_id,) for file_id in known))
+            conn.executemany("INSERT OR REPLACE INTO rollup_arquivos (arquivo_id, tamanho, mtime_ns, meses) "
+                             "VALUES (?, ?, ?, ?)",
+                             ((file_id, *version) for file_id, version in versions.items()))
+
+        if dirty:
+            logger.info(f"Agregados por equipe recalculados: {len(dirty)} mês(es), {written} linha(s)")
+        return {'months': sorted(dirty), 'files': len(versions) + len(known), 'rows': written}
+
+    def frame(self, equipe: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """
+        Agregados gravados, ordenados por mês e equipe
+
+        Args:
+            equipe: Nome da equipe (sem diferenciar maiúsculas)
+            start, end: Meses AAAA-MM (inclusive)
+
+        Raises:
+            ValueError: Mês inválido
+        """
+        for value in (start, end):
+            if value is not None:
+                try:
+                    datetime.strptime(value, "%Y-%m")
+                except ValueError:
+                    raise ValueError(f"Mês inválido: {value} (use AAAA-MM)")
+
+        where, params = [], []
+        if equipe:
+            where.append("upper(equipe) = upper(?)")
+            params.append(equipe.strip())
+        if start:
+            where.append("mes >= ?")
+            params.append(start)
+        if end:
+            where.append("mes <= ?")
+            params.append(end)
+        with self.store.transaction() as conn:
+            self._ensure_tables(conn)
+            return pd.read_sql_query(f"SELECT * FROM {ROLLUP_TABLE}"
+                                     f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY mes, equipe",
+                                     conn, params=params)
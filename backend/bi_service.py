@@ -1,19 +1,169 @@
 import os
+import io
+import gzip
+import time
+import shutil
+import filecmp
+import numpy as np
 import pandas as pd
-import glob
 import re
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 import logging
 
+from dialect_service import DialectService
+from parse_cache_service import ParseCacheService
+from file_catalog_service import FileCatalogService
+from excel_reader import read_excel_fast
+from sidecar_service import SidecarService, PARQUET_AVAILABLE, to_parquet_frame, pa, pq
+from bi_metrics import PeakRSSMonitor, StageMetrics
+from bi_dtypes import optimize_dtypes, optimize_with_report
+from download_service import precompressed_is_fresh
+from timeline_service import TimelineService, TIMELINE_REPORTS, TIMELINE_BASENAME
+from bi_store_service import BIStoreService, FACT_COLUMNS, normalize_names
+from bi_query_service import BIQueryService
+from bi_rollup_service import BIRollupService, ROLLUP_BASENAME
+from bi_employee_service import BIEmployeeService, EMPLOYEE_SOURCES
+
 logger = logging.getLogger(__name__)
 
+# Padrão de data do PontoMais (ex: "Sex, 03/10/2025")
+PONTOMAIS_DATE_PATTERN = r'^(Seg|Ter|Qua|Qui|Sex|Sáb|Sab|Dom),?\s*\d{2}/\d{2}/\d{4}'
+PONTOMAIS_DATE_REGEX = re.compile(PONTOMAIS_DATE_PATTERN)
+
+# Partes geradas pelo PontoMais no nome do arquivo: período "(01.10.2025_-_31.10.2025)" e hash "_-_d87bb261"
+PERIOD_FILENAME_PATTERN = re.compile(r'_?\((\d{2})\.(\d{2})\.(\d{4})_-_(\d{2})\.(\d{2})\.(\d{4})\)')
+HASH_FILENAME_PATTERN = re.compile(r'_-_[0-9a-f]{8}$')
+
+# Opções da seção "bi" do config.json
+BI_DEFAULT_SETTINGS = {
+    'parquet_sidecars': True,  # Grava/lê <relatório>.parquet ao lado de cada arquivo
+    'parse_mode': 'thread',    # Leitura dos arquivos da etapa 1: serial, thread ou process
+    'parse_workers': 0,        # Quantidade de workers (0 = número de núcleos)
+    'stream_memory_mb': 512,   # Orçamento de memória do modo streaming
+    'precompress_csv': True,   # Grava <base>.csv.gz para downloads com Accept-Encoding: gzip
+    'optimize_dtypes': True,   # Categóricos/inteiros compactos nas pastas e na base (mesmo CSV)
+    'typed_columns': False,    # Base final com datas datetime64 e números Int64/Float64 (muda o texto do CSV)
+    'memory_report': False,    # Memória antes/depois da otimização em stats.memory (memory_usage deep: percorre os textos)
+    'analytics_store': True,   # Atualiza a base SQLite (cache/bi/base_bi.sqlite) após cada mesclagem
+    'team_rollups': True,      # Agregados por equipe e mês (rollup_equipe_mes) após a base analítica
+    'employee_dimension': True,  # Linhas sem CPF resolvidas pelo nome na dimensão de colaboradores
+}
+
+# Formatos de exportação da base consolidada (formato -> extensão)
+EXPORT_FORMATS = {
+    'csv': '.csv',
+    'csv.gz': '.csv.gz',
+    'csv.zst': '.csv.zst',
+    'parquet': '.parquet',
+}
+EXPORT_BASENAME = "base_bi_consolidada"
+# Arquivos gravados pela Base BI na pasta raiz: fora do catálogo, para não serem lidos
+# de volta como relatórios pela mesclagem, pelo streaming e pela dimensão de colaboradores
+GENERATED_BASENAMES = (EXPORT_BASENAME, TIMELINE_BASENAME, ROLLUP_BASENAME)
+
+# Modo streaming: cada bloco usa até 1/STREAM_CHUNK_SHARE do orçamento, estimando
+# STREAM_MEMORY_FACTOR bytes em memória por byte em disco (textos viram objetos Python)
+STREAM_CHUNK_SHARE = 4
+STREAM_MEMORY_FACTOR = 10
+STREAM_MIN_CHUNK_ROWS = 1000
+
+# Arquivos lidos por vez na ingestão da base analítica
+STORE_BATCH_FILES = 8
+
+# Mesclagens mantidas no histórico de métricas por etapa (GET /api/bi/metrics)
+METRICS_HISTORY = 20
+
+PARSE_MODES = ('serial', 'thread', 'process')
+
+# Etapas reportadas ao stage_callback de merge_reports (no streaming, leitura inclui a consolidação)
+MERGE_STAGES = ('leitura', 'consolidacao', 'preenchimento')
+
+# BIService usado pelos processos do pool de leitura (um por processo)
+_worker_service = None
+
+
+def _parse_report_in_worker(filepath: str) -> tuple:
+    """
+    Lê um relatório em um processo do pool (modo "process")
+
+    O processo não grava caches: devolve o frame e o dialeto detectado para
+    o processo principal registrar.
+
+    Returns:
+        (DataFrame, dialeto ou None, tempos da leitura no processo: wall_s e cpu_s)
+    """
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = BIService()
+        _worker_service.dialect_service.persist = False
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    df = _worker_service._read_file_safe(filepath)
+    timing = {'wall_s': round(time.perf_counter() - wall, 4), 'cpu_s': round(time.process_time() - cpu, 4)}
+    return df, _worker_service.dialect_service.cached_dialect(filepath), timing
+
+
+class BIRun:
+    """
+    Estado de uma chamada do BIService (mesclagem, linha do tempo, base analítica)
+    
+    O BIService é um só para a fila, a mesclagem síncrona e os endpoints da Base BI,
+    que podem rodar ao mesmo tempo: opções, pool de leitura, métricas, stage_callback
+    e resolução de nomes de cada chamada ficam aqui e são passados adiante.
+    """
+    
+    def __init__(self, settings: Dict, metrics: Optional[StageMetrics] = None, stage_callback=None,
+                 employee_resolver=None):
+        self.settings = settings
+        self.metrics = metrics
+        self.stage_callback = stage_callback
+        self.executor = None
+        # Resolução nome -> CPF (None: só CPF e NOME|EQUIPE)
+        self.employee_resolver = employee_resolver
+        # Relatórios de memória da otimização de tipos
+        self.memory_reports = {}
+        # Tipos fixados por arquivo no streaming (_stream_dtypes), válidos só nesta chamada
+        self.stream_dtypes = {}
+    
+    def stage(self, name: str, **fields):
+        """Mede uma etapa (sem métricas, só devolve um registro descartado)"""
+        if self.metrics is None:
+            return nullcontext({})
+        return self.metrics.stage(name, **fields)
+    
+    def notify_stage(self, stage: str, done: int, total: int):
+        """Repassa o andamento da etapa ao stage_callback"""
+        if self.stage_callback:
+            try:
+                self.stage_callback(stage, done, total)
+            except Exception as e:
+                logger.warning(f"Erro ao reportar etapa {stage}: {str(e)}")
+
+
 class BIService:
     """Serviço para consolidação de dados de múltiplos relatórios CSV/Excel"""
     
     def __init__(self, config_service=None):
         self.config_service = config_service
         self._root_folder = None
+        self.dialect_service = DialectService()
+        self.parse_cache = ParseCacheService()
+        self.sidecar_service = SidecarService()
+        self.file_catalog = FileCatalogService(describe=self._describe_file, row_count=self.parse_cache.known_rows,
+                                               ignored_prefixes=GENERATED_BASENAMES)
+        self.timeline_service = TimelineService()
+        self.store_service = BIStoreService()
+        self.query_service = BIQueryService(self.store_service)
+        self.rollup_service = BIRollupService(self.store_service, describe=self._describe_file)
+        self.employee_service = BIEmployeeService(self.store_service)
+        # Estatísticas e métricas por etapa da última mesclagem concluída e das últimas METRICS_HISTORY
+        self.last_merge_stats = {}
+        self.last_merge_metrics = None
+        self.metrics_history = deque(maxlen=METRICS_HISTORY)
     
     def _get_root_folder(self) -> str:
         """Obtém a pasta raiz configurada pelo usuário"""
@@ -33,7 +183,80 @@ class BIService:
         # Fallback para pasta padrão
         self._root_folder = "arquivos_baixados"
         return self._root_folder
+    
+    def _load_bi_settings(self) -> Dict:
+        """Carrega as opções da Base BI (seção "bi" do config.json) sobre os valores padrão"""
+        settings = dict(BI_DEFAULT_SETTINGS)
+        if self.config_service:
+            try:
+                settings.update(self.config_service.load_config().get("bi", {}))
+            except Exception as e:
+                logger.warning(f"Erro ao carregar opções da Base BI: {str(e)}")
         
+        if settings.get('parse_mode') not in PARSE_MODES:
+            logger.warning(f"parse_mode inválido ({settings.get('parse_mode')}), usando leitura serial")
+            settings['parse_mode'] = 'serial'
+        return settings
+    
+    def get_settings(self) -> Dict:
+        """Opções atuais da Base BI (seção "bi" do config.json sobre os padrões)"""
+        return self._load_bi_settings()
+    
+    def _new_run(self, metrics: Optional[StageMetrics] = None, stage_callback=None) -> BIRun:
+        """Estado de uma nova chamada, com as opções lidas agora do config.json"""
+        return BIRun(self._load_bi_settings(), metrics=metrics, stage_callback=stage_callback)
+    
+    def _create_parse_executor(self, settings: Dict):
+        """
+        Cria o pool de leitura da etapa 1 conforme as opções (None no modo serial)
+        
+        No modo "process" cada processo importa o backend de novo; no Windows
+        (spawn) isso inclui o módulo principal, por isso o padrão é "thread".
+        """
+        mode = settings.get('parse_mode', 'thread')
+        if mode == 'serial':
+            return None
+        
+        workers = int(settings.get('parse_workers') or 0) or os.cpu_count() or 1
+        if workers <= 1:
+            return None
+        
+        logger.info(f"Leitura paralela: {workers} workers ({mode})")
+        if mode == 'process':
+            return ProcessPoolExecutor(max_workers=workers)
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bi-parse')
+    
+    @contextmanager
+    def _parse_pool(self, run: BIRun):
+        """Pool de leitura da chamada em run.executor, encerrado na saída (com os caches gravados)"""
+        run.executor = self._create_parse_executor(run.settings)
+        try:
+            yield run.executor
+        finally:
+            if run.executor:
+                run.executor.shutdown()
+            run.executor = None
+            self._flush_caches()
+    
+    def _flush_caches(self):
+        """Grava de uma vez os caches de leitura alterados na chamada (dialetos e manifesto de arquivos lidos)"""
+        self.dialect_service.flush()
+        self.parse_cache.flush()
+    
+    def _stage(self, run: Optional[BIRun], name: str, **fields):
+        """Mede uma etapa da chamada (sem run ou sem métricas, só devolve um registro descartado)"""
+        if run is None:
+            return nullcontext({})
+        return run.stage(name, **fields)
+    
+    def _report_type_from_filename(self, filename: str) -> str:
+        """Extrai o tipo de relatório do nome do arquivo (ex: Pontomais_-_Faltas_(01.10.2025_-_31.10.2025)_-_d87bb261.csv -> Faltas)"""
+        name = os.path.splitext(filename)[0]
+        name = re.sub(r'^Pontomais_-_', '', name)
+        name = HASH_FILENAME_PATTERN.sub('', name)
+        name = PERIOD_FILENAME_PATTERN.sub('', name)
+        return name.replace('_', ' ').strip()
+    
     def _normalize_column_names(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normaliza nomes de colunas removendo espaços e caracteres especiais"""
         df.columns = df.columns.str.strip()
@@ -57,7 +280,9 @@ class BIService:
     def _fill_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Preenche valores em branco com dados de outras linhas do mesmo CPF/Nome+Equipe.
-        Para cada grupo (CPF ou Nome+Equipe), preenche valores vazios com valores não-vazios.
+        Para cada grupo (CPF ou Nome+Equipe), preenche valores vazios com o primeiro
+        valor não-vazio do grupo. Usa groupby/transform: duas passadas pelo frame,
+        independente do número de pessoas.
         """
         if df.empty:
             return df
@@ -65,67 +290,49 @@ class BIService:
         # Cria cópia para não modificar o original
         df_filled = df.copy()
         
-        # Agrupa por CPF (quando existe e não é nulo)
+        # Agrupa por CPF (quando existe e não é nulo/vazio)
         if 'CPF' in df_filled.columns:
-            # Para cada CPF único
-            for cpf in df_filled['CPF'].dropna().unique():
-                if not cpf or cpf == '':
-                    continue
-                
-                # Pega todas as linhas com esse CPF
-                mask = df_filled['CPF'] == cpf
-                group = df_filled[mask]
-                
-                if len(group) > 1:
-                    # Para cada coluna, preenche valores vazios com o primeiro valor não-vazio do grupo
-                    for col in df_filled.columns:
-                        if col in ['CPF', '_source_files']:
-                            continue
-                        
-                        # Pega o primeiro valor não-vazio
-                        non_empty = group[col].dropna()
-                        non_empty = non_empty[non_empty != '']
-                        
-                        if len(non_empty) > 0:
-                            fill_value = non_empty.iloc[0]
-                            # Preenche valores vazios neste grupo
-                            df_filled.loc[mask, col] = df_filled.loc[mask, col].fillna(fill_value)
-                            df_filled.loc[mask & (df_filled[col] == ''), col] = fill_value
+            cpf_keys = df_filled['CPF'].where(df_filled['CPF'] != '')
+            df_filled = self._fill_from_group(df_filled, cpf_keys, exclude=['CPF', '_source_files'])
         
         # Agrupa por Nome+Equipe (para registros sem CPF)
         if 'Nome' in df_filled.columns and 'Equipe' in df_filled.columns:
-            # Cria chave temporária
-            df_filled['_temp_key'] = df_filled['Nome'].astype(str) + '|' + df_filled['Equipe'].astype(str)
-            
-            for key in df_filled['_temp_key'].unique():
-                if not key or key == '|':
-                    continue
-                
-                mask = df_filled['_temp_key'] == key
-                group = df_filled[mask]
-                
-                if len(group) > 1:
-                    for col in df_filled.columns:
-                        if col in ['Nome', 'Equipe', 'CPF', '_source_files', '_temp_key']:
-                            continue
-                        
-                        non_empty = group[col].dropna()
-                        non_empty = non_empty[non_empty != '']
-                        
-                        if len(non_empty) > 0:
-                            fill_value = non_empty.iloc[0]
-                            df_filled.loc[mask, col] = df_filled.loc[mask, col].fillna(fill_value)
-                            df_filled.loc[mask & (df_filled[col] == ''), col] = fill_value
-            
-            # Remove chave temporária
-            df_filled = df_filled.drop(columns=['_temp_key'])
+            name_keys = self._to_text(df_filled['Nome']) + '|' + self._to_text(df_filled['Equipe'])
+            name_keys = name_keys.where(name_keys != '|')
+            df_filled = self._fill_from_group(df_filled, name_keys, exclude=['Nome', 'Equipe', 'CPF', '_source_files'])
         
         return df_filled
     
-    def _read_file_safe(self, filepath: str) -> pd.DataFrame:
+    def _fill_from_group(self, df: pd.DataFrame, keys: pd.Series, exclude: List[str]) -> pd.DataFrame:
+        """Preenche células vazias (NaN ou '') com o primeiro valor não-vazio do grupo da chave"""
+        cols = [c for c in df.columns if c not in exclude]
+        if not cols or keys.notna().sum() == 0:
+            return df
+        
+        values = df[cols]
+        empty = values.isna() | (values == '')
+        firsts = values.mask(empty).groupby(keys.to_numpy(), dropna=True).transform('first')
+        firsts.index = values.index
+        
+        to_fill = empty & firsts.notna()
+        if to_fill.to_numpy().any():
+            filled_cols = [c for c in cols if to_fill[c].any()]
+            for col in filled_cols:
+                df[col] = values[col].mask(to_fill[col], firsts[col])
+        return df
+    
+    def _skiprows_hint(self, filepath: str) -> Optional[int]:
+        """Define skiprows específico por tipo de relatório (alguns têm cabeçalhos em linhas diferentes)"""
+        filename = os.path.basename(filepath).upper()
+        if 'ABSENTEISMO' in filename or 'ABSENTEÍSMO' in filename:
+            return 4  # Linha 5
+        elif 'ASSINATURA' in filename:
+            return 4  # Linha 5
+        return None
+    
+    def _read_file_safe(self, filepath: str, run: Optional[BIRun] = None) -> pd.DataFrame:
         """Lê CSV ou Excel com tratamento de erros e diferentes encodings"""
         file_ext = os.path.splitext(filepath)[1].lower()
-        filename = os.path.basename(filepath).upper()
         
         # Verifica se arquivo é muito pequeno (provavelmente vazio)
         file_size = os.path.getsize(filepath)
@@ -133,32 +340,36 @@ class BIService:
             logger.warning(f"Arquivo muito pequeno ({file_size} bytes), provavelmente vazio: {os.path.basename(filepath)}")
             return pd.DataFrame()
         
-        # Define skiprows específico por tipo de relatório
-        # Alguns relatórios têm cabeçalhos em linhas diferentes
-        skiprows_hint = None
-        if 'ABSENTEISMO' in filename or 'ABSENTEÍSMO' in filename:
-            skiprows_hint = 4  # Linha 5
-        elif 'ASSINATURA' in filename:
-            skiprows_hint = 4  # Linha 5
+        skiprows_hint = self._skiprows_hint(filepath)
         
         # Tenta ler Excel
         if file_ext in ['.xlsx', '.xls']:
             try:
-                df = pd.read_excel(filepath)
+                # Uma única leitura: o cabeçalho após o preâmbulo "Relatório" é detectado nas linhas já lidas
+                df = read_excel_fast(filepath)
                 if len(df) > 0:
-                    # Pula linhas de cabeçalho de relatório
-                    if 'Relatório' in str(df.iloc[0, 0]):
-                        for i in range(min(5, len(df))):
-                            if 'Nome' in str(df.iloc[i]).upper() or 'CPF' in str(df.iloc[i]).upper():
-                                df = pd.read_excel(filepath, skiprows=i)
-                                break
                     logger.info(f"Excel lido com sucesso: {os.path.basename(filepath)} ({len(df)} linhas)")
                     return self._normalize_column_names(df)
             except Exception as e:
                 logger.warning(f"Erro ao ler Excel {filepath}: {str(e)}")
                 return pd.DataFrame()
         
-        # Tenta ler CSV
+        # Tenta ler CSV: detecta o dialeto pelo início do arquivo e lê uma única vez
+        report_type = self._report_type_from_filename(os.path.basename(filepath))
+        with self._stage(run, 'dialeto', file=os.path.basename(filepath)):
+            dialect = self.dialect_service.get_dialect(filepath, report_type=report_type, skiprows_hint=skiprows_hint)
+        if dialect:
+            try:
+                df = self._read_csv(filepath, dialect['encoding'], dialect['sep'], dialect['skiprows'])
+                df = self._finalize_csv_frame(df, filepath, dialect['encoding'], dialect['sep'], dialect['skiprows'])
+                if df is not None:
+                    return df
+            except Exception as e:
+                logger.warning(f"Dialeto detectado falhou em {os.path.basename(filepath)}: {str(e)}")
+            
+            # Detecção pelo prefixo não serviu para o arquivo inteiro: volta à força bruta
+            self.dialect_service.forget(filepath)
+        
         encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'utf-8-sig']
         separators = [',', ';', '\t']
         
@@ -175,54 +386,17 @@ class BIService:
                     
                     for skip in skip_attempts:
                         try:
-                            # Tenta ler o arquivo (compatível com pandas antigo e novo)
-                            try:
-                                df = pd.read_csv(filepath, encoding=encoding, sep=sep, skiprows=skip, on_bad_lines='skip', low_memory=False)
-                            except TypeError:
-                                # Versão antiga do pandas usa error_bad_lines
-                                try:
-                                    df = pd.read_csv(filepath, encoding=encoding, sep=sep, skiprows=skip, error_bad_lines=False, low_memory=False)
-                                except TypeError:
-                                    df = pd.read_csv(filepath, encoding=encoding, sep=sep, skiprows=skip, error_bad_lines=False)
-                            
-                            # Verifica se leitura foi bem-sucedida
-                            if len(df) == 0:
-                                continue
-                            
-                            # Se tem apenas 1 coluna, provavelmente o separador está errado
-                            if len(df.columns) == 1:
-                                continue
-                            
-                            # Tratamento especial para relatório de Jornada (formato diferente)
-                            # Formato: primeira coluna é "Colaborador" e segunda é o nome do colaborador
-                            if len(df.columns) == 2 and 'Colaborador' in str(df.columns[0]):
-                                # Este é um relatório de Jornada com formato especial
-                                # A primeira linha contém os nomes reais das colunas
-                                if len(df) > 0:
-                                    # Usa a primeira linha como cabeçalho
-                                    new_header = df.iloc[0]
-                                    df = df[1:]
-                                    df.columns = new_header
-                                    df = df.reset_index(drop=True)
-                            
-                            # Verifica se tem colunas esperadas (Nome, CPF, Equipe, Data, Cargo, etc)
-                            cols_upper = [str(c).upper() for c in df.columns]
-                            cols_str = ' '.join(cols_upper)
-                            
-                            # Lista de palavras-chave que indicam um relatório válido
-                            valid_keywords = ['NOME', 'CPF', 'EQUIPE', 'DATA', 'CARGO', 'COLABORADOR', 
-                                            'TURNO', 'PIS', 'ADMISSAO', 'ADMISSÃO', 'DEMISSAO', 'DEMISSÃO',
-                                            'FALTA', 'AUSENCIA', 'AUSÊNCIA', 'JORNADA', 'PONTO', 'HORA']
-                            
-                            has_valid_cols = any(keyword in cols_str for keyword in valid_keywords)
-                            
-                            if has_valid_cols and len(df) > 0 and len(df.columns) > 1:
-                                logger.info(f"CSV lido com sucesso: {os.path.basename(filepath)} ({len(df)} linhas, {len(df.columns)} colunas, encoding={encoding}, sep='{sep}', skiprows={skip})")
-                                return self._normalize_column_names(df)
-                            elif len(df) > 0 and len(df.columns) > 1:
-                                # Se tem dados mas não tem palavras-chave, ainda assim tenta processar
-                                logger.warning(f"Arquivo sem colunas esperadas, mas processando mesmo assim: {os.path.basename(filepath)}")
-                                return self._normalize_column_names(df)
+                            df = self._read_csv(filepath, encoding, sep, skip)
+                            jornada_layout = len(df.columns) == 2 and 'Colaborador' in str(df.columns[0])
+                            df = self._finalize_csv_frame(df, filepath, encoding, sep, skip)
+                            if df is not None:
+                                # Memoriza a combinação para as próximas mesclagens
+                                self.dialect_service.remember(
+                                    filepath,
+                                    {'encoding': encoding, 'sep': sep, 'skiprows': skip, 'jornada_layout': jornada_layout},
+                                    report_type=report_type
+                                )
+                                return df
                         
                         except Exception:
                             continue
@@ -234,143 +408,506 @@ class BIService:
         logger.warning(f"Não foi possível ler o arquivo: {filepath} (último erro: {last_error})")
         return pd.DataFrame()
     
-    def get_available_files(self) -> List[Dict[str, str]]:
+    def _read_csv(self, filepath: str, encoding: str, sep: str, skiprows: int,
+                  chunksize: Optional[int] = None, dtype: Optional[Dict] = None):
+        """
+        Lê o CSV com a combinação informada (compatível com pandas antigo e novo)
+        
+        Com chunksize retorna um leitor que produz blocos de até chunksize linhas;
+        dtype fixa o tipo das colunas (sem inferência por bloco).
+        """
+        try:
+            return pd.read_csv(filepath, encoding=encoding, sep=sep, skiprows=skiprows, on_bad_lines='skip', low_memory=False, chunksize=chunksize, dtype=dtype)
+        except TypeError:
+            # Versão antiga do pandas usa error_bad_lines
+            try:
+                return pd.read_csv(filepath, encoding=encoding, sep=sep, skiprows=skiprows, error_bad_lines=False, low_memory=False, chunksize=chunksize, dtype=dtype)
+            except TypeError:
+                return pd.read_csv(filepath, encoding=encoding, sep=sep, skiprows=skiprows, error_bad_lines=False, chunksize=chunksize, dtype=dtype)
+    
+    def _finalize_csv_frame(self, df: pd.DataFrame, filepath: str, encoding: str, sep: str,
+                            skip: int) -> Optional[pd.DataFrame]:
+        """
+        Valida e ajusta o DataFrame lido de um CSV
+        
+        Returns:
+            DataFrame normalizado, ou None se a combinação não gerou uma leitura válida
+        """
+        # Verifica se leitura foi bem-sucedida
+        if len(df) == 0:
+            return None
+        
+        # Se tem apenas 1 coluna, provavelmente o separador está errado
+        if len(df.columns) == 1:
+            return None
+        
+        # Tratamento especial para relatório de Jornada (formato diferente)
+        # Formato: primeira coluna é "Colaborador" e segunda é o nome do colaborador
+        if len(df.columns) == 2 and 'Colaborador' in str(df.columns[0]):
+            # Este é um relatório de Jornada com formato especial
+            # A primeira linha contém os nomes reais das colunas
+            if len(df) > 0:
+                # Usa a primeira linha como cabeçalho
+                new_header = df.iloc[0]
+                df = df[1:]
+                df.columns = new_header
+                df = df.reset_index(drop=True)
+        
+        # Verifica se tem colunas esperadas (Nome, CPF, Equipe, Data, Cargo, etc)
+        cols_upper = [str(c).upper() for c in df.columns]
+        cols_str = ' '.join(cols_upper)
+        
+        # Lista de palavras-chave que indicam um relatório válido
+        valid_keywords = ['NOME', 'CPF', 'EQUIPE', 'DATA', 'CARGO', 'COLABORADOR', 
+                        'TURNO', 'PIS', 'ADMISSAO', 'ADMISSÃO', 'DEMISSAO', 'DEMISSÃO',
+                        'FALTA', 'AUSENCIA', 'AUSÊNCIA', 'JORNADA', 'PONTO', 'HORA']
+        
+        has_valid_cols = any(keyword in cols_str for keyword in valid_keywords)
+        
+        if has_valid_cols and len(df) > 0 and len(df.columns) > 1:
+            logger.info(f"CSV lido com sucesso: {os.path.basename(filepath)} ({len(df)} linhas, {len(df.columns)} colunas, encoding={encoding}, sep='{sep}', skiprows={skip})")
+            return self._normalize_column_names(df)
+        elif len(df) > 0 and len(df.columns) > 1:
+            # Se tem dados mas não tem palavras-chave, ainda assim tenta processar
+            logger.warning(f"Arquivo sem colunas esperadas, mas processando mesmo assim: {os.path.basename(filepath)}")
+            return self._normalize_column_names(df)
+        return None
+    
+    def get_available_files(self, refresh: bool = False) -> List[Dict[str, str]]:
         """Lista todos os arquivos CSV/Excel em todas as subpastas da pasta raiz"""
-        root_folder = self._get_root_folder()
+        return self.list_files(refresh=refresh)['files']
+    
+    def list_files(self, folder: Optional[str] = None, report_type: Optional[str] = None,
+                   offset: int = 0, limit: Optional[int] = None, refresh: bool = False) -> Dict:
+        """
+        Consulta o catálogo de arquivos da pasta raiz (ver FileCatalogService.list_files)
         
-        if not os.path.exists(root_folder):
-            logger.warning(f"Pasta raiz não existe: {root_folder}")
-            return []
+        Cada arquivo traz tipo de relatório, período do nome do arquivo e,
+        se já foi lido antes, a quantidade de linhas.
+        """
+        return self.file_catalog.list_files(self._get_root_folder(), folder=folder, report_type=report_type,
+                                            offset=offset, limit=limit, refresh=refresh)
+    
+    def _describe_file(self, filename: str) -> Dict:
+        """Metadados derivados do nome do arquivo: tipo de relatório e período (ISO)"""
+        info = {'report_type': self._report_type_from_filename(filename), 'period_start': None, 'period_end': None}
+        match = PERIOD_FILENAME_PATTERN.search(filename)
+        if match:
+            d1, m1, y1, d2, m2, y2 = match.groups()
+            info['period_start'] = f"{y1}-{m1}-{d1}"
+            info['period_end'] = f"{y2}-{m2}-{d2}"
+        return info
+    
+    def _load_cached_report(self, filepath: str, run: BIRun) -> Optional[pd.DataFrame]:
+        """Frame do cache local ou do sidecar Parquet atualizado (None se o arquivo precisa ser lido)"""
+        df = self.parse_cache.load(filepath)
+        if df is None and run.settings.get('parquet_sidecars', True):
+            # Sidecar Parquet ao lado do relatório (gerado por uma leitura anterior)
+            df = self.sidecar_service.load(filepath)
+        return df
+    
+    def _store_report(self, filepath: str, df: pd.DataFrame, run: BIRun, use_cache: bool = True):
+        """Grava o frame recém-lido no cache local e no sidecar"""
+        if df.empty:
+            return
+        if use_cache:
+            self.parse_cache.store(filepath, df)
+        if run.settings.get('parquet_sidecars', True):
+            self.sidecar_service.write(filepath, df)
+    
+    def _load_report(self, filepath: str, run: BIRun, use_cache: bool = True) -> tuple:
+        """
+        Lê um relatório, reaproveitando o frame em cache quando o arquivo não mudou
+        
+        Ordem: cache local -> sidecar Parquet atualizado -> leitura do CSV/Excel.
+        
+        Returns:
+            (DataFrame, veio_do_cache)
+        """
+        with run.stage('leitura_arquivo', folder=os.path.basename(os.path.dirname(filepath)),
+                       file=os.path.basename(filepath)) as record:
+            if use_cache:
+                df = self._load_cached_report(filepath, run)
+                if df is not None:
+                    record.update(rows_out=len(df), source='cache')
+                    return df, True
+            
+            df = self._read_file_safe(filepath, run)
+            self._store_report(filepath, df, run, use_cache)
+            record.update(rows_out=len(df), source='arquivo')
+            return df, False
+    
+    def _load_reports(self, filepaths: List[str], run: BIRun, use_cache: bool = True) -> list:
+        """
+        Lê vários relatórios, em paralelo quando a chamada tem pool de leitura (run.executor)
         
-        files = []
-        extensions = ['*.csv', '*.xlsx', '*.xls']
+        Returns:
+            Lista na mesma ordem de filepaths com (DataFrame, veio_do_cache)
+            ou a exceção gerada na leitura do arquivo
+        """
+        executor = run.executor
+        results = []
         
-        # Busca recursivamente em todas as subpastas
-        for ext in extensions:
-            pattern = os.path.join(root_folder, '**', ext)
-            for filepath in glob.glob(pattern, recursive=True):
+        if executor is None or len(filepaths) < 2:
+            for filepath in filepaths:
                 try:
-                    filename = os.path.basename(filepath)
-                    relative_path = os.path.relpath(filepath, root_folder)
-                    size = os.path.getsize(filepath)
-                    
-                    files.append({
-                        'filename': filename,
-                        'relative_path': relative_path,
-                        'full_path': filepath,
-                        'folder': os.path.dirname(relative_path),
-                        'size': f"{size / 1024:.2f} KB"
-                    })
+                    results.append(self._load_report(filepath, run, use_cache=use_cache))
                 except Exception as e:
-                    logger.warning(f"Erro ao processar arquivo {filepath}: {str(e)}")
+                    results.append(e)
+            return results
+        
+        if isinstance(executor, ProcessPoolExecutor):
+            # Caches ficam no processo principal: só os arquivos novos/alterados vão para o pool
+            futures = []
+            for filepath in filepaths:
+                try:
+                    df = self._load_cached_report(filepath, run) if use_cache else None
+                    futures.append((df, True) if df is not None else executor.submit(_parse_report_in_worker, filepath))
+                except Exception as e:
+                    futures.append(e)
+            
+            for filepath, future in zip(filepaths, futures):
+                if not hasattr(future, 'result'):
+                    results.append(future)
                     continue
+                try:
+                    df, dialect, timing = future.result()
+                    if run.metrics is not None:
+                        # Leitura medida no processo do pool (CPU do processo, sem pico de memória)
+                        run.metrics.add({'stage': 'leitura_arquivo', 'folder': os.path.basename(os.path.dirname(filepath)),
+                                           'file': os.path.basename(filepath), 'rows_in': None, 'rows_out': len(df),
+                                           'source': 'processo', **timing})
+                    if dialect:
+                        report_type = self._report_type_from_filename(os.path.basename(filepath))
+                        self.dialect_service.remember(filepath, dialect, report_type=report_type)
+                    self._store_report(filepath, df, run, use_cache)
+                    results.append((df, False))
+                except Exception as e:
+                    results.append(e)
+            return results
         
-        return sorted(files, key=lambda x: (x['folder'], x['filename']))
+        futures = [executor.submit(self._load_report, filepath, run, use_cache) for filepath in filepaths]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
     
-    def _merge_files_from_same_folder(self, files: List[Dict[str, str]], folder: str) -> pd.DataFrame:
+    def _merge_files_from_same_folder(self, files: List[Dict[str, str]], folder: str, run: BIRun,
+                                      use_cache: bool = True) -> pd.DataFrame:
         """
         Mescla arquivos da mesma pasta concatenando verticalmente (append)
         
+        A leitura pode ser paralela (opção parse_mode); a ordem dos arquivos é mantida.
+        
         Args:
             files: Lista de arquivos da mesma pasta
             folder: Nome da pasta
+            run: Estado da mesclagem (opções, pool de leitura e métricas)
+            use_cache: Reaproveita frames de arquivos que não mudaram desde a última leitura
             
         Returns:
             DataFrame consolidado da pasta
         """
         root_folder = self._get_root_folder()
         dfs = []
+        cached_files = 0
         
         logger.info(f"Mesclando {len(files)} arquivos da pasta '{folder}'...")
         
+        to_read = []
         for file_info in files:
             filepath = file_info.get('full_path') or os.path.join(root_folder, file_info.get('relative_path', ''))
             
             if not os.path.exists(filepath):
                 logger.warning(f"Arquivo não encontrado: {filepath}")
                 continue
+            to_read.append((file_info, filepath))
+        
+        results = self._load_reports([filepath for _, filepath in to_read], run, use_cache=use_cache)
+        
+        for (file_info, filepath), result in zip(to_read, results):
+            if isinstance(result, Exception):
+                logger.error(f"Erro ao ler {filepath}: {str(result)}")
+                continue
             
-            try:
-                df = self._read_file_safe(filepath)
-                
-                if df.empty:
-                    logger.warning(f"DataFrame vazio: {file_info.get('filename')}")
-                    continue
-                
-                # Adiciona coluna com nome do arquivo fonte
-                df['_arquivo_fonte'] = file_info.get('filename')
-                
-                dfs.append(df)
-                logger.info(f"  ✓ {file_info.get('filename')}: {len(df)} linhas")
-                
-            except Exception as e:
-                logger.error(f"Erro ao ler {filepath}: {str(e)}")
+            df, from_cache = result
+            
+            if df.empty:
+                logger.warning(f"DataFrame vazio: {file_info.get('filename')}")
                 continue
+            
+            # Adiciona coluna com nome do arquivo fonte
+            df['_arquivo_fonte'] = file_info.get('filename')
+            
+            dfs.append(df)
+            if from_cache:
+                cached_files += 1
+            logger.info(f"  ✓ {file_info.get('filename')}: {len(df)} linhas{' (cache)' if from_cache else ''}")
         
         if not dfs:
             logger.warning(f"Nenhum arquivo válido na pasta '{folder}'")
             return pd.DataFrame()
         
         # Concatena todos os DataFrames verticalmente
-        merged_df = pd.concat(dfs, ignore_index=True, sort=False)
-        logger.info(f"Pasta '{folder}' consolidada: {len(merged_df)} linhas totais")
+        with run.stage('concat_pasta', folder=folder, rows_in=sum(len(df) for df in dfs)) as record:
+            merged_df = pd.concat(dfs, ignore_index=True, sort=False)
+            record['rows_out'] = len(merged_df)
+        logger.info(f"Pasta '{folder}' consolidada: {len(merged_df)} linhas totais ({cached_files}/{len(dfs)} arquivos do cache)")
         
         return merged_df
     
-    def merge_reports(self, selected_files: List[Dict[str, str]] = None, progress_callback=None) -> pd.DataFrame:
+    def _stream_chunk_rows(self, filepath: str, run: BIRun) -> int:
+        """Linhas por bloco no modo streaming, estimadas pelo tamanho médio das linhas do início do arquivo"""
+        budget = float(run.settings.get('stream_memory_mb') or BI_DEFAULT_SETTINGS['stream_memory_mb']) * 1024 * 1024
+        with open(filepath, 'rb') as f:
+            sample = f.read(64 * 1024)
+        line_bytes = max(len(sample) / max(sample.count(b'\n'), 1), 1)
+        return max(STREAM_MIN_CHUNK_ROWS, int(budget / STREAM_CHUNK_SHARE / (line_bytes * STREAM_MEMORY_FACTOR)))
+    
+    def _slice_frame(self, df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+    
+    def _stream_dtypes(self, filepath: str, dialect: Dict, chunk_rows: int) -> Dict[str, str]:
         """
-        Mescla múltiplos relatórios CSV/Excel em uma base única
+        Tipos que a leitura do arquivo inteiro inferiria, para fixar nos blocos do streaming
+        
+        read_csv(chunksize) infere o tipo em cada bloco: uma coluna vazia em um bloco e
+        inteira em outro sairia float só naquele bloco ("5.0" em vez de "5"). Uma passada
+        prévia em blocos junta os tipos vistos com a regra da inferência do arquivo inteiro:
+        mesmo tipo em todos fica; só números vira float; qualquer outra mistura vira texto.
+        """
+        kinds = {}
+        reader = self._read_csv(filepath, dialect['encoding'], dialect['sep'], dialect['skiprows'],
+                                chunksize=chunk_rows)
+        try:
+            for chunk in reader:
+                for col, dtype in chunk.dtypes.items():
+                    kinds.setdefault(col, set()).add(dtype)
+        finally:
+            reader.close()
+        
+        dtypes = {}
+        for col, seen in kinds.items():
+            if len(seen) == 1 and next(iter(seen)).kind in 'biuf':
+                dtypes[col] = next(iter(seen))
+            elif all(dtype.kind in 'iuf' for dtype in seen):
+                dtypes[col] = 'float64'
+            else:
+                dtypes[col] = str
+        return dtypes
+    
+    def _iter_report_chunks(self, filepath: str, run: BIRun, use_cache: bool = True) -> Iterator[pd.DataFrame]:
+        """
+        Lê um relatório em blocos (modo streaming)
+        
+        Ordem: sidecar Parquet em lotes -> CSV em blocos com o dialeto detectado e os
+        tipos do arquivo inteiro (_stream_dtypes). O cache local não é usado: carregaria
+        o frame inteiro. Excel e CSVs que o dialeto não resolve são lidos inteiros pela
+        leitura normal e fatiados.
+        """
+        chunk_rows = self._stream_chunk_rows(filepath, run)
+        
+        if use_cache and run.settings.get('parquet_sidecars', True) and self.sidecar_service.is_fresh(filepath):
+            yield from self.sidecar_service.iter_batches(filepath, chunk_rows)
+            return
+        
+        file_ext = os.path.splitext(filepath)[1].lower()
+        if file_ext in ['.xlsx', '.xls'] or os.path.getsize(filepath) < 200:
+            yield from self._slice_frame(self._read_file_safe(filepath, run), chunk_rows)
+            return
+        
+        report_type = self._report_type_from_filename(os.path.basename(filepath))
+        with run.stage('dialeto', file=os.path.basename(filepath)):
+            dialect = self.dialect_service.get_dialect(filepath, report_type=report_type,
+                                                       skiprows_hint=self._skiprows_hint(filepath))
+        reader = None
+        first = None
+        if dialect:
+            try:
+                dtypes = run.stream_dtypes.get(filepath)
+                if dtypes is None:
+                    dtypes = run.stream_dtypes[filepath] = self._stream_dtypes(filepath, dialect, chunk_rows)
+                reader = self._read_csv(filepath, dialect['encoding'], dialect['sep'], dialect['skiprows'],
+                                        chunksize=chunk_rows, dtype=dtypes)
+                first = next(reader, None)
+                if first is not None:
+                    first = self._finalize_csv_frame(first, filepath, dialect['encoding'], dialect['sep'], dialect['skiprows'])
+            except Exception as e:
+                logger.warning(f"Dialeto detectado falhou em {os.path.basename(filepath)}: {str(e)}")
+                first = None
+        
+        if first is None:
+            if reader is not None:
+                reader.close()
+            if dialect:
+                self.dialect_service.forget(filepath)
+            yield from self._slice_frame(self._read_file_safe(filepath, run), chunk_rows)
+            return
+        
+        try:
+            # Blocos seguintes usam o cabeçalho do primeiro (inclusive o promovido da Jornada)
+            columns = first.columns
+            yield first
+            for chunk in reader:
+                chunk.columns = columns
+                yield chunk
+        finally:
+            reader.close()
+    
+    def _stream_folder_schema(self, filepaths: Dict[str, str], run: BIRun, use_cache: bool = True) -> pd.DataFrame:
+        """
+        Colunas e tipos que a concatenação da pasta (_merge_files_from_same_folder) teria
+        
+        Lê só o primeiro bloco de cada arquivo e concatena a primeira linha de cada um:
+        a união das colunas sai na mesma ordem e com as mesmas promoções de tipo
+        (inteiro ausente em um arquivo vira float). Arquivos ilegíveis ou vazios ficam de
+        fora, como na leitura em memória.
         
         Args:
-            selected_files: Lista de dicionários com informações dos arquivos.
-                          Se None, processa todos os arquivos disponíveis.
-            progress_callback: Função callback para reportar progresso (0-100)
+            filepaths: {caminho: nome do arquivo}, na ordem da pasta
         
         Returns:
-            DataFrame consolidado com todos os dados mesclados
+            DataFrame vazio com as colunas e tipos da pasta
         """
-        root_folder = self._get_root_folder()
-        
-        if selected_files is None:
-            # Processa todos os arquivos disponíveis
-            selected_files = self.get_available_files()
+        heads = []
+        for filepath, filename in filepaths.items():
+            chunks = self._iter_report_chunks(filepath, run, use_cache=use_cache)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                logger.warning(f"Erro ao ler o cabeçalho de {filename}: {str(e)}")
+                continue
+            finally:
+                chunks.close()
+            if first is None or first.empty:
+                continue
+            heads.append(first.iloc[:1].assign(_arquivo_fonte=filename))
         
-        if not selected_files:
-            logger.warning("Nenhum arquivo encontrado para processar")
+        if not heads:
             return pd.DataFrame()
+        return pd.concat(heads, ignore_index=True, sort=False).iloc[:0]
+    
+    def _align_chunk(self, chunk: pd.DataFrame, schema: pd.DataFrame) -> pd.DataFrame:
+        """Reindexa um bloco para as colunas e tipos da pasta (colunas ausentes ficam vazias)"""
+        chunk = chunk.reindex(columns=schema.columns)
+        casts = {col: dtype for col, dtype in schema.dtypes.items() if chunk[col].dtype != dtype}
+        return chunk.astype(casts) if casts else chunk
+    
+    def _merge_streaming(self, files_by_folder: Dict[str, List[Dict[str, str]]], run: BIRun,
+                         use_cache: bool = True, progress_callback=None) -> pd.DataFrame:
+        """
+        Etapas 1 e 2 em blocos: cada bloco de cada arquivo é consolidado e incorporado
+        ao acumulador por chave, sem manter os frames das pastas em memória.
         
-        # Agrupa arquivos por pasta
-        files_by_folder = {}
-        for file_info in selected_files:
-            folder = file_info.get('folder', 'root')
-            if folder not in files_by_folder:
-                files_by_folder[folder] = []
-            files_by_folder[folder].append(file_info)
-        
-        logger.info(f"Total de pastas a processar: {len(files_by_folder)}")
+        Gera a mesma base de _consolidate_vectorized (a ordem de pastas, arquivos e
+        linhas é a mesma e o primeiro valor não-vazio continua vencendo). Arquivos de
+        esquemas diferentes na mesma pasta: cada bloco é reindexado para a união das
+        colunas da pasta (_stream_folder_schema), como a concatenação faria.
         
-        # ETAPA 1: Mescla arquivos dentro de cada pasta
-        merged_by_folder = {}
+        Returns:
+            DataFrame indexado pela chave, antes do preenchimento
+        """
+        root_folder = self._get_root_folder()
         total_folders = len(files_by_folder)
+        consolidated = None
         
-        for idx, (folder, files) in enumerate(files_by_folder.items()):
+        for idx, (folder, files) in enumerate(files_by_folder.items(), start=1):
             if progress_callback:
-                progress_callback(f"Mesclando pasta {idx+1}/{total_folders}: {folder}")
+                progress_callback(f"Mesclando pasta {idx}/{total_folders} em blocos: {folder}")
+            run.notify_stage('leitura', idx - 1, total_folders)
             
-            merged_df = self._merge_files_from_same_folder(files, folder)
-            if not merged_df.empty:
-                merged_by_folder[folder] = merged_df
+            logger.info(f"Mesclando {len(files)} arquivos da pasta '{folder}' em blocos...")
+            folder_rows = 0
+            
+            filepaths = {}
+            for file_info in files:
+                filepath = file_info.get('full_path') or os.path.join(root_folder, file_info.get('relative_path', ''))
+                if not os.path.exists(filepath):
+                    logger.warning(f"Arquivo não encontrado: {filepath}")
+                    continue
+                filepaths[filepath] = file_info.get('filename')
+            
+            with run.stage('esquema_pasta', folder=folder) as record:
+                schema = self._stream_folder_schema(filepaths, run, use_cache)
+                record['columns'] = len(schema.columns)
+            
+            for file_info in files:
+                filepath = file_info.get('full_path') or os.path.join(root_folder, file_info.get('relative_path', ''))
+                if filepath not in filepaths:
+                    continue
+                
+                file_rows = 0
+                chunks = 0
+                try:
+                    # No streaming, leitura_arquivo inclui a consolidação dos blocos (também medida à parte)
+                    with run.stage('leitura_arquivo', folder=folder, file=file_info.get('filename')) as record:
+                        for chunk in self._iter_report_chunks(filepath, run, use_cache=use_cache):
+                            if chunk.empty:
+                                continue
+                            chunk = self._align_chunk(chunk.assign(_arquivo_fonte=file_info.get('filename')), schema)
+                            file_rows += len(chunk)
+                            chunks += 1
+                            
+                            with run.stage('consolidacao', folder=folder, rows_in=len(chunk)) as chunk_record:
+                                partial = self._consolidate_folder_frame(self._filter_invalid_rows(chunk), folder, run)
+                                consolidated = self._fold_partial(consolidated, partial)
+                                chunk_record['rows_out'] = len(partial)
+                            del chunk, partial
+                        record.update(rows_out=file_rows, source='blocos', chunks=chunks)
+                except Exception as e:
+                    logger.error(f"Erro ao ler {filepath} (blocos já incorporados: {chunks}): {str(e)}")
+                    continue
+                
+                if file_rows == 0:
+                    logger.warning(f"DataFrame vazio: {file_info.get('filename')}")
+                    continue
+                folder_rows += file_rows
+                logger.info(f"  ✓ {file_info.get('filename')}: {file_rows} linhas em {chunks} bloco(s)")
+            
+            logger.info(f"Pasta '{folder}' incorporada: {folder_rows} linhas, "
+                        f"{0 if consolidated is None else len(consolidated)} chaves acumuladas")
         
-        if not merged_by_folder:
-            logger.warning("Nenhuma pasta gerou dados válidos")
+        if consolidated is None or consolidated.empty:
             return pd.DataFrame()
         
-        logger.info(f"Pastas consolidadas: {len(merged_by_folder)}")
+        return self._join_set_columns(consolidated)
+    
+    def _filter_invalid_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Remove linhas inválidas (Resumo, Total, valores numéricos ou vazios no Nome)"""
+        if 'Nome' not in df.columns:
+            return df
         
-        # ETAPA 2: Mescla dados de diferentes pastas por CPF/Nome+Equipe
+        original_len = len(df)
+        # Remove linhas com valores específicos de resumo
+        df = df[~df['Nome'].astype(str).str.strip().str.upper().isin(['RESUMO', 'TOTAL'])]
+        # Remove linhas onde Nome é apenas números (ex: "123")
+        df = df[~df['Nome'].astype(str).str.strip().str.match(r'^\d+$', na=False)]
+        # Remove linhas completamente vazias no Nome
+        df = df[df['Nome'].notna()]
+        df = df[df['Nome'].astype(str).str.strip() != '']
+        
+        filtered_count = original_len - len(df)
+        if filtered_count > 0:
+            logger.info(f"Filtradas {filtered_count} linhas inválidas (Resumo/Total/vazias)")
+        return df
+    
+    def _consolidate_rows(self, merged_by_folder: Dict[str, pd.DataFrame], total_folders: int,
+                          progress_callback=None, run: Optional[BIRun] = None) -> pd.DataFrame:
+        """
+        Consolida as pastas linha a linha (caminho original, baseado em dicionários)
+        
+        run: estado da mesclagem (stage_callback e resolução de nomes); None = sem eles
+        
+        Returns:
+            DataFrame indexado pela chave (CPF:... ou COMP:NOME|EQUIPE), antes do preenchimento
+        """
         # Dicionário para armazenar dados consolidados
         # Chave: CPF ou NOME|EQUIPE
         consolidated_data = {}
+        resolver = run.employee_resolver if run else None
         
         folder_idx = 0
         for folder, df in merged_by_folder.items():
@@ -378,6 +915,8 @@ class BIService:
             
             if progress_callback:
                 progress_callback(f"Consolidando pasta {folder_idx}/{total_folders}: {folder}")
+            if run:
+                run.notify_stage('consolidacao', folder_idx - 1, total_folders)
             
             logger.info(f"Processando pasta consolidada: {folder} ({len(df)} linhas)")
             
@@ -386,20 +925,10 @@ class BIService:
             has_nome = 'Nome' in df.columns
             has_equipe = 'Equipe' in df.columns
             
-            # Filtra linhas inválidas (Resumo, Total, valores numéricos no Nome)
-            if has_nome:
-                original_len = len(df)
-                # Remove linhas com valores específicos de resumo
-                df = df[~df['Nome'].astype(str).str.strip().str.upper().isin(['RESUMO', 'TOTAL'])]
-                # Remove linhas onde Nome é apenas números (ex: "123")
-                df = df[~df['Nome'].astype(str).str.strip().str.match(r'^\d+$', na=False)]
-                # Remove linhas completamente vazias no Nome
-                df = df[df['Nome'].notna()]
-                df = df[df['Nome'].astype(str).str.strip() != '']
-                
-                filtered_count = original_len - len(df)
-                if filtered_count > 0:
-                    logger.info(f"Filtradas {filtered_count} linhas inválidas (Resumo/Total/vazias)")
+            df = self._filter_invalid_rows(df)
+            
+            # Coluna de destino de cada coluna (as datas do PontoMais vão para 'Data')
+            target_names = {col: f"{col}_{folder}" if folder else col for col in df.columns}
             
             processed_rows = 0
             skipped_rows = 0
@@ -413,6 +942,12 @@ class BIService:
                         if cpf:
                             key = f"CPF:{cpf}"
                     
+                    # Sem CPF válido: CPF da dimensão de colaboradores pelo nome (e equipe)
+                    if not key and has_nome and resolver is not None:
+                        cpf = resolver.resolve_one(row.get('Nome'), row.get('Equipe'))
+                        if cpf:
+                            key = f"CPF:{cpf}"
+                    
                     # Se não tem CPF, usa NOME+EQUIPE
                     if not key and has_nome and has_equipe:
                         composite = self._create_composite_key(row)
@@ -428,7 +963,7 @@ class BIService:
                     # Inicializa registro se não existe
                     if key not in consolidated_data:
                         consolidated_data[key] = {
-                            'CPF': self._extract_cpf(row.get('CPF')) if has_cpf else None,
+                            'CPF': key[4:] if key.startswith('CPF:') else None,
                             'Nome': row.get('Nome', ''),
                             'Equipe': row.get('Equipe', ''),
                             '_source_files': []
@@ -459,20 +994,12 @@ class BIService:
                         if pd.isna(value) or value == '':
                             continue
                         
-                        # Detecta se é coluna de data (formato: "Dia, DD/MM/AAAA")
-                        is_date_col = False
-                        if isinstance(value, str):
-                            # Verifica padrão de data do PontoMais
-                            date_pattern = r'^(Seg|Ter|Qua|Qui|Sex|Sáb|Sab|Dom),?\s*\d{2}/\d{2}/\d{4}'
-                            if re.match(date_pattern, value):
-                                is_date_col = True
-                        
-                        # Se é coluna de data, unifica em uma única coluna "Data"
-                        if is_date_col:
+                        # Valor de data ("Dia, DD/MM/AAAA") unifica em 'Data'; os demais
+                        # têm nome único por PASTA (não por arquivo)
+                        if isinstance(value, str) and PONTOMAIS_DATE_REGEX.match(value):
                             col_name = 'Data'
                         else:
-                            # Cria nome de coluna único por PASTA (não por arquivo)
-                            col_name = f"{col}_{folder}" if folder else col
+                            col_name = target_names[col]
                         
                         # Armazena o valor (se já existe, mantém o primeiro)
                         if col_name not in consolidated_data[key]:
@@ -494,11 +1021,351 @@ class BIService:
             if col.startswith('Arquivo_'):
                 result_df[col] = result_df[col].apply(lambda x: '; '.join(sorted(x)) if isinstance(x, (list, set)) else x)
         
+        return result_df
+    
+    def _date_mask(self, values: pd.Series) -> pd.Series:
+        """
+        Indica, por valor, se é uma data do PontoMais ("Dia, DD/MM/AAAA")
+        
+        Mesmo teste do caminho linha a linha (só textos, regex no início do valor),
+        com um único str.match por coluna.
+        """
+        values = values.astype(object)
+        if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+            return values.str.match(PONTOMAIS_DATE_REGEX, na=False).astype(bool)
+        
+        # Tipos misturados (ex: datas do Excel e textos): só os textos são testados
+        is_text = values.map(lambda value: isinstance(value, str)).astype(bool)
+        mask = pd.Series(False, index=values.index)
+        if is_text.any():
+            mask[is_text] = values[is_text].str.match(PONTOMAIS_DATE_REGEX, na=False).astype(bool)
+        return mask
+    
+    def _to_text(self, series: pd.Series) -> pd.Series:
+        """Converte uma coluna para texto como str() faria em cada célula (NaN -> 'nan')"""
+        return series.astype(object).where(series.notna(), 'nan').astype(str)
+    
+    def _extract_cpf_series(self, series: pd.Series) -> pd.Series:
+        """Versão vetorizada de _extract_cpf: retorna os 11 dígitos do CPF ou NaN"""
+        digits = self._to_text(series).str.strip().str.replace(r'\D', '', regex=True)
+        return digits.where(series.notna() & (digits.str.len() == 11)).astype(object)
+    
+    def _build_keys(self, df: pd.DataFrame, resolver=None) -> pd.Series:
+        """
+        Calcula a chave de consolidação de todas as linhas de uma vez
+        
+        Mesma regra do caminho linha a linha: CPF:<cpf> quando o CPF é válido
+        ou o nome resolve na dimensão de colaboradores (resolver), senão
+        COMP:<NOME>|<EQUIPE>, senão NaN (linha ignorada).
+        """
+        keys = pd.Series(np.nan, index=df.index, dtype=object)
+        
+        if 'CPF' in df.columns:
+            cpfs = self._extract_cpf_series(df['CPF'])
+            keys = ('CPF:' + cpfs).where(cpfs.notna(), np.nan)
+        
+        if 'Nome' in df.columns and resolver is not None:
+            missing = keys.isna()
+            if missing.any():
+                cpfs = resolver.resolve(df.loc[missing, 'Nome'],
+                                        df.loc[missing, 'Equipe'] if 'Equipe' in df.columns else None)
+                keys[missing] = ('CPF:' + cpfs).where(cpfs.notna(), np.nan)
+        
+        if 'Nome' in df.columns and 'Equipe' in df.columns:
+            nome = self._to_text(df['Nome']).str.strip().str.upper()
+            equipe = self._to_text(df['Equipe']).str.strip().str.upper()
+            composite = ('COMP:' + nome + '|' + equipe).where((nome != '') & (equipe != ''), np.nan)
+            keys = keys.where(keys.notna(), composite)
+        
+        return keys.astype(object)
+    
+    def _consolidate_folder_frame(self, df: pd.DataFrame, folder: str, run: Optional[BIRun] = None) -> pd.DataFrame:
+        """
+        Consolida uma pasta em um frame com uma linha por chave, sem laço por linha
+        
+        Reproduz a semântica do caminho original: o primeiro valor não-vazio
+        (na ordem das linhas e, dentro da linha, na ordem das colunas) vence.
+        
+        Returns:
+            DataFrame indexado pela chave, na ordem da primeira ocorrência.
+            As colunas '_source_files' e 'Arquivo_<pasta>' contêm sets.
+        """
+        with self._stage(run, 'chaves', folder=folder, rows_in=len(df)) as record:
+            keys = self._build_keys(df, run.employee_resolver if run else None)
+            valid = keys.notna()
+            record['rows_out'] = int(valid.sum())
+        skipped_rows = int((~valid).sum())
+        df = df[valid]
+        keys = keys[valid]
+        
+        logger.info(f"Pasta '{folder}' processada: {len(df)} linhas válidas, {skipped_rows} linhas ignoradas")
+        
+        if df.empty:
+            return pd.DataFrame()
+        
+        codes, uniques = pd.factorize(keys)
+        first_rows = np.zeros(len(df), dtype=bool)
+        first_rows[np.unique(codes, return_index=True)[1]] = True
+        head = df[first_rows]
+        
+        partial = pd.DataFrame(index=pd.Index(uniques, dtype=object))
+        # CPF da chave: o do relatório ou o resolvido pela dimensão de colaboradores
+        cpf_keys = pd.Series(uniques, dtype=object)
+        partial['CPF'] = cpf_keys.str[4:].where(cpf_keys.str.startswith('CPF:')).to_numpy()
+        partial['Nome'] = head['Nome'].to_numpy() if 'Nome' in df.columns else ''
+        partial['Equipe'] = head['Equipe'].to_numpy() if 'Equipe' in df.columns else ''
+        
+        source_label = folder if folder != 'root' else 'Raiz'
+        partial['_source_files'] = [{source_label} for _ in range(len(partial))]
+        
+        if folder and folder != 'root':
+            arquivos = pd.DataFrame({'codes': codes, 'arquivo': df['_arquivo_fonte'].to_numpy()
+                                     if '_arquivo_fonte' in df.columns else None})
+            arquivos = arquivos[arquivos['arquivo'].notna() & (arquivos['arquivo'] != '')].drop_duplicates()
+            per_key = arquivos.groupby('codes')['arquivo'].agg(set)
+            partial[f"Arquivo_{folder}"] = [per_key.get(code, set()) for code in range(len(partial))]
+        
+        # Agrupa as colunas de origem pela coluna de destino ('Data' ou '<col>_<pasta>')
+        targets = {}
+        for pos, col in enumerate(df.columns):
+            if col in ['Nome', 'Equipe', 'CPF', '_arquivo_fonte']:
+                continue
+            
+            values = df.iloc[:, pos]
+            target_name = f"{col}_{folder}" if folder else col
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(object)
+            
+            if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+                # Pula valores vazios; valores no padrão de data do PontoMais vão para 'Data'
+                non_empty = values.notna() & (values != '')
+                is_date = non_empty & self._date_mask(values)
+                targets.setdefault('Data', []).append(values.astype(object).where(is_date))
+                targets.setdefault(target_name, []).append(values.astype(object).where(non_empty & ~is_date))
+            else:
+                # Colunas numéricas nunca são datas; NaN é ignorado pelo first()
+                targets.setdefault(target_name, []).append(values)
+        
+        columns = {}
+        for target_name, candidates in targets.items():
+            combined = candidates[0]
+            for candidate in candidates[1:]:
+                combined = combined.where(combined.notna(), candidate)
+            columns[target_name] = combined.to_numpy()
+        
+        if columns:
+            values_df = pd.DataFrame(columns)
+            firsts = values_df.groupby(codes, sort=True).first()
+            firsts = firsts.reindex(range(len(partial)))
+            firsts.index = partial.index
+            firsts = firsts.dropna(axis=1, how='all')
+            partial = pd.concat([partial, firsts.drop(columns=[c for c in firsts.columns if c in partial.columns])], axis=1)
+        
+        return partial
+    
+    def _fold_partial(self, acc: Optional[pd.DataFrame], partial: pd.DataFrame) -> pd.DataFrame:
+        """
+        Incorpora um frame parcial (uma pasta ou um bloco) ao acumulador por chave
+        
+        Chaves novas entram no fim, na ordem em que aparecem. Para chaves já
+        existentes, CPF/Nome/Equipe não mudam, as demais colunas só são
+        preenchidas onde ainda estão vazias e os sets de origem são unidos.
+        """
+        if acc is None or acc.empty:
+            return partial
+        if partial.empty:
+            return acc
+        
+        set_columns = [c for c in partial.columns if c == '_source_files' or c.startswith('Arquivo_')]
+        new_keys = partial.index[~partial.index.isin(acc.index)]
+        merged = acc.reindex(acc.index.append(new_keys))
+        partial = partial.reindex(merged.index)
+        is_new = np.zeros(len(merged), dtype=bool)
+        is_new[len(acc):] = True
+        
+        added = {}
+        for col in partial.columns:
+            if col not in merged.columns:
+                added[col] = partial[col]
+                continue
+            
+            current = merged[col]
+            if col in ['CPF', 'Nome', 'Equipe']:
+                merged[col] = current.where(~is_new, partial[col])
+            elif col in set_columns:
+                combined = current.astype(object).to_numpy(copy=True)
+                incoming = partial[col].to_numpy()
+                for i in np.flatnonzero(pd.notna(incoming)):
+                    current_value = combined[i]
+                    combined[i] = current_value | incoming[i] if isinstance(current_value, set) else incoming[i]
+                merged[col] = combined
+            else:
+                merged[col] = current.where(current.notna(), partial[col])
+        
+        if added:
+            merged = pd.concat([merged, pd.DataFrame(added, index=merged.index)], axis=1)
+        return merged
+    
+    def _consolidate_vectorized(self, merged_by_folder: Dict[str, pd.DataFrame], total_folders: int,
+                                progress_callback=None, run: Optional[BIRun] = None) -> pd.DataFrame:
+        """
+        Consolida as pastas com operações colunares (factorize + groupby.first)
+        
+        Produz o mesmo resultado de _consolidate_rows, sem iterrows nem regex por célula.
+        """
+        consolidated = None
+        
+        for folder_idx, (folder, df) in enumerate(merged_by_folder.items(), start=1):
+            if progress_callback:
+                progress_callback(f"Consolidando pasta {folder_idx}/{total_folders}: {folder}")
+            if run:
+                run.notify_stage('consolidacao', folder_idx - 1, total_folders)
+            
+            logger.info(f"Processando pasta consolidada: {folder} ({len(df)} linhas)")
+            
+            with self._stage(run, 'consolidacao', folder=folder, rows_in=len(df)) as record:
+                df = self._filter_invalid_rows(df)
+                partial = self._consolidate_folder_frame(df, folder, run)
+                consolidated = self._fold_partial(consolidated, partial)
+                record['rows_out'] = len(partial)
+        
+        if consolidated is None or consolidated.empty:
+            return pd.DataFrame()
+        
+        return self._join_set_columns(consolidated)
+    
+    def _join_set_columns(self, consolidated: pd.DataFrame) -> pd.DataFrame:
+        """Converte sets de pastas/arquivos fonte em strings"""
+        for col in consolidated.columns:
+            if col == '_source_files' or col.startswith('Arquivo_'):
+                consolidated[col] = consolidated[col].apply(lambda x: '; '.join(sorted(x)) if isinstance(x, (list, set)) else x)
+        
+        return consolidated
+    
+    def merge_reports(self, selected_files: List[Dict[str, str]] = None, progress_callback=None,
+                      vectorized: bool = False, use_cache: bool = True, streaming: bool = False,
+                      stage_callback=None, return_stats: bool = False):
+        """
+        Mescla múltiplos relatórios CSV/Excel em uma base única
+        
+        Args:
+            selected_files: Lista de dicionários com informações dos arquivos.
+                          Se None, processa todos os arquivos disponíveis.
+            progress_callback: Função callback para reportar progresso (0-100)
+            vectorized: Se True, usa a consolidação colunar (groupby) em vez do
+                        laço linha a linha. Deve gerar exatamente a mesma base.
+            use_cache: Só lê arquivos novos ou alterados; os demais vêm do cache local
+            streaming: Lê e consolida os arquivos em blocos dentro do orçamento
+                       stream_memory_mb, sem manter as pastas inteiras em memória
+            stage_callback: Função chamada com (etapa, concluídas, total) no início de
+                            cada pasta/etapa; etapas em MERGE_STAGES
+            return_stats: Retorna também as estatísticas e métricas desta mesclagem
+                          (last_merge_stats/last_merge_metrics podem já ser de outra)
+        
+        Returns:
+            DataFrame consolidado com todos os dados mesclados; com return_stats,
+            (DataFrame, estatísticas, StageMetrics)
+        """
+        mode = 'streaming' if streaming else ('vectorized' if vectorized else 'rows')
+        
+        with PeakRSSMonitor() as monitor:
+            run = self._new_run(StageMetrics(mode, monitor), stage_callback)
+            try:
+                result_df = self._run_merge(selected_files, run, progress_callback, vectorized, use_cache, streaming)
+            finally:
+                self._flush_caches()
+            run.metrics.finish()
+        
+        metrics = run.metrics
+        stats = {
+            'mode': mode,
+            'records': len(result_df),
+            'columns': len(result_df.columns),
+            'start_rss_mb': monitor.start_mb,
+            'peak_rss_mb': monitor.peak_mb,
+        }
+        if streaming:
+            stats['memory_budget_mb'] = run.settings.get('stream_memory_mb')
+        if run.memory_reports:
+            stats['memory'] = run.memory_reports
+        stats['stages'] = metrics.summary()['stages']
+        self.last_merge_metrics = metrics
+        self.last_merge_stats = stats
+        self.metrics_history.append(metrics)
+        logger.info(f"Pico de memória da mesclagem ({mode}): {monitor.peak_mb} MB (início: {monitor.start_mb} MB)")
+        
+        if return_stats:
+            return result_df, dict(stats), metrics
+        return result_df
+    
+    def _run_merge(self, selected_files: Optional[List[Dict[str, str]]], run: BIRun, progress_callback,
+                   vectorized: bool, use_cache: bool, streaming: bool) -> pd.DataFrame:
+        """Executa a mesclagem (ver merge_reports)"""
+        
+        if selected_files is None:
+            # Processa todos os arquivos disponíveis
+            selected_files = self.get_available_files()
+            if use_cache:
+                removed = self.parse_cache.prune()
+                if removed:
+                    logger.info(f"Cache: {removed} arquivo(s) removido(s) da origem descartado(s)")
+        
+        if not selected_files:
+            logger.warning("Nenhum arquivo encontrado para processar")
+            return pd.DataFrame()
+        
+        # Agrupa arquivos por pasta
+        files_by_folder = {}
+        for file_info in selected_files:
+            folder = file_info.get('folder', 'root')
+            if folder not in files_by_folder:
+                files_by_folder[folder] = []
+            files_by_folder[folder].append(file_info)
+        
+        logger.info(f"Total de pastas a processar: {len(files_by_folder)}")
+        
+        if run.settings.get('employee_dimension', True):
+            with run.stage('dimensao_colaboradores') as record:
+                run.employee_resolver = self._load_employee_resolver(use_cache)
+                record['rows_out'] = len(run.employee_resolver) if run.employee_resolver is not None else 0
+        
+        if streaming:
+            # ETAPAS 1 e 2 em blocos, com memória limitada
+            result_df = self._merge_streaming(files_by_folder, run, use_cache, progress_callback)
+        else:
+            result_df = self._merge_in_memory(files_by_folder, run, use_cache, vectorized, progress_callback)
+        
+        if result_df.empty:
+            return result_df
+        
         # Preenche valores em branco com dados de outras linhas do mesmo CPF/Nome+Equipe
+        run.notify_stage('preenchimento', 0, 1)
         logger.info("Preenchendo valores em branco...")
-        result_df = self._fill_missing_values(result_df)
+        with run.stage('preenchimento', rows_in=len(result_df)) as record:
+            result_df = self._fill_missing_values(result_df)
+            record['rows_out'] = len(result_df)
         
         # Reorganiza colunas: CPF, Nome, Equipe primeiro, depois Data, depois colunas Arquivo_*
+        with run.stage('ordenacao_colunas', rows_in=len(result_df)) as record:
+            result_df = self._order_columns(result_df)
+            record['rows_out'] = len(result_df)
+        
+        if run.settings.get('optimize_dtypes') or run.settings.get('typed_columns'):
+            typed = bool(run.settings.get('typed_columns'))
+            with run.stage('otimizacao_tipos', rows_in=len(result_df)) as record:
+                if run.settings.get('memory_report'):
+                    result_df, run.memory_reports['result'] = optimize_with_report(result_df, 'base consolidada',
+                                                                                   typed=typed)
+                else:
+                    result_df = optimize_dtypes(result_df, typed=typed)
+                record['rows_out'] = len(result_df)
+        
+        logger.info(f"Base consolidada criada: {len(result_df)} registros únicos")
+        
+        return result_df
+    
+    def _order_columns(self, result_df: pd.DataFrame) -> pd.DataFrame:
+        """CPF, Nome, Equipe, Data, colunas Arquivo_*, _source_files e as demais em ordem alfabética"""
         cols = ['CPF', 'Nome', 'Equipe']
         if 'Data' in result_df.columns:
             cols.append('Data')
@@ -511,20 +1378,371 @@ class BIService:
         
         # Outras colunas
         other_cols = [c for c in result_df.columns if c not in cols]
-        result_df = result_df[cols + sorted(other_cols)]
+        return result_df[cols + sorted(other_cols)]
+    
+    def _merge_in_memory(self, files_by_folder: Dict[str, List[Dict[str, str]]], run: BIRun, use_cache: bool,
+                         vectorized: bool, progress_callback=None) -> pd.DataFrame:
+        """
+        Etapa 1 (uma tabela por pasta) seguida da etapa 2 (consolidação por chave)
         
-        logger.info(f"Base consolidada criada: {len(result_df)} registros únicos")
+        Returns:
+            DataFrame indexado pela chave, antes do preenchimento
+        """
+        # ETAPA 1: Mescla arquivos dentro de cada pasta
+        merged_by_folder = {}
+        total_folders = len(files_by_folder)
+        
+        with self._parse_pool(run):
+            for idx, (folder, files) in enumerate(files_by_folder.items()):
+                if progress_callback:
+                    progress_callback(f"Mesclando pasta {idx+1}/{total_folders}: {folder}")
+                run.notify_stage('leitura', idx, total_folders)
+                
+                merged_df = self._merge_files_from_same_folder(files, folder, run, use_cache=use_cache)
+                if merged_df.empty:
+                    continue
+                if run.settings.get('optimize_dtypes'):
+                    # Só trocas que não mudam os valores: as datas seguem em texto para a etapa 2
+                    with run.stage('otimizacao_tipos', folder=folder, rows_in=len(merged_df)) as record:
+                        if run.settings.get('memory_report'):
+                            merged_df, report = optimize_with_report(merged_df, f"pasta '{folder}'")
+                            run.memory_reports.setdefault('folders', {})[folder] = report
+                        else:
+                            merged_df = optimize_dtypes(merged_df)
+                        record['rows_out'] = len(merged_df)
+                merged_by_folder[folder] = merged_df
+        
+        if not merged_by_folder:
+            logger.warning("Nenhuma pasta gerou dados válidos")
+            return pd.DataFrame()
+        
+        logger.info(f"Pastas consolidadas: {len(merged_by_folder)}")
+        
+        # ETAPA 2: Mescla dados de diferentes pastas por CPF/Nome+Equipe
+        if vectorized:
+            result_df = self._consolidate_vectorized(merged_by_folder, total_folders, progress_callback, run)
+        else:
+            with run.stage('consolidacao', rows_in=sum(len(df) for df in merged_by_folder.values())) as record:
+                result_df = self._consolidate_rows(merged_by_folder, total_folders, progress_callback, run)
+                record['rows_out'] = len(result_df)
         
         return result_df
     
-    def export_merged_data(self, df: pd.DataFrame, output_filename: str = "base_bi_consolidada.csv") -> str:
-        """Exporta DataFrame consolidado para CSV na pasta raiz configurada"""
+    def build_daily_timeline(self, period_start: Optional[str] = None, period_end: Optional[str] = None,
+                             use_cache: bool = True) -> pd.DataFrame:
+        """
+        Relatório diário operacional (Jornada + Banco de horas + Faltas + Auditoria por NOME+DATA)
+        
+        Os arquivos de todos os períodos são encontrados pelo catálogo da pasta raiz
+        e lidos pelo mesmo caminho da mesclagem (cache, sidecar e leitura paralela).
+        
+        Args:
+            period_start, period_end: Datas ISO (AAAA-MM-DD) que limitam os arquivos e os dias
+            use_cache: Reaproveita frames de arquivos que não mudaram desde a última leitura
+        
+        Returns:
+            DataFrame ordenado por NOME e DATA (ver TimelineService.build)
+        
+        Raises:
+            ValueError: Data inválida
+        """
+        start = pd.Timestamp(period_start) if period_start else None
+        end = pd.Timestamp(period_end) if period_end else None
+        run = self._new_run()
+        
+        files_by_type = {}
+        for file_info in self.get_available_files():
+            report_type = file_info.get('report_type')
+            if report_type not in TIMELINE_REPORTS and report_type != 'Colaboradores':
+                continue
+            # Arquivos com período no nome fora do intervalo pedido não são lidos
+            if start is not None and file_info.get('period_end') and pd.Timestamp(file_info['period_end']) < start:
+                continue
+            if end is not None and file_info.get('period_start') and pd.Timestamp(file_info['period_start']) > end:
+                continue
+            files_by_type.setdefault(report_type, []).append(file_info)
+        
+        reports = {}
+        with self._parse_pool(run):
+            for report_type, files in files_by_type.items():
+                logger.info(f"Linha do tempo: {len(files)} arquivo(s) de {report_type}")
+                filepaths = [file_info['full_path'] for file_info in files]
+                frames = []
+                for filepath, result in zip(filepaths, self._load_reports(filepaths, run, use_cache=use_cache)):
+                    if isinstance(result, Exception):
+                        logger.error(f"Erro ao ler {filepath}: {str(result)}")
+                    elif not result[0].empty:
+                        frames.append(result[0])
+                if frames:
+                    reports[report_type] = pd.concat(frames, ignore_index=True, sort=False)
+        
+        timeline = self.timeline_service.build(reports, reports.pop('Colaboradores', None), start=start, end=end)
+        logger.info(f"Linha do tempo criada: {len(timeline)} dias de colaboradores")
+        return timeline
+    
+    def _fact_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Linhas de um relatório no formato das tabelas fato da base analítica
+        
+        CPF (só dígitos), nome, nome normalizado, equipe e data (ISO) nas colunas
+        fixas; as demais colunas do relatório seguem com o nome original.
+        """
+        df = self._filter_invalid_rows(df)
+        roles = {}
+        extras = {}
+        for pos, col in enumerate(df.columns):
+            name = str(col).strip()
+            role = name.lower()
+            if role in ('cpf', 'nome', 'equipe', 'data') and role not in roles:
+                roles[role] = df.iloc[:, pos]
+            elif role not in FACT_COLUMNS and role not in {c.lower() for c in extras}:
+                extras[name] = df.iloc[:, pos]
+            elif f"{name} (relatório)".lower() not in {c.lower() for c in extras}:
+                # Mesmo nome de uma coluna fixa (ex: outra coluna "Data")
+                extras[f"{name} (relatório)"] = df.iloc[:, pos]
+        
+        facts = pd.DataFrame(index=df.index)
+        facts['cpf'] = self._extract_cpf_series(roles['cpf']) if 'cpf' in roles else None
+        nome = roles['nome'].astype(object).where(roles['nome'].notna()) if 'nome' in roles else None
+        facts['nome'] = nome.where(nome.isna(), nome.astype(str).str.strip()) if nome is not None else None
+        facts['nome_norm'] = normalize_names(facts['nome']) if nome is not None else None
+        facts['equipe'] = roles['equipe'] if 'equipe' in roles else None
+        if 'data' in roles:
+            dates = self.timeline_service.parse_dates(roles['data'])
+            facts['data'] = dates.dt.strftime('%Y-%m-%d').where(dates.notna(), None)
+        else:
+            facts['data'] = None
+        for name, values in extras.items():
+            facts[name] = values
+        return facts.reset_index(drop=True)
+    
+    def refresh_store(self, use_cache: bool = True, refresh_catalog: bool = False) -> Dict:
+        """
+        Atualiza a base analítica com os relatórios da pasta raiz
+        
+        Só arquivos novos ou alterados (tamanho/mtime) são lidos e gravados;
+        arquivos removidos da origem saem das tabelas. A leitura usa o mesmo
+        caminho da mesclagem (cache, sidecar e leitura paralela).
+        
+        Args:
+            use_cache: Reaproveita frames do cache local/sidecars
+            refresh_catalog: Varre todas as pastas (arquivos sobrescritos sem renomear)
+        
+        Returns:
+            Dict com ingested, skipped, removed, rows e failed
+        """
+        # Opções e pool de leitura desta atualização (pode rodar durante uma mesclagem)
+        run = self._new_run()
+        # Arquivos gerados pela própria Base BI já ficam fora do catálogo (GENERATED_BASENAMES)
+        files = self.get_available_files(refresh=refresh_catalog)
+        removed = self.store_service.remove_missing([file_info['full_path'] for file_info in files])
+        
+        ingested = self.store_service.ingested_files()
+        pending = []
+        for file_info in files:
+            known = ingested.get(os.path.abspath(file_info['full_path']))
+            if not known or known['tamanho'] != file_info['size_bytes'] or known['mtime_ns'] != file_info['mtime_ns']:
+                pending.append(file_info)
+        
+        stats = {'ingested': 0, 'skipped': len(files) - len(pending), 'removed': removed, 'rows': 0, 'failed': 0}
+        if pending:
+            logger.info(f"Base analítica: {len(pending)} arquivo(s) novo(s) ou alterado(s)")
+        
+        with self._parse_pool(run):
+            for start in range(0, len(pending), STORE_BATCH_FILES):
+                batch = pending[start:start + STORE_BATCH_FILES]
+                results = self._load_reports([file_info['full_path'] for file_info in batch], run, use_cache=use_cache)
+                for file_info, result in zip(batch, results):
+                    if isinstance(result, Exception) or result[0].empty:
+                        if isinstance(result, Exception):
+                            logger.error(f"Erro ao ler {file_info['full_path']}: {str(result)}")
+                        stats['failed'] += 1
+                        continue
+                    facts = self._fact_frame(result[0])
+                    stats['rows'] += self.store_service.ingest(file_info['full_path'], file_info['report_type'], facts,
+                                                               file_info['size_bytes'], file_info['mtime_ns'])
+                    stats['ingested'] += 1
+        
+        logger.info(f"Base analítica atualizada: {stats['ingested']} arquivo(s) ingerido(s), "
+                    f"{stats['skipped']} sem alteração, {stats['removed']} removido(s)")
+        return stats
+    
+    def refresh_employees(self, use_cache: bool = True) -> Dict:
+        """
+        Atualiza a dimensão de colaboradores com os arquivos de Colaboradores e
+        da exportação de trainees da pasta raiz (só os novos ou alterados)
+        
+        Returns:
+            Dict com updated, skipped e employees (ver BIEmployeeService.refresh)
+        """
+        sources = [file_info for file_info in self.get_available_files()
+                   if file_info.get('report_type') in EMPLOYEE_SOURCES]
+        # Chamada própria, sem métricas: leituras da dimensão não entram nas etapas da mesclagem
+        run = self._new_run()
+        try:
+            return self.employee_service.refresh(sources, lambda path: self._load_report(path, run, use_cache=use_cache)[0])
+        finally:
+            self._flush_caches()
+    
+    def _load_employee_resolver(self, use_cache: bool):
+        """Resolução nome -> CPF da dimensão atualizada (None se a dimensão não puder ser lida)"""
+        try:
+            self.refresh_employees(use_cache=use_cache)
+            return self.employee_service.resolver()
+        except Exception as e:
+            logger.warning(f"Dimensão de colaboradores indisponível, mesclagem sem resolução por nome: {str(e)}")
+            return None
+    
+    def refresh_rollups(self, force: bool = False) -> Dict:
+        """
+        Recalcula os agregados por equipe e mês da base analítica e exporta
+        rollup_equipe_mes.csv na pasta raiz
+        
+        Só os meses de arquivos novos, alterados ou removidos desde a última
+        execução são recalculados (ver BIRollupService.refresh); o CSV só é
+        regravado quando algum mês mudou ou ainda não existe.
+        
+        Args:
+            force: Recalcula todos os meses
+        
+        Returns:
+            Dict com months, files, rows e output_file
+        """
+        stats = self.rollup_service.refresh(force=force)
+        output_path = os.path.join(self._get_root_folder(), ROLLUP_BASENAME + EXPORT_FORMATS['csv'])
+        if stats['months'] or not os.path.exists(output_path):
+            # Arquivo pequeno: CSV direto, sem o .gz pré-comprimido da base exportada
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            tmp_path = output_path + '.tmp'
+            try:
+                self.rollup_service.frame().to_csv(tmp_path, index=False, encoding='utf-8-sig')
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            if self._replace_if_changed(tmp_path, output_path):
+                logger.info(f"Agregados por equipe exportados: {output_path}")
+        stats['output_file'] = os.path.basename(output_path)
+        return stats
+    
+    def metrics_summary(self, history: int = 5, detail: bool = True) -> Dict:
+        """
+        Métricas por etapa da última mesclagem (por pasta e arquivo com detail)
+        e o resumo por etapa das anteriores (mais recente primeiro)
+        """
+        last = self.last_merge_metrics.summary(detail=detail) if self.last_merge_metrics else None
+        previous = list(self.metrics_history)[:-1][::-1][:max(history, 0)]
+        return {'last': last, 'history': [metrics.summary(detail=False) for metrics in previous]}
+    
+    def load_query_base(self, df: pd.DataFrame, output_path: str) -> bool:
+        """Carrega a base exportada para as consultas (só se o arquivo exportado mudou)"""
+        stat = os.stat(output_path)
+        signature = f"{os.path.abspath(output_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return self.query_service.load_base(df, signature)
+    
+    def query_base(self, **filters) -> Dict:
+        """
+        Consulta a base consolidada (ver BIQueryService.query)
+        
+        Sem base carregada, usa o último base_bi_consolidada.csv exportado na pasta raiz.
+        """
+        if self.query_service.loaded_signature() is None:
+            csv_path = os.path.join(self._get_root_folder(), EXPORT_BASENAME + EXPORT_FORMATS['csv'])
+            if os.path.exists(csv_path):
+                logger.info(f"Carregando base consolidada para consultas: {csv_path}")
+                df = pd.read_csv(csv_path, dtype=str, encoding='utf-8-sig', keep_default_na=False, na_values=[''])
+                self.load_query_base(df, csv_path)
+        return self.query_service.query(**filters)
+    
+    def export_merged_data(self, df: pd.DataFrame, output_filename: Optional[str] = None,
+                           export_format: str = 'csv', metrics: Optional[StageMetrics] = None) -> str:
+        """
+        Exporta DataFrame consolidado na pasta raiz configurada
+        
+        O arquivo só é substituído quando o conteúdo muda, então tamanho/mtime
+        (e a ETag do download) continuam iguais se a base não mudou.
+        
+        Args:
+            df: Base consolidada
+            output_filename: Nome do arquivo (padrão: base_bi_consolidada + extensão do formato)
+            export_format: csv, csv.gz, csv.zst ou parquet
+            metrics: Métricas da mesclagem que gerou df (registra a etapa 'exportacao')
+        
+        Returns:
+            Caminho do arquivo exportado
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação inválido: {export_format} (opções: {', '.join(EXPORT_FORMATS)})")
+        if export_format in ('csv.zst', 'parquet') and not PARQUET_AVAILABLE:
+            raise ValueError(f"Formato {export_format} requer o pacote pyarrow")
+        
+        if metrics is None:
+            return self._export(df, output_filename, export_format)
+        with metrics.stage('exportacao', rows_in=len(df)) as record:
+            output_path = self._export(df, output_filename, export_format)
+            record.update(rows_out=len(df), format=export_format)
+        return output_path
+    
+    def _export(self, df: pd.DataFrame, output_filename: Optional[str], export_format: str) -> str:
+        """Grava o arquivo exportado (ver export_merged_data)"""
         root_folder = self._get_root_folder()
-        output_path = os.path.join(root_folder, output_filename)
+        output_path = os.path.join(root_folder, output_filename or EXPORT_BASENAME + EXPORT_FORMATS[export_format])
         
         # Garante que o diretório existe
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        logger.info(f"Base BI exportada: {output_path}")
+        tmp_path = output_path + '.tmp'
+        try:
+            if export_format == 'csv':
+                df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+            elif export_format == 'csv.gz':
+                # mtime fixo: mesma base gera os mesmos bytes
+                df.to_csv(tmp_path, index=False, encoding='utf-8-sig',
+                          compression={'method': 'gzip', 'compresslevel': 6, 'mtime': 0})
+            elif export_format == 'csv.zst':
+                with pa.CompressedOutputStream(tmp_path, 'zstd') as stream:
+                    with io.TextIOWrapper(stream, encoding='utf-8-sig', newline='') as text:
+                        df.to_csv(text, index=False)
+            else:
+                table = pa.Table.from_pandas(to_parquet_frame(df), preserve_index=False)
+                pq.write_table(table, tmp_path, compression='zstd')
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        changed = self._replace_if_changed(tmp_path, output_path)
+        logger.info(f"Base BI exportada ({export_format}): {output_path}{'' if changed else ' (sem alterações)'}")
+        
+        if export_format == 'csv' and self._load_bi_settings().get('precompress_csv', True):
+            self._write_precompressed(output_path, force=changed)
+        
         return output_path
+    
+    def _replace_if_changed(self, tmp_path: str, output_path: str) -> bool:
+        """Move tmp_path para output_path, a menos que o conteúdo seja idêntico ao atual"""
+        if os.path.exists(output_path) and filecmp.cmp(tmp_path, output_path, shallow=False):
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, output_path)
+        return True
+    
+    def _write_precompressed(self, output_path: str, force: bool = False):
+        """Grava <arquivo>.gz ao lado do CSV para downloads com Accept-Encoding: gzip"""
+        gz_path = output_path + '.gz'
+        source_stat = os.stat(output_path)
+        if not force and precompressed_is_fresh(gz_path, source_stat):
+            return
+        
+        tmp_path = gz_path + '.tmp'
+        try:
+            with open(output_path, 'rb') as src, open(tmp_path, 'wb') as raw:
+                # mtime do CSV no cabeçalho identifica de qual versão o .gz foi gerado
+                with gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=6,
+                                   mtime=int(source_stat.st_mtime) & 0xFFFFFFFF) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(tmp_path, gz_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar {os.path.basename(gz_path)}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
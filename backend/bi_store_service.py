@@ -0,0 +1,186 @@
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterable, List
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Colunas fixas de todas as tabelas fato (as demais vêm do relatório, em texto)
+FACT_COLUMNS = ['arquivo_id', 'cpf', 'nome', 'nome_norm', 'equipe', 'data']
+FACT_INDEXES = [('cpf',), ('nome_norm', 'data'), ('data',)]
+
+# Linhas por executemany na ingestão
+INSERT_BATCH_ROWS = 50000
+
+# Código da loja antes do nome da equipe (ex: "153 - ULTRA POPULAR CODO C02" e "007.1 - DELIVERY" na Assinaturas)
+TEAM_CODE_PATTERN = r'^[\d.]+\s*-\s*'
+
+
+def normalize_names(names: pd.Series) -> pd.Series:
+    """Nome para comparação: maiúsculas, sem acentos e com espaços simples (NaN continua NaN)"""
+    text = names.astype(object).where(names.notna())
+    text = text.where(text.isna(), text.astype(str))
+    text = text.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    return text.str.upper().str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def fact_table_name(report_type: str) -> str:
+    """Tabela fato do tipo de relatório (ex: Banco de horas -> fato_banco_de_horas)"""
+    slug = unicodedata.normalize('NFKD', report_type).encode('ascii', 'ignore').decode('ascii')
+    slug = re.sub(r'[^0-9a-z]+', '_', slug.lower()).strip('_')
+    return f"fato_{slug or 'sem_tipo'}"
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class BIStoreService:
+    """
+    Base analítica local (SQLite) com os relatórios lidos pela Base BI
+
+    Cada tipo de relatório tem uma tabela fato (fato_<tipo>) com CPF, nome,
+    nome normalizado, equipe e data, mais as colunas do relatório em texto,
+    indexada por CPF, nome e data. A tabela arquivos_ingeridos guarda
+    tamanho/mtime de cada arquivo: só arquivos novos ou alterados são
+    reingeridos, e os removidos da origem saem das tabelas.
+    """
+
+    def __init__(self, db_path: str = "cache/bi/base_bi.sqlite"):
+        self.db_path = Path(db_path)
+        self.lock = threading.Lock()
+        self._initialized = False
+
+    def connect(self) -> sqlite3.Connection:
+        """Nova conexão (uma por thread/requisição)"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS arquivos_ingeridos (
+                    id INTEGER PRIMARY KEY,
+                    caminho TEXT NOT NULL UNIQUE,
+                    tabela TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    linhas INTEGER NOT NULL,
+                    ingerido_em TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Conexão com commit ao final (rollback em caso de erro), fechada na saída"""
+        conn = self.connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ingested_files(self) -> Dict[str, Dict]:
+        """Caminho -> tabela, tamanho e mtime dos arquivos já ingeridos"""
+        with self.transaction() as conn:
+            rows = conn.execute("SELECT caminho, tabela, tamanho, mtime_ns FROM arquivos_ingeridos").fetchall()
+        return {path: {'tabela': table, 'tamanho': size, 'mtime_ns': mtime} for path, table, size, mtime in rows}
+
+    def _table_columns(self, conn: sqlite3.Connection, table: str) -> List[str]:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({quote_identifier(table)})")]
+
+    def _ensure_table(self, conn: sqlite3.Connection, table: str, columns: List[str]):
+        """Cria a tabela fato e seus índices; colunas novas do relatório são acrescentadas"""
+        existing = self._table_columns(conn, table)
+        if not existing:
+            definition = ', '.join(f"{quote_identifier(col)} {'INTEGER' if col == 'arquivo_id' else 'TEXT'}"
+                                   for col in columns)
+            conn.execute(f"CREATE TABLE {quote_identifier(table)} ({definition})")
+            for index_cols in FACT_INDEXES:
+                index_name = f"idx_{table}_{'_'.join(index_cols)}"
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier(index_name)} "
+                             f"ON {quote_identifier(table)} ({', '.join(index_cols)})")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier(f'idx_{table}_arquivo')} "
+                         f"ON {quote_identifier(table)} (arquivo_id)")
+            return
+
+        known = {col.lower() for col in existing}
+        for col in columns:
+            if col.lower() not in known:
+                conn.execute(f"ALTER TABLE {quote_identifier(table)} ADD COLUMN {quote_identifier(col)} TEXT")
+                known.add(col.lower())
+
+    def ingest(self, filepath: str, report_type: str, facts: pd.DataFrame, size: int, mtime_ns: int) -> int:
+        """
+        Substitui as linhas de um arquivo na tabela fato do seu tipo (uma transação)
+
+        Args:
+            facts: Frame com FACT_COLUMNS (menos 'arquivo_id') e as colunas do relatório
+            size, mtime_ns: Versão do arquivo ingerida
+
+        Returns:
+            Quantidade de linhas gravadas
+        """
+        table = fact_table_name(report_type)
+        key = os.path.abspath(filepath)
+        columns = ['arquivo_id'] + list(facts.columns)
+        values = facts.astype(object).where(facts.notna(), None)
+
+        with self.lock, self.transaction() as conn:
+            self._ensure_table(conn, table, columns)
+            previous = conn.execute("SELECT id, tabela FROM arquivos_ingeridos WHERE caminho = ?", (key,)).fetchone()
+            if previous:
+                conn.execute(f"DELETE FROM {quote_identifier(previous[1])} WHERE arquivo_id = ?", (previous[0],))
+                conn.execute("UPDATE arquivos_ingeridos SET tabela = ?, tamanho = ?, mtime_ns = ?, linhas = ?, "
+                             "ingerido_em = ? WHERE id = ?",
+                             (table, size, mtime_ns, len(values), datetime.now().isoformat(timespec='seconds'), previous[0]))
+                file_id = previous[0]
+            else:
+                file_id = conn.execute(
+                    "INSERT INTO arquivos_ingeridos (caminho, tabela, tamanho, mtime_ns, linhas, ingerido_em) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, table, size, mtime_ns, len(values), datetime.now().isoformat(timespec='seconds'))
+                ).lastrowid
+
+            insert = (f"INSERT INTO {quote_identifier(table)} ({', '.join(quote_identifier(c) for c in columns)}) "
+                      f"VALUES ({', '.join('?' for _ in columns)})")
+            for start in range(0, len(values), INSERT_BATCH_ROWS):
+                batch = values.iloc[start:start + INSERT_BATCH_ROWS]
+                conn.executemany(insert, ((file_id, *row) for row in batch.itertuples(index=False, name=None)))
+        return len(values)
+
+    def remove_missing(self, current_paths: Iterable[str]) -> int:
+        """Apaga as linhas de arquivos que não existem mais na origem; retorna quantos arquivos saíram"""
+        current = {os.path.abspath(path) for path in current_paths}
+        with self.lock, self.transaction() as conn:
+            rows = conn.execute("SELECT id, caminho, tabela FROM arquivos_ingeridos").fetchall()
+            removed = [(file_id, table) for file_id, path, table in rows if path not in current]
+            for file_id, table in removed:
+                if self._table_columns(conn, table):
+                    conn.execute(f"DELETE FROM {quote_identifier(table)} WHERE arquivo_id = ?", (file_id,))
+                conn.execute("DELETE FROM arquivos_ingeridos WHERE id = ?", (file_id,))
+        return len(removed)
+
+    def status(self) -> Dict:
+        """Tabelas fato com quantidade de linhas/arquivos e tamanho do banco"""
+        with self.transaction() as conn:
+            files = dict(conn.execute("SELECT tabela, COUNT(*) FROM arquivos_ingeridos GROUP BY tabela").fetchall())
+            tables = {}
+            for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'fato_%' "
+                                         "ORDER BY name").fetchall():
+                rows = conn.execute(f"SELECT COUNT(*) FROM {quote_identifier(table)}").fetchone()[0]
+                tables[table] = {'rows': rows, 'files': files.get(table, 0),
+                                 'columns': self._table_columns(conn, table)}
+        size = self.db_path.stat().st_size if self.db_path.exists() else 0
+        return {'path': str(self.db_path), 'size_mb': round(size / (1024 * 1024), 2), 'tables': tables}
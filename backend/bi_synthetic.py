@@ -0,0 +1,333 @@
+import io
+import os
+import csv
+import json
+import random
+import calendar
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Gerador de relatórios sintéticos do PontoMais para benchmarks e testes da Base BI
+# (sem dados reais de colaboradores). Os layouts seguem Config/estrutura_colunas.json.
+
+STRUCTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Config', 'estrutura_colunas.json')
+
+PRIMEIROS_NOMES = ['ADAILSON', 'ADALEYCE', 'ANA', 'ANDRESSA', 'BRUNO', 'CARLA', 'DIEGO', 'ELISA', 'ERICA',
+                   'FABIO', 'GABRIANNE', 'JOSÉ', 'JULIANA', 'KAROLAINE', 'MARIA', 'RENAN', 'VANDERLY']
+SOBRENOMES = ['SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'COSTA', 'LIMA', 'FERREIRA', 'ROCHA', 'NUNES',
+              'CONCEIÇÃO', 'ARAÚJO', 'FULGENCIO', 'BEZERRA', 'DRUMMOND']
+LOJAS = ['ULTRA POPULAR CODO C02', 'MEGA POPULAR BELEM ICOARACI', 'HIPER FARMA ACAILANDIA C02',
+         'ULTRA POPULAR SLZ COHATRAC 3', 'ULTRA POPULAR TERESINA FREI SERAFIM', 'ULTRA POPULAR PINHEIRO 1',
+         'ULTRA POPULAR BELEM GUAMA 1', 'ULTRA POPULAR ITZ VL LOBAO']
+CARGOS = ['OPERADOR DE CAIXA', 'BALCONISTA', 'ESTOQUISTA', 'FARMACEUTICO', 'PERFUMISTA', 'GERENTE']
+TURNOS = ['ADM', 'TURNO 1 - 07:20H (DIA)', 'TURNO 2 - 07:20H (DIA)', 'TURNO 3 - 06:00H (NOITE)']
+DIAS = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+DIAS_EXTENSO = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
+MOTIVOS_FALTA = ['FOLGA/ESCALA', 'FOLGA/BANCO DE HORAS', 'ATESTADO', 'FALTA INJUSTIFICADA']
+OCORRENCIAS = [('Falta', 'Abonada'), ('Horas Faltantes', None), ('Atraso', None), ('Hora extra', None)]
+
+# Encodings e separadores encontrados nas exportações (o PontoMais troca a vírgula da
+# data por ';' quando exporta com ';', ex: "Ter; 21/10/2025")
+ENCODINGS = ['utf-8', 'utf-8-sig', 'latin-1']
+SEPARATORS = [',', ';']
+
+# Tipo de relatório (= pasta) -> nome do arquivo com período/hash, rótulo no nome e separador fixo
+REPORT_SPECS = {
+    # ABS usa vírgula decimal sem aspas ("3,53 %"): a exportação é sempre com ','
+    'Absenteísmo': {'period': True, 'hash': True, 'sep': ','},
+    'Auditoria': {'period': True, 'hash': True},
+    'Banco de horas': {'period': True, 'hash': True},
+    'Jornada (espelho ponto)': {'period': True, 'hash': True, 'label': 'Jornada'},
+    'Faltas': {'period': True, 'hash': True},
+    'Solicitações': {'period': True, 'hash': True, 'sep': ';'},
+    'Afastamentos e férias': {'period': False, 'hash': False},
+    'Assinaturas': {'period': True, 'hash': False},
+    'Colaboradores': {'period': False, 'hash': False},
+    'Turnos': {'period': False, 'hash': False},
+}
+# Exportação do banco (db_service.exportar_trainees): CSV sem preâmbulo, utf-8-sig
+TRAINEE_FOLDER = 'Colaboradores trainee'
+TRAINEE_COLUMNS = ['login', 'apelido', 'codigo', 'Loja Cadastro', 'nomegrupos']
+
+# Colunas de batidas que a exportação expande (1ª Entrada ... 4ª Saída)
+PUNCH_COLUMNS = [f"{n}ª {kind}" for n in range(1, 5) for kind in ('Entrada', 'Saída')]
+
+
+def load_structure(path: str = STRUCTURE_PATH) -> Dict[str, List[str]]:
+    """Colunas de cada tipo de relatório (repetidas aparecem uma vez)"""
+    with open(path, encoding='utf-8') as f:
+        structure = json.load(f)
+    return {report: list(dict.fromkeys(columns)) for report, columns in structure.items()}
+
+
+def _hhmm(minutes: int) -> str:
+    sign = '-' if minutes < 0 else ''
+    minutes = abs(minutes)
+    return f"{sign}{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _pontomais_date(day: date) -> str:
+    return f"{DIAS[day.weekday()]}, {day.strftime('%d/%m/%Y')}"
+
+
+def _cpf(idx: int) -> str:
+    digits = f"{(idx * 7919 + 10007) % 10 ** 11:011d}"
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+
+class _Person:
+    __slots__ = ('idx', 'nome', 'cpf', 'pis', 'cargo', 'equipe', 'turno', 'admissao')
+
+    def __init__(self, idx: int, rng: random.Random, first_day: date):
+        self.idx = idx
+        self.nome = f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)} {idx}"
+        self.cpf = _cpf(idx)
+        # PIS vazio em parte do cadastro, como na exportação real
+        self.pis = '' if rng.random() < 0.3 else f"{rng.randint(100, 999)}.{rng.randint(10000, 99999)}.{rng.randint(10, 99)}-{rng.randint(0, 9)}"
+        self.cargo = rng.choice(CARGOS)
+        self.equipe = rng.choice(LOJAS)
+        self.turno = rng.choice(TURNOS)
+        self.admissao = first_day - timedelta(days=rng.randint(30, 2000))
+
+
+class SyntheticReportGenerator:
+    """
+    Gera uma pasta raiz da Base BI com relatórios sintéticos do PontoMais
+
+    Uma subpasta por tipo de relatório (os de Config/estrutura_colunas.json e a
+    consulta de trainees), um arquivo por mês nos relatórios com período. Os
+    arquivos reproduzem o preâmbulo ("Relatório de ...", "Por ... em ...",
+    "De ... até ..."), a variação de separador (',' ou ';') e de encoding
+    (utf-8, utf-8-sig, latin-1), linhas de rodapé numéricas e o layout
+    "Colaborador" da Jornada (duas colunas, cabeçalho real na primeira linha).
+
+    Uso:
+        files = SyntheticReportGenerator(people=300, months=3).generate(root)
+        service.merge_reports(files)
+    """
+
+    def __init__(self, people: int = 300, months: int = 1, start: Tuple[int, int] = (2025, 1), seed: int = 0,
+                 variants: bool = True, jornada_quirk: float = 0.5, structure: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            people: Colaboradores no cadastro
+            months: Meses gerados nos relatórios com período
+            start: (ano, mês) do primeiro período
+            variants: Sorteia separador/encoding por arquivo (False = ',' e utf-8 em todos)
+            jornada_quirk: Fração dos arquivos de Jornada no layout "Colaborador"
+            structure: Colunas por tipo de relatório (padrão: Config/estrutura_colunas.json)
+        """
+        self.people = people
+        self.months = months
+        self.start = start
+        self.variants = variants
+        self.jornada_quirk = jornada_quirk
+        self.structure = structure or load_structure()
+        self.rng = random.Random(seed)
+        self.first_day = date(start[0], start[1], 1)
+
+    def _periods(self) -> List[Tuple[date, date]]:
+        year, month = self.start
+        periods = []
+        for _ in range(self.months):
+            last_day = calendar.monthrange(year, month)[1]
+            periods.append((date(year, month, 1), date(year, month, last_day)))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return periods
+
+    def _dialect(self, report: str) -> Tuple[str, str]:
+        spec = REPORT_SPECS.get(report, {})
+        if not self.variants:
+            return spec.get('sep', ','), 'utf-8'
+        sep = spec.get('sep') or self.rng.choices(SEPARATORS, weights=[4, 1])[0]
+        return sep, self.rng.choice(ENCODINGS)
+
+    def _filename(self, report: str, period: Optional[Tuple[date, date]]) -> str:
+        spec = REPORT_SPECS.get(report, {})
+        name = f"Pontomais_-_{spec.get('label', report).replace(' ', '_')}"
+        if spec.get('period') and period:
+            first, last = period
+            name += f"_({first.strftime('%d.%m.%Y')}_-_{last.strftime('%d.%m.%Y')})"
+        if spec.get('hash'):
+            name += f"_-_{self.rng.getrandbits(32):08x}"
+        return name + '.csv'
+
+    def _preamble(self, report: str, period: Optional[Tuple[date, date]]) -> List[str]:
+        title = REPORT_SPECS.get(report, {}).get('label', report)
+        # Emitido alguns dias depois do fim do período (datas fixas: mesma semente, mesmos arquivos)
+        issued = (period[1] if period else self.first_day) + timedelta(days=8)
+        lines = [f"Relatório de {title}", f"Por SISTEMA BOT em {issued.strftime('%d/%m/%Y')}"]
+        if period:
+            lines.append(f"De {period[0].strftime('%d/%m/%Y')} até {period[1].strftime('%d/%m/%Y')}")
+        return lines + ['']
+
+    def _value(self, column: str, person: _Person, day: Optional[date]) -> str:
+        """Valor plausível para a coluna (pelo nome da coluna)"""
+        rng = self.rng
+        key = column.upper()
+        if key == 'NOME':
+            return person.nome
+        if key == 'EQUIPE':
+            return person.equipe
+        if key == 'CARGO':
+            return person.cargo
+        if key == 'TURNO':
+            return person.turno
+        if key == 'CPF':
+            return person.cpf
+        if key == 'PIS':
+            return person.pis
+        if key == 'E-MAIL':
+            return f"{10000 + person.idx}@empresa.com.br"
+        if key == 'CENTRO DE CUSTO':
+            return 'Geral'
+        if key == 'DATA DE ADMISSÃO':
+            return _pontomais_date(person.admissao)
+        if key in ('DATA', 'DATA INICIAL', 'DATA FINAL'):
+            return _pontomais_date(day) if day else ''
+        if key.startswith('DATA D'):
+            moment = day or self.first_day
+            return f"{moment.strftime('%d/%m/%Y')} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+        if key == 'PONTOS':
+            return ' '.join(_hhmm(m) for m in (rng.randint(420, 500), 720, 780, rng.randint(1000, 1080)))
+        if 'ENTRADA' in key or 'SAÍDA' in key:
+            return _hhmm(rng.randint(420, 1380)) if rng.random() < 0.7 else ''
+        if key in ('PREVISTO', 'PRESENÇA', 'TOTAIS DA JORNADA'):
+            return _hhmm(rng.randint(400, 13000))
+        if key in ('AUSÊNCIA', 'TOTAL DE H. EXTRAS', 'VALOR'):
+            return _hhmm(rng.randint(0, 600))
+        if key in ('SALDO', 'SALDO DE B. H.'):
+            return _hhmm(rng.randint(-600, 900))
+        if key == 'ABS':
+            return f"{rng.uniform(0, 20):.2f} %".replace('.', ',')
+        if key == 'MOTIVO':
+            return rng.choice(MOTIVOS_FALTA)
+        if key == 'OCORRÊNCIA':
+            return rng.choice(OCORRENCIAS)[0]
+        if key.endswith('?'):
+            return rng.choice(['Sim', 'Não'])
+        if key == 'QUANT. DE DIAS':
+            return str(rng.randint(1, 30))
+        if key == 'STATUS':
+            return rng.choice(['Aprovada', 'Reprovada', 'Pendente'])
+        if key == 'TIPO DE SOLICITAÇÃO':
+            return rng.choice(['Ajuste de ponto', 'Abono', 'Atestado'])
+        if key == 'QUEM APROVOU/REPROVOU':
+            return f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)}"
+        if key == 'CID':
+            return rng.choice(['', '', 'J11', 'M54'])
+        return rng.choice(['', 'ajuste', 'BENEFICIO', 'AJUSTE'])
+
+    def _rows(self, report: str, columns: List[str], staff: List[_Person],
+              period: Optional[Tuple[date, date]]) -> List[List[str]]:
+        """Linhas do relatório: diárias, por ocorrência ou uma por colaborador"""
+        rng = self.rng
+        days = [period[0] + timedelta(days=d) for d in range((period[1] - period[0]).days + 1)] if period else []
+        rows = []
+
+        if report == 'Turnos':
+            for code, turno in enumerate(TURNOS, start=1):
+                for weekday in DIAS_EXTENSO:
+                    row = {col: self._value(col, staff[0], None) for col in columns}
+                    row.update({'Código': f"{code:04d}", 'Descrição': turno, 'Dia': weekday,
+                                'Horários': '08:00 12:00 14:00 18:00'})
+                    rows.append([row.get(col, '') for col in columns])
+            return rows
+
+        for person in staff:
+            if report in ('Banco de horas', 'Jornada (espelho ponto)'):
+                person_days = days
+            elif report in ('Faltas', 'Auditoria', 'Solicitações'):
+                person_days = [day for day in days if rng.random() < 0.12]
+            elif report == 'Afastamentos e férias':
+                person_days = [self.first_day - timedelta(days=rng.randint(0, 400))] if rng.random() < 0.1 else []
+            else:
+                person_days = [None]
+
+            for day in person_days:
+                values = {col: self._value(col, person, day) for col in columns}
+                if report == 'Afastamentos e férias':
+                    values['Data final'] = _pontomais_date(day + timedelta(days=int(values.get('Quant. de dias') or 1)))
+                if report == 'Auditoria':
+                    ocorrencia, valor = rng.choice(OCORRENCIAS)
+                    values['Ocorrência'] = ocorrencia
+                    values['Valor'] = valor or values['Valor']
+                rows.append([values[col] for col in columns])
+        return rows
+
+    def _expand_columns(self, report: str, columns: List[str]) -> List[str]:
+        if report == 'Solicitações' and 'Pontos' in columns:
+            pos = columns.index('Pontos')
+            return columns[:pos] + PUNCH_COLUMNS + columns[pos + 1:]
+        return columns
+
+    def _render(self, report: str, header: List[str], rows: List[List[str]], sep: str,
+                period: Optional[Tuple[date, date]], jornada_layout: bool) -> str:
+        buffer = io.StringIO()
+        buffer.write('\n'.join(self._preamble(report, period)) + '\n')
+        writer = csv.writer(buffer, delimiter=sep, lineterminator='\n')
+        if jornada_layout:
+            # Layout "Colaborador": linha de duas colunas e o cabeçalho real como primeira linha de dados
+            writer.writerow(['Colaborador', 'Todos'])
+            header = ['Data', 'Nome']
+            rows = [[row[0], row[1]] for row in rows]
+        writer.writerow(header)
+        for row in rows:
+            if sep == ';':
+                row = [value.replace(', ', '; ', 1) if value[:3] in DIAS else value for value in row]
+            writer.writerow(row)
+        if rows and self.rng.random() < 0.3:
+            # Rodapé com totais numéricos soltos, como na exportação
+            buffer.write(f"\n{self.rng.uniform(10, 500):.9f}\n")
+        return buffer.getvalue()
+
+    def _write(self, path: str, text: str, encoding: str):
+        with open(path, 'w', encoding=encoding, errors='replace', newline='') as f:
+            f.write(text)
+
+    def generate(self, root: str) -> List[Dict[str, str]]:
+        """
+        Grava os relatórios em root/<tipo de relatório>/
+
+        Returns:
+            Arquivos gerados no formato da seleção de merge_reports (filename, full_path, folder)
+        """
+        staff = [_Person(idx, self.rng, self.first_day) for idx in range(1, self.people + 1)]
+        periods = self._periods()
+        files = []
+
+        for report, columns in self.structure.items():
+            spec = REPORT_SPECS.get(report, {'period': True, 'hash': True})
+            folder = os.path.join(root, report)
+            os.makedirs(folder, exist_ok=True)
+            header = self._expand_columns(report, columns)
+
+            for period in (periods if spec.get('period') else [None]):
+                rows = self._rows(report, header, staff, period)
+                sep, encoding = self._dialect(report)
+                quirk = report == 'Jornada (espelho ponto)' and self.rng.random() < self.jornada_quirk
+                # Relatórios sem período no nome ainda trazem o intervalo no preâmbulo (exceto cadastros)
+                preamble_period = period or ((self.first_day, self.first_day) if report == 'Afastamentos e férias' else None)
+                text = self._render(report, header, rows, sep, preamble_period, quirk)
+                filename = self._filename(report, period)
+                path = os.path.join(folder, filename)
+                self._write(path, text, encoding)
+                files.append({'filename': filename, 'full_path': path, 'folder': report})
+
+        folder = os.path.join(root, TRAINEE_FOLDER)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, 'Consulta_trainee.csv')
+        trainees = [p for p in staff if p.idx % 10 == 0] or staff[:1]
+        rows = [[str(10000 + p.idx), p.nome[:30], f"{p.idx % 100:04d}", p.equipe, f"{p.cargo} TRAINEE"] for p in trainees]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(TRAINEE_COLUMNS)
+        writer.writerows(rows)
+        self._write(path, buffer.getvalue(), 'utf-8-sig')
+        files.append({'filename': 'Consulta_trainee.csv', 'full_path': path, 'folder': TRAINEE_FOLDER})
+
+        logger.info(f"Relatórios sintéticos gerados: {len(files)} arquivos em {root}")
+        return files
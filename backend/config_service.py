@@ -27,7 +27,33 @@ class ConfigService:
                     "reports_url": "https://app2.pontomais.com.br/relatorios",
                     "destine": ""
                 },
-                "rescisao_pasta": ""
+                "rescisao_pasta": "",
+                "bi": {
+                    "parquet_sidecars": True,
+                    "parse_mode": "thread",
+                    "parse_workers": 0,
+                    "stream_memory_mb": 512,
+                    "precompress_csv": True,
+                    "optimize_dtypes": True,
+                    "typed_columns": False,
+                    "memory_report": False,
+                    "analytics_store": True,
+                    "team_rollups": True,
+                    "employee_dimension": True
+                },
+                "queue": {
+                    "resource_limits": {
+                        "browser": 1,
+                        "database": 2,
+                        "cpu": 1,
+                        "io": 2
+                    },
+                    "retention": {
+                        "tasks": 500,
+                        "days": 7,
+                        "spill_to_disk": True
+                    }
+                }
             }
             with open(self.config_path, 'w', encoding='utf-8') as f:
                 json.dump(default_config, f, indent=4)
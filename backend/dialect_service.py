@@ -0,0 +1,210 @@
+import os
+import csv
+import json
+import codecs
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DialectService:
+    """Detecta e memoriza o dialeto (encoding, separador e cabeçalho) dos CSVs do PontoMais"""
+
+    # Bytes lidos do início do arquivo para detecção
+    PREFIX_BYTES = 64 * 1024
+    # Mesmas combinações tentadas pela leitura por força bruta
+    SEPARATORS = [',', ';', '\t']
+    SKIPROWS = [0, 1, 2, 3, 4, 5]
+
+    def __init__(self, cache_path: str = "cache/bi/dialetos.json", persist: bool = True):
+        self.cache_path = Path(cache_path)
+        # False nos processos do pool de leitura: quem grava o cache é o processo principal
+        self.persist = persist
+        self.lock = threading.Lock()
+        self._cache = None
+        # Alterações ainda não gravadas (gravadas de uma vez por flush)
+        self._dirty = False
+
+    def _load_cache(self) -> Dict:
+        """Carrega o cache persistido (arquivos por caminho e último dialeto por tipo de relatório)"""
+        if self._cache is None:
+            self._cache = {'files': {}, 'reports': {}}
+            if self.cache_path.exists():
+                try:
+                    with open(self.cache_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    self._cache['files'] = data.get('files', {})
+                    self._cache['reports'] = data.get('reports', {})
+                except Exception as e:
+                    logger.warning(f"Cache de dialetos inválido, recriando: {str(e)}")
+        return self._cache
+
+    def _save_cache(self):
+        """Grava o cache em disco (escrita atômica)"""
+        if not self.persist:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar cache de dialetos: {str(e)}")
+
+    def flush(self):
+        """Grava o cache se algum dialeto mudou desde a última gravação (uma vez por mesclagem)"""
+        with self.lock:
+            if self._dirty:
+                self._save_cache()
+                self._dirty = False
+
+    def _fingerprint(self, filepath: str) -> Dict:
+        stat = os.stat(filepath)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    def get_dialect(self, filepath: str, report_type: Optional[str] = None,
+                    skiprows_hint: Optional[int] = None) -> Optional[Dict]:
+        """
+        Retorna o dialeto do arquivo: do cache quando o arquivo não mudou,
+        senão detectado a partir de um prefixo de bytes.
+
+        Returns:
+            Dict com encoding, sep, skiprows e jornada_layout, ou None se não detectado
+        """
+        key = os.path.abspath(filepath)
+        fingerprint = self._fingerprint(filepath)
+
+        with self.lock:
+            cache = self._load_cache()
+            entry = cache['files'].get(key)
+            if entry and entry.get('size') == fingerprint['size'] and entry.get('mtime') == fingerprint['mtime']:
+                return entry['dialect']
+            known = cache['reports'].get(report_type) if report_type else None
+
+        dialect = self.sniff(filepath, skiprows_hint=skiprows_hint, known=known)
+        if dialect:
+            self.remember(filepath, dialect, report_type)
+        return dialect
+
+    def remember(self, filepath: str, dialect: Dict, report_type: Optional[str] = None):
+        """Memoriza o dialeto de um arquivo (e do seu tipo de relatório); gravado no próximo flush"""
+        key = os.path.abspath(filepath)
+        fingerprint = self._fingerprint(filepath)
+
+        with self.lock:
+            cache = self._load_cache()
+            cache['files'][key] = {**fingerprint, 'dialect': dialect}
+            if report_type:
+                cache['reports'][report_type] = dialect
+            self._dirty = True
+
+    def cached_dialect(self, filepath: str) -> Optional[Dict]:
+        """Dialeto já conhecido do arquivo (sem detectar de novo)"""
+        with self.lock:
+            entry = self._load_cache()['files'].get(os.path.abspath(filepath))
+        return entry['dialect'] if entry else None
+
+    def forget(self, filepath: str):
+        """Remove o dialeto de um arquivo (ex: detecção não funcionou na leitura completa)"""
+        key = os.path.abspath(filepath)
+        with self.lock:
+            cache = self._load_cache()
+            if cache['files'].pop(key, None) is not None:
+                self._dirty = True
+
+    def _decode_prefix(self, raw: bytes, truncated: bool) -> Optional[tuple]:
+        """Detecta o encoding do prefixo e retorna (encoding, texto)"""
+        # latin-1 decodifica qualquer byte, então fica por último
+        candidates = ['utf-8-sig'] if raw.startswith(codecs.BOM_UTF8) else ['utf-8', 'latin-1']
+
+        for encoding in candidates:
+            try:
+                # Decodificador incremental tolera um caractere multibyte cortado no fim do prefixo
+                decoder = codecs.getincrementaldecoder(encoding)()
+                return encoding, decoder.decode(raw, final=not truncated)
+            except UnicodeDecodeError:
+                continue
+        return None
+
+    def _count_fields(self, line: str, sep: str) -> int:
+        try:
+            return len(next(csv.reader([line], delimiter=sep)))
+        except (StopIteration, csv.Error):
+            return 0
+
+    def _header_at(self, lines: List[str], sep: str, skip: int) -> Optional[Dict]:
+        """
+        Verifica se a leitura com skiprows=skip teria um cabeçalho válido
+        (mesma regra da força bruta: mais de uma coluna e ao menos uma linha de dados)
+        """
+        # pandas ignora linhas em branco após o skiprows
+        header_idx = next((i for i in range(skip, len(lines)) if lines[i].strip()), None)
+        if header_idx is None:
+            return None
+
+        header_fields = self._count_fields(lines[header_idx], sep)
+        if header_fields <= 1:
+            return None
+
+        # Linhas com mais campos que o cabeçalho são descartadas (on_bad_lines='skip')
+        has_data = any(
+            0 < self._count_fields(line, sep) <= header_fields
+            for line in lines[header_idx + 1:] if line.strip()
+        )
+        if not has_data:
+            return None
+
+        first_col = next(csv.reader([lines[header_idx]], delimiter=sep))[0]
+        return {
+            'header_fields': header_fields,
+            # Relatório de Jornada: "Colaborador,<nome>" seguido da linha com as colunas reais
+            'jornada_layout': header_fields == 2 and 'Colaborador' in first_col,
+        }
+
+    def sniff(self, filepath: str, skiprows_hint: Optional[int] = None, known: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Detecta encoding, separador, linhas de preâmbulo e o layout especial da Jornada
+        lendo apenas o início do arquivo. A ordem de tentativa é a mesma da leitura
+        por força bruta, então o resultado coincide com o que ela escolheria.
+        """
+        try:
+            with open(filepath, 'rb') as f:
+                raw = f.read(self.PREFIX_BYTES + 1)
+        except OSError as e:
+            logger.warning(f"Erro ao ler início do arquivo {filepath}: {str(e)}")
+            return None
+
+        truncated = len(raw) > self.PREFIX_BYTES
+        raw = raw[:self.PREFIX_BYTES]
+
+        decoded = self._decode_prefix(raw, truncated)
+        if not decoded:
+            return None
+        encoding, text = decoded
+
+        lines = text.splitlines()
+        if truncated and lines:
+            # Última linha pode estar incompleta
+            lines = lines[:-1]
+
+        skip_attempts = [skiprows_hint] if skiprows_hint is not None else []
+        skip_attempts.extend(self.SKIPROWS)
+        skip_attempts = list(dict.fromkeys(skip_attempts))
+
+        for sep in self.SEPARATORS:
+            for skip in skip_attempts:
+                header = self._header_at(lines, sep, skip)
+                if header:
+                    return {'encoding': encoding, 'sep': sep, 'skiprows': skip,
+                            'jornada_layout': header['jornada_layout']}
+
+        # Prefixo inconclusivo: usa o último dialeto visto para o mesmo tipo de relatório
+        if known:
+            logger.info(f"Dialeto não detectado no prefixo, usando o do tipo de relatório: {os.path.basename(filepath)}")
+            return dict(known)
+
+        return None
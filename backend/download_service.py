@@ -0,0 +1,199 @@
+import os
+import re
+from email.utils import formatdate
+from typing import Dict, Optional, Tuple
+import logging
+
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# Tipo de conteúdo por extensão dos arquivos exportados
+MEDIA_TYPES = {
+    '.csv': 'text/csv',
+    '.gz': 'application/gzip',
+    '.zst': 'application/zstd',
+    '.parquet': 'application/vnd.apache.parquet',
+}
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Tamanho dos blocos enviados em respostas parciais
+CHUNK_SIZE = 1024 * 1024
+
+
+def gzip_header_mtime(path: str) -> Optional[int]:
+    """Campo MTIME do cabeçalho gzip (None se o arquivo não existir ou não for gzip)"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(8)
+    except OSError:
+        return None
+    if len(header) < 8 or header[:2] != b'\x1f\x8b':
+        return None
+    return int.from_bytes(header[4:8], 'little')
+
+
+def precompressed_is_fresh(gz_path: str, source_stat: os.stat_result) -> bool:
+    """
+    <arquivo>.gz pré-comprimido corresponde à versão atual do arquivo de origem
+
+    O .gz guarda no cabeçalho o mtime (em segundos) da origem; um .gz gerado
+    por outra via (ex: exportação no formato csv.gz, mtime 0) nunca é usado.
+    """
+    return gzip_header_mtime(gz_path) == int(source_stat.st_mtime) & 0xFFFFFFFF
+
+
+class DownloadService:
+    """
+    Respostas de download de arquivos grandes (Base BI)
+
+    - ETag/If-None-Match: arquivo igual ao que o cliente já tem retorna 304
+    - Range/If-Range: respostas parciais (206) para retomar downloads
+    - Accept-Encoding: serve <arquivo>.gz pré-comprimido quando existir e estiver atualizado
+    """
+
+    def media_type(self, filename: str) -> str:
+        return MEDIA_TYPES.get(os.path.splitext(filename)[1].lower(), 'application/octet-stream')
+
+    def etag(self, stat_result: os.stat_result, variant: str = '') -> str:
+        """ETag forte a partir de tamanho e mtime (a exportação só substitui o arquivo se o conteúdo mudar)"""
+        suffix = f"-{variant}" if variant else ''
+        return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}{suffix}"'
+
+    def _accepts_gzip(self, accept_encoding: Optional[str]) -> bool:
+        for part in (accept_encoding or '').split(','):
+            token, _, params = part.strip().partition(';')
+            if token.strip().lower() not in ('gzip', '*'):
+                continue
+            quality = params.strip()
+            if quality.startswith('q='):
+                try:
+                    return float(quality[2:]) > 0
+                except ValueError:
+                    return False
+            return True
+        return False
+
+    def _precompressed_path(self, filepath: str, stat_result: os.stat_result) -> Optional[str]:
+        """<arquivo>.gz gerado a partir da versão atual do arquivo (None se não existir ou estiver antigo)"""
+        gz_path = filepath + '.gz'
+        return gz_path if precompressed_is_fresh(gz_path, stat_result) else None
+
+    def _etag_matches(self, header: Optional[str], etag: str) -> bool:
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        # Aceita também a forma fraca (W/"...") enviada por alguns proxies
+        candidates = [tag.strip() for tag in header.split(',')]
+        return etag in candidates or f"W/{etag}" in candidates
+
+    def _parse_range(self, header: str, size: int) -> Optional[Tuple[int, int]]:
+        """
+        Intervalo único "bytes=inicio-fim" (inclusive)
+
+        Returns:
+            (inicio, fim), ou None se o cabeçalho não for um intervalo único válido
+
+        Raises:
+            ValueError: intervalo fora do arquivo (416)
+        """
+        match = RANGE_PATTERN.match(header.strip())
+        if not match or (not match.group(1) and not match.group(2)):
+            return None
+
+        start, end = match.group(1), match.group(2)
+        if not start:
+            # Sufixo: últimos N bytes
+            length = int(end)
+            if length == 0:
+                raise ValueError("Intervalo vazio")
+            return max(size - length, 0), size - 1
+
+        start = int(start)
+        end = int(end) if end else size - 1
+        if start >= size or end < start:
+            raise ValueError("Intervalo fora do arquivo")
+        return start, min(end, size - 1)
+
+    def _iter_range(self, filepath: str, start: int, end: int):
+        with open(filepath, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                block = f.read(min(CHUNK_SIZE, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
+
+    def file_response(self, filepath: str, headers: Dict[str, str], filename: Optional[str] = None) -> Response:
+        """
+        Monta a resposta de download de filepath conforme os cabeçalhos da requisição
+
+        Args:
+            filepath: Arquivo a enviar
+            headers: Cabeçalhos da requisição (request.headers)
+            filename: Nome sugerido para o download (padrão: nome do arquivo)
+        """
+        filename = filename or os.path.basename(filepath)
+        stat_result = os.stat(filepath)
+        range_header = headers.get('range')
+
+        # Variante pré-comprimida só para o arquivo inteiro
+        served_path, served_stat, content_encoding = filepath, stat_result, None
+        if not range_header and self._accepts_gzip(headers.get('accept-encoding')):
+            gz_path = self._precompressed_path(filepath, stat_result)
+            if gz_path:
+                served_path, served_stat, content_encoding = gz_path, os.stat(gz_path), 'gzip'
+
+        etag = self.etag(served_stat, variant=content_encoding or '')
+        response_headers = {
+            'ETag': etag,
+            'Last-Modified': formatdate(stat_result.st_mtime, usegmt=True),
+            'Accept-Ranges': 'bytes',
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'no-cache',
+        }
+
+        if self._etag_matches(headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=response_headers)
+
+        if range_header:
+            if_range = headers.get('if-range')
+            if if_range and if_range.strip() != etag:
+                # Arquivo mudou desde o download parcial: envia inteiro
+                range_header = None
+
+        if range_header:
+            size = stat_result.st_size
+            try:
+                byte_range = self._parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**response_headers, 'Content-Range': f"bytes */{size}"})
+
+            if byte_range:
+                start, end = byte_range
+                response_headers.update({
+                    'Content-Range': f"bytes {start}-{end}/{size}",
+                    'Content-Length': str(end - start + 1),
+                    'Content-Disposition': f'attachment; filename="{filename}"',
+                })
+                return StreamingResponse(
+                    self._iter_range(filepath, start, end),
+                    status_code=206,
+                    media_type=self.media_type(filename),
+                    headers=response_headers,
+                )
+
+        if content_encoding:
+            response_headers['Content-Encoding'] = content_encoding
+
+        return FileResponse(
+            served_path,
+            media_type=self.media_type(filename),
+            filename=filename,
+            headers=response_headers,
+            stat_result=served_stat,
+        )
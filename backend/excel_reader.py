@@ -0,0 +1,174 @@
+import os
+from datetime import date, datetime
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Parser interno usado pelo pd.read_excel (mesma inferência de tipos); fora da API pública,
+# então sem ele a planilha é relida pelo pd.read_excel a partir do cabeçalho detectado
+try:
+    from pandas.io.parsers import TextParser
+except ImportError:
+    TextParser = None
+
+try:
+    from python_calamine import CalamineWorkbook
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CalamineWorkbook = None
+    CALAMINE_AVAILABLE = False
+
+try:
+    from openpyxl import load_workbook
+    from openpyxl.cell.cell import ERROR_CODES
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    load_workbook = None
+    ERROR_CODES = ()
+    OPENPYXL_AVAILABLE = False
+
+# Linhas do início da planilha examinadas para achar o cabeçalho
+HEADER_SCAN_ROWS = 10
+# Células que identificam a linha de cabeçalho dos relatórios do PontoMais
+HEADER_MARKERS = {'NOME', 'CPF', 'COLABORADOR'}
+# Primeira célula dos relatórios exportados com preâmbulo
+PREAMBLE_MARKER = 'Relatório'
+
+
+def excel_engine(filepath: str) -> str:
+    """Motor usado para ler a planilha: calamine quando instalado, openpyxl somente leitura para .xlsx"""
+    if CALAMINE_AVAILABLE:
+        return 'calamine'
+    if OPENPYXL_AVAILABLE and os.path.splitext(filepath)[1].lower() in ('.xlsx', '.xlsm'):
+        return 'openpyxl'
+    return 'pandas'
+
+
+def _convert_value(value):
+    """Mesma conversão do leitor openpyxl do pandas: vazio vira "", número inteiro vira int"""
+    if value is None:
+        return ""
+    if value.__class__ is float:
+        return int(value) if value.is_integer() else value
+    if value.__class__ is str and value in ERROR_CODES:
+        return np.nan
+    return value
+
+
+def _rows_openpyxl(filepath: str) -> List[list]:
+    workbook = load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        # Planilhas geradas por sistemas às vezes gravam dimensões erradas
+        sheet.reset_dimensions()
+        return [[_convert_value(value) for value in row] for row in sheet.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def _convert_calamine_value(value):
+    """Converte para os mesmos tipos do openpyxl: número inteiro vira int, data sem hora vira datetime"""
+    if value.__class__ is float:
+        return int(value) if value.is_integer() else value
+    if value.__class__ is date:
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def _rows_calamine(filepath: str) -> List[list]:
+    workbook = CalamineWorkbook.from_path(filepath)
+    try:
+        rows = workbook.get_sheet_by_index(0).to_python(skip_empty_area=False)
+    finally:
+        workbook.close()
+    return [[_convert_calamine_value(value) for value in row] for row in rows]
+
+
+def _rows_pandas(filepath: str) -> List[list]:
+    raw = pd.read_excel(filepath, header=None, dtype=object)
+    return raw.where(raw.notna(), "").values.tolist()
+
+
+def _trim(rows: List[list]) -> List[list]:
+    """Remove células vazias no fim das linhas e linhas vazias no fim da planilha (como o pandas)"""
+    trimmed = []
+    last_with_data = -1
+    for idx, row in enumerate(rows):
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        if row:
+            last_with_data = idx
+        trimmed.append(row)
+    trimmed = trimmed[:last_with_data + 1]
+
+    if trimmed:
+        width = max(len(row) for row in trimmed)
+        trimmed = [row + [""] * (width - len(row)) for row in trimmed]
+    return trimmed
+
+
+def read_rows(filepath: str, engine: Optional[str] = None) -> List[list]:
+    """Lê uma única vez todas as linhas da primeira aba da planilha"""
+    engine = engine or excel_engine(filepath)
+    if engine == 'calamine':
+        rows = _rows_calamine(filepath)
+    elif engine == 'openpyxl':
+        rows = _rows_openpyxl(filepath)
+    else:
+        rows = _rows_pandas(filepath)
+    return _trim(rows)
+
+
+def detect_header_row(rows: List[list]) -> int:
+    """
+    Linha do cabeçalho: 0, a menos que a planilha comece com o preâmbulo "Relatório de ...".
+    Nesse caso é a primeira linha com Nome/CPF/Colaborador entre as primeiras linhas
+    ou, sem ela, a primeira linha com mais de uma célula preenchida.
+    """
+    if not rows or PREAMBLE_MARKER not in str(rows[0][0]):
+        return 0
+
+    scan = rows[1:HEADER_SCAN_ROWS]
+    for idx, row in enumerate(scan, start=1):
+        if any(str(value).strip().upper() in HEADER_MARKERS for value in row):
+            return idx
+    for idx, row in enumerate(scan, start=1):
+        if sum(1 for value in row if str(value).strip()) > 1:
+            return idx
+    return 0
+
+
+def read_excel_fast(filepath: str, dtype: Optional[Dict] = None, header_row: Optional[int] = None,
+                    engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Lê a primeira aba da planilha em uma única passada: detecta a linha do cabeçalho
+    nas linhas já lidas e monta o DataFrame com o mesmo parser do pd.read_excel
+
+    Se o pandas instalado não tiver esse parser (ou mudar a assinatura dele), a
+    planilha é lida de novo pelo pd.read_excel a partir da linha do cabeçalho.
+    """
+    rows = read_rows(filepath, engine)
+    if not rows:
+        return pd.DataFrame()
+
+    if header_row is None:
+        header_row = detect_header_row(rows)
+    if header_row:
+        logger.debug(f"Cabeçalho na linha {header_row + 1}: {os.path.basename(filepath)}")
+
+    if TextParser is not None:
+        try:
+            parser = TextParser(rows[header_row:], header=0, dtype=dtype, skip_blank_lines=False)
+        except TypeError as e:
+            logger.warning(f"Parser do pandas incompatível, usando pd.read_excel: {str(e)}")
+        else:
+            try:
+                return parser.read()
+            finally:
+                parser.close()
+    return pd.read_excel(filepath, skiprows=header_row, dtype=dtype)
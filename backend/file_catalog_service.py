@@ -0,0 +1,157 @@
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Extensões listadas na Base BI
+CATALOG_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+
+class FileCatalogService:
+    """
+    Catálogo em memória dos relatórios da pasta raiz
+
+    Uma varredura com os.scandir; cada pasta guarda seu mtime e só é relida
+    quando muda (arquivo criado, removido ou renomeado). Alterações no conteúdo
+    de um arquivo sem renomeá-lo não mudam o mtime da pasta: use refresh=True
+    para forçar uma varredura completa.
+    """
+
+    def __init__(self, describe: Optional[Callable[[str], Dict]] = None,
+                 row_count: Optional[Callable[[str, int, int], Optional[int]]] = None,
+                 ignored_prefixes: Tuple[str, ...] = ()):
+        """
+        Args:
+            describe: Função filename -> metadados extras (tipo de relatório, período)
+            row_count: Função (caminho, tamanho, mtime_ns) -> linhas já conhecidas ou None
+            ignored_prefixes: Arquivos que não são relatórios (ex: gerados pela própria Base BI)
+        """
+        self.describe = describe
+        self.row_count = row_count
+        self.ignored_prefixes = tuple(ignored_prefixes)
+        self.lock = threading.Lock()
+        self._root = None
+        # caminho da pasta -> {'mtime': ns, 'files': [entradas], 'subdirs': [caminhos]}
+        self._dirs = {}
+
+    def _scan_dir(self, path: str, root: str) -> Dict:
+        files = []
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                # Mesmo critério do glob: ignora arquivos e pastas ocultos
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    if not entry.name.lower().endswith(CATALOG_EXTENSIONS) or not entry.is_file():
+                        continue
+                    if self.ignored_prefixes and entry.name.startswith(self.ignored_prefixes):
+                        continue
+                    # No Windows o stat vem da própria listagem da pasta (sem ida extra ao compartilhamento)
+                    stat = entry.stat()
+                except OSError as e:
+                    logger.warning(f"Erro ao processar arquivo {entry.path}: {str(e)}")
+                    continue
+
+                relative_path = os.path.relpath(entry.path, root)
+                file_entry = {
+                    'filename': entry.name,
+                    'relative_path': relative_path,
+                    'full_path': entry.path,
+                    'folder': os.path.dirname(relative_path),
+                    'size': f"{stat.st_size / 1024:.2f} KB",
+                    'size_bytes': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                }
+                if self.describe:
+                    file_entry.update(self.describe(entry.name))
+                files.append(file_entry)
+
+        return {'files': files, 'subdirs': subdirs}
+
+    def _refresh(self, root: str, force: bool = False) -> int:
+        """Atualiza o catálogo; retorna quantas pastas foram relidas"""
+        if root != self._root or force:
+            self._root = root
+            self._dirs = {}
+
+        rescanned = 0
+        seen = set()
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            seen.add(path)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+
+            cached = self._dirs.get(path)
+            if not cached or cached['mtime'] != mtime:
+                try:
+                    cached = {'mtime': mtime, **self._scan_dir(path, root)}
+                except OSError as e:
+                    logger.warning(f"Erro ao listar pasta {path}: {str(e)}")
+                    continue
+                self._dirs[path] = cached
+                rescanned += 1
+            stack.extend(cached['subdirs'])
+
+        # Pastas removidas saem do catálogo
+        for path in [p for p in self._dirs if p not in seen]:
+            del self._dirs[path]
+        return rescanned
+
+    def list_files(self, root: str, folder: Optional[str] = None, report_type: Optional[str] = None,
+                   offset: int = 0, limit: Optional[int] = None, refresh: bool = False) -> Dict:
+        """
+        Lista os relatórios da pasta raiz (ordenados por pasta e nome)
+
+        Args:
+            root: Pasta raiz
+            folder: Filtra por pasta relativa ('' = arquivos soltos na raiz)
+            report_type: Filtra por tipo de relatório
+            offset, limit: Paginação (limit None = todos)
+            refresh: Ignora o cache e varre tudo de novo
+
+        Returns:
+            Dict com files (página), total (após filtros) e folders (pasta -> quantidade)
+        """
+        if not os.path.exists(root):
+            logger.warning(f"Pasta raiz não existe: {root}")
+            return {'files': [], 'total': 0, 'folders': {}}
+
+        with self.lock:
+            rescanned = self._refresh(root, force=refresh)
+            if rescanned:
+                logger.info(f"Catálogo da Base BI: {rescanned} pasta(s) relida(s)")
+            all_files = [entry for cached in self._dirs.values() for entry in cached['files']]
+
+        all_files.sort(key=lambda x: (x['folder'], x['filename']))
+
+        folders = {}
+        for entry in all_files:
+            folders[entry['folder']] = folders.get(entry['folder'], 0) + 1
+
+        if folder is not None:
+            all_files = [entry for entry in all_files if entry['folder'] == folder]
+        if report_type:
+            all_files = [entry for entry in all_files if entry.get('report_type') == report_type]
+
+        total = len(all_files)
+        page = all_files[offset:offset + limit] if limit is not None else all_files[offset:]
+
+        # Contagem de linhas vem de leituras anteriores (cache); entradas do catálogo não são alteradas
+        files = []
+        for entry in page:
+            entry = dict(entry)
+            if self.row_count:
+                entry['row_count'] = self.row_count(entry['full_path'], entry['size_bytes'], entry['mtime_ns'])
+            files.append(entry)
+
+        return {'files': files, 'total': total, 'folders': folders}
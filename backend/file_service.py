@@ -2,6 +2,8 @@ import os
 import pandas as pd
 from pathlib import Path
 
+from excel_reader import read_excel_fast
+
 class FileService:
     def __init__(self):
         self.upload_dir = Path("uploads")
@@ -23,7 +25,7 @@ class FileService:
                 raise FileNotFoundError("Arquivo Nomes.xlsx não encontrado")
             
             # Lê Excel sem converter datas automaticamente
-            df = pd.read_excel(self.nomes_file, dtype={'Nome': str, 'Admissão': str, 'Demissão': str})
+            df = read_excel_fast(str(self.nomes_file), dtype={'Nome': str, 'Admissão': str, 'Demissão': str})
             
             # Validate columns
             required_columns = ["Nome", "Admissão", "Demissão"]
@@ -2,8 +2,9 @@ import os
 import sys
 import logging
 import warnings
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
@@ -28,8 +29,11 @@ warnings.filterwarnings('ignore', category=FutureWarning)
 from bot_service import PontoMaisBot, ReportStatus
 from config_service import ConfigService
 from file_service import FileService
-from bi_service import BIService
-from queue_manager import queue_manager
+from bi_service import BIService, EXPORT_FORMATS
+from timeline_service import TIMELINE_BASENAME
+from download_service import DownloadService
+from queue_manager import queue_manager, PRIORITY_HIGH
+from queue_store_service import QueueStoreService
 from task_processor import TaskProcessor
 from scheduler_service import SchedulerService
 
@@ -102,10 +106,22 @@ sys.stdout = LogCapture(sys.stdout)
 config_service = ConfigService()
 file_service = FileService()
 bi_service = BIService(config_service=config_service)
+download_service = DownloadService()
 
 # Task Processor e Queue Manager
-task_processor = TaskProcessor(config_service, file_service, queue_manager, log_callback=add_log)
+task_processor = TaskProcessor(config_service, file_service, queue_manager, log_callback=add_log, bi_service=bi_service)
 queue_manager.set_task_processor(task_processor.process_task)
+try:
+    queue_config = config_service.load_config().get("queue", {})
+    queue_manager.set_resource_limits(queue_config.get("resource_limits", {}))
+    queue_manager.set_retention(queue_config.get("retention", {}))
+except Exception as e:
+    add_log("error", f"SISTEMA - Configuração da fila não carregada, usando os padrões: {str(e)}")
+# Fila persistida: tarefas pendentes ou interrompidas por um reinício são recuperadas
+try:
+    queue_manager.set_store(QueueStoreService(str(config_service.config_dir / "queue.sqlite3")))
+except Exception as e:
+    add_log("error", f"SISTEMA - Fila persistida indisponível, tarefas ficam só em memória: {str(e)}")
 queue_manager.start_worker()
 
 # Scheduler Service
@@ -208,31 +224,42 @@ async def update_columns(column_config: ColumnConfig):
 async def download_report(request: ReportRequest):
     """Adiciona relatório à fila de processamento"""
     try:
-        # Adiciona à fila
-        task_id = queue_manager.add_task('report', {
+        # Adiciona à fila com prioridade alta: pedido interativo passa à frente dos lotes agendados
+        # coalesced: mesmo relatório e período já pedidos, o pedido foi agrupado na tarefa existente
+        task_id, coalesced = queue_manager.add_task('report', {
             'report_name': request.report_name,
             'date_ranges': [
                 {'start_date': dr.start_date, 'end_date': dr.end_date} 
                 for dr in request.date_ranges
             ] if request.date_ranges else None
-        })
+        }, priority=PRIORITY_HIGH, return_coalesced=True)
         
-        queue_size = queue_manager.get_queue_size()
-        current_task = queue_manager.get_current_task()
+        # Agrupado em tarefa já em execução (COALESCE_RUNNING_TASKS): não tem posição na fila
+        task = queue_manager.get_task_status(task_id) or {}
+        running = coalesced and task.get('status') == 'processing'
+        queue_position = None if running else (queue_manager.get_queue_position(task_id) or 1)
+        processing_immediately = queue_manager.can_start_now(task_id)
         
-        # Se não há tarefa sendo processada e fila está vazia, executa imediatamente
-        if not current_task and queue_size == 1:
+        # Se o recurso da tarefa tem vaga e ela é a próxima dele, executa imediatamente
+        if running:
+            add_log("info", f"SISTEMA - Relatório já em processamento, pedido agrupado: {request.report_name}")
+            message = "Relatório já está em processamento"
+        elif coalesced:
+            add_log("info", f"SISTEMA - Relatório já estava na fila, pedido agrupado: {request.report_name}")
+            message = f"Relatório já estava na fila. Posição: {queue_position}"
+        elif processing_immediately:
             add_log("info", f"SISTEMA - Processando relatório imediatamente: {request.report_name}")
             message = "Processando relatório..."
         else:
-            add_log("info", f"SISTEMA - Relatório adicionado à fila: {request.report_name} (posição {queue_size})")
-            message = f"Relatório adicionado à fila. Posição: {queue_size}"
+            add_log("info", f"SISTEMA - Relatório adicionado à fila: {request.report_name} (posição {queue_position})")
+            message = f"Relatório adicionado à fila. Posição: {queue_position}"
         
         return {
             "task_id": task_id,
             "message": message,
-            "queue_position": queue_size,
-            "processing_immediately": not current_task and queue_size == 1
+            "queue_position": queue_position,
+            "processing_immediately": processing_immediately,
+            "coalesced": coalesced
         }
     except Exception as e:
         add_log("error", f"SISTEMA - Erro ao adicionar relatório à fila: {str(e)}")
@@ -346,22 +373,22 @@ async def process_rescisao_employee():
         # Adiciona à fila
         task_id = queue_manager.add_task('rescisao', {})
         
-        queue_size = queue_manager.get_queue_size()
-        current_task = queue_manager.get_current_task()
+        queue_position = queue_manager.get_queue_position(task_id) or 1
+        processing_immediately = queue_manager.can_start_now(task_id)
         
-        # Se não há tarefa sendo processada e fila está vazia, executa imediatamente
-        if not current_task and queue_size == 1:
+        # Se o recurso da tarefa tem vaga e ela é a próxima dele, executa imediatamente
+        if processing_immediately:
             add_log("info", "Processando rescisão imediatamente")
             message = "Processando rescisão..."
         else:
-            add_log("info", f"Rescisão adicionada à fila (posição {queue_size})")
-            message = f"Rescisão adicionada à fila. Posição: {queue_size}"
+            add_log("info", f"Rescisão adicionada à fila (posição {queue_position})")
+            message = f"Rescisão adicionada à fila. Posição: {queue_position}"
         
         return {
             "task_id": task_id,
             "message": message,
-            "queue_position": queue_size,
-            "processing_immediately": not current_task and queue_size == 1
+            "queue_position": queue_position,
+            "processing_immediately": processing_immediately
         }
     except Exception as e:
         add_log("error", f"Erro ao adicionar rescisão à fila: {str(e)}")
@@ -391,23 +418,23 @@ async def list_reports():
 async def download_database_report():
     """Adiciona consulta ao banco à fila de processamento"""
     try:
-        task_id = queue_manager.add_task('db_query', {'query_type': 'trainees'})
+        task_id = queue_manager.add_task('db_query', {'query_type': 'trainees'}, priority=PRIORITY_HIGH)
         
-        queue_size = queue_manager.get_queue_size()
-        current_task = queue_manager.get_current_task()
+        queue_position = queue_manager.get_queue_position(task_id) or 1
+        processing_immediately = queue_manager.can_start_now(task_id)
         
-        if not current_task and queue_size == 1:
+        if processing_immediately:
             add_log("info", "Processando consulta ao banco imediatamente")
             message = "Processando consulta..."
         else:
-            add_log("info", f"Consulta adicionada à fila (posição {queue_size})")
-            message = f"Consulta adicionada à fila. Posição: {queue_size}"
+            add_log("info", f"Consulta adicionada à fila (posição {queue_position})")
+            message = f"Consulta adicionada à fila. Posição: {queue_position}"
         
         return {
             "task_id": task_id,
             "message": message,
-            "queue_position": queue_size,
-            "processing_immediately": not current_task and queue_size == 1
+            "queue_position": queue_position,
+            "processing_immediately": processing_immediately
         }
     except Exception as e:
         add_log("error", f"Erro ao adicionar consulta à fila: {str(e)}")
@@ -424,11 +451,12 @@ async def get_logs():
 async def get_queue_status():
     """Retorna status completo da fila"""
     try:
-        current = queue_manager.get_current_task()
+        current_tasks = queue_manager.get_current_tasks()
         queue_items = queue_manager.get_queue_items()
         
         return {
-            "current_task": current,
+            "current_tasks": current_tasks,
+            "resource_limits": queue_manager.resource_limits,
             "queue_size": len(queue_items),
             "queue_items": queue_items
         }
@@ -436,11 +464,16 @@ async def get_queue_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/queue/all")
-async def get_all_tasks():
-    """Retorna todas as tarefas (histórico + fila + atual)"""
+async def get_all_tasks(offset: int = 0, limit: Optional[int] = None):
+    """
+    Retorna as tarefas retidas em memória (histórico + fila + atual), mais recentes primeiro.
+    Paginação com offset/limit; total é a quantidade retida, não só a da página.
+    """
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset/limit inválidos")
     try:
-        tasks = queue_manager.get_all_tasks()
-        return {"tasks": tasks, "total": len(tasks)}
+        tasks = queue_manager.get_all_tasks(offset=offset, limit=limit)
+        return {"tasks": tasks, "total": queue_manager.get_task_count(), "offset": offset, "limit": limit}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -466,56 +499,258 @@ async def clear_completed_tasks():
 
 class BIMergeRequest(BaseModel):
     selected_files: Optional[List[Dict]] = None
+    vectorized: bool = False  # Consolidação colunar (groupby) em vez do laço linha a linha
+    use_cache: bool = True  # Só relê arquivos novos ou alterados
+    streaming: bool = False  # Lê e consolida em blocos, dentro do orçamento bi.stream_memory_mb
+    export_format: str = "csv"  # csv, csv.gz, csv.zst ou parquet
+    sync: bool = False  # Espera a mesclagem terminar em vez de adicioná-la à fila
+
+class BITimelineRequest(BaseModel):
+    period_start: Optional[str] = None  # AAAA-MM-DD (padrão: todos os períodos)
+    period_end: Optional[str] = None
+    use_cache: bool = True
+    export_format: str = "csv"  # csv, csv.gz, csv.zst ou parquet
 
 @app.get("/api/bi/files")
-async def get_bi_files():
-    """Lista arquivos CSV/Excel em todas as subpastas da pasta raiz"""
+def get_bi_files(folder: Optional[str] = None, report_type: Optional[str] = None,
+                 offset: int = 0, limit: Optional[int] = None, refresh: bool = False):
+    """
+    Lista arquivos CSV/Excel em todas as subpastas da pasta raiz
+    
+    Vem do catálogo em memória (só pastas alteradas são relidas). Filtros por
+    pasta e tipo de relatório, paginação com offset/limit e refresh=true para
+    varrer tudo de novo. Rota síncrona: a varredura roda no threadpool.
+    """
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset/limit inválidos")
     try:
-        files = bi_service.get_available_files()
-        return {"files": files, "total": len(files)}
+        result = bi_service.list_files(folder=folder, report_type=report_type,
+                                       offset=offset, limit=limit, refresh=refresh)
+        return {**result, "offset": offset, "limit": limit}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/bi/merge")
 async def merge_bi_data(request: BIMergeRequest):
-    """Mescla arquivos CSV/Excel selecionados em uma base consolidada"""
+    """
+    Mescla arquivos CSV/Excel selecionados em uma base consolidada
+    
+    Por padrão adiciona uma tarefa 'bi_merge' à fila e retorna o task_id
+    (acompanhar em /api/reports/status/{task_id}). Com sync=true espera a
+    mesclagem terminar, executando-a fora do event loop.
+    """
+    if request.export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {request.export_format} (opções: {', '.join(EXPORT_FORMATS)})")
+    
+    data = {
+        "selected_files": request.selected_files,
+        "vectorized": request.vectorized,
+        "use_cache": request.use_cache,
+        "streaming": request.streaming,
+        "export_format": request.export_format
+    }
+    
+    if not request.sync:
+        try:
+            task_id = queue_manager.add_task('bi_merge', data)
+            
+            queue_position = queue_manager.get_queue_position(task_id) or 1
+            processing_immediately = queue_manager.can_start_now(task_id)
+            
+            if processing_immediately:
+                add_log("info", "SISTEMA - Processando mesclagem da Base BI imediatamente")
+                message = "Processando mesclagem..."
+            else:
+                add_log("info", f"SISTEMA - Mesclagem da Base BI adicionada à fila (posição {queue_position})")
+                message = f"Mesclagem adicionada à fila. Posição: {queue_position}"
+            
+            return {
+                "success": True,
+                "task_id": task_id,
+                "message": message,
+                "queue_position": queue_position,
+                "processing_immediately": processing_immediately
+            }
+        except Exception as e:
+            add_log("error", f"SISTEMA - Erro ao adicionar mesclagem à fila: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+    
     try:
-        add_log("info", "Iniciando mesclagem de dados para Base BI")
-        
-        # Callback para reportar progresso
-        def progress_callback(message):
-            add_log("info", message)
-        
-        # Realiza a mesclagem com callback de progresso
-        df = bi_service.merge_reports(request.selected_files, progress_callback=progress_callback)
-        
+        return await run_in_threadpool(task_processor.run_bi_merge, data)
+    except Exception as e:
+        add_log("error", f"✗ Erro ao mesclar dados: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/bi/timeline")
+async def build_bi_timeline(request: BITimelineRequest):
+    """
+    Gera o relatório diário operacional (Jornada + Banco de horas + Faltas + Auditoria)
+    
+    Uma linha por colaborador e dia, com os arquivos de todos os períodos
+    encontrados na pasta raiz (ou só os do intervalo pedido). O arquivo gerado
+    é baixado por /api/bi/download/{output_file}.
+    """
+    if request.export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {request.export_format} (opções: {', '.join(EXPORT_FORMATS)})")
+    for value in (request.period_start, request.period_end):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Data inválida: {value} (use AAAA-MM-DD)")
+    
+    def build():
+        df = bi_service.build_daily_timeline(request.period_start, request.period_end, use_cache=request.use_cache)
         if df.empty:
-            add_log("warning", "Nenhum dado foi consolidado")
-            return {"success": False, "message": "Nenhum dado encontrado para consolidar"}
-        
-        add_log("info", "Exportando base consolidada...")
-        
-        # Exporta para CSV
-        output_path = bi_service.export_merged_data(df)
-        
-        add_log("success", f"✓ Base BI consolidada: {len(df)} registros únicos, {len(df.columns)} colunas")
-        add_log("success", f"✓ Arquivo salvo em: {output_path}")
+            return {"success": False, "records": 0, "message": "Nenhum relatório diário encontrado"}
         
+        output_filename = TIMELINE_BASENAME + EXPORT_FORMATS[request.export_format]
+        output_path = bi_service.export_merged_data(df, output_filename, export_format=request.export_format)
         return {
             "success": True,
             "records": len(df),
             "columns": len(df.columns),
+            "collaborators": int(df['NOME'].nunique()),
+            "period_start": df['DATA'].min().strftime("%Y-%m-%d"),
+            "period_end": df['DATA'].max().strftime("%Y-%m-%d"),
             "output_file": os.path.basename(output_path),
             "full_path": output_path,
-            "message": f"Base consolidada com sucesso: {len(df)} registros"
+            "message": f"Relatório diário gerado: {len(df)} dias de colaboradores"
         }
+    
+    try:
+        result = await run_in_threadpool(build)
+        if result["success"]:
+            add_log("info", f"✓ {result['message']}")
+        return result
+    except Exception as e:
+        add_log("error", f"✗ Erro ao gerar relatório diário: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/bi/metrics")
+def get_bi_metrics(history: int = 5, detail: bool = True):
+    """
+    Tempo (wall/CPU), linhas e pico de memória por etapa das mesclagens da Base BI
+    
+    last: última mesclagem (com detail, também por pasta e por arquivo);
+    history: totais por etapa das mesclagens anteriores, mais recente primeiro.
+    """
+    try:
+        return bi_service.metrics_summary(history=history, detail=detail)
     except Exception as e:
-        add_log("error", f"✗ Erro ao mesclar dados: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/bi/store")
+def get_bi_store_status():
+    """Tabelas da base analítica local (SQLite) com linhas e arquivos ingeridos"""
+    try:
+        return bi_service.store_service.status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/bi/store/refresh")
+async def refresh_bi_store(use_cache: bool = True, refresh: bool = False):
+    """
+    Atualiza a base analítica com arquivos novos ou alterados da pasta raiz
+    
+    refresh=true varre todas as pastas (arquivos sobrescritos sem mudar de nome).
+    """
+    try:
+        stats = await run_in_threadpool(bi_service.refresh_store, use_cache, refresh)
+        add_log("info", f"SISTEMA - Base analítica: {stats['ingested']} arquivo(s) ingerido(s), {stats['removed']} removido(s)")
+        return {"success": True, **stats}
+    except Exception as e:
+        add_log("error", f"✗ Erro ao atualizar base analítica: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _split_param(value: Optional[str]) -> Optional[List[str]]:
+    """Parâmetro de query separado por vírgulas -> lista (None se vazio)"""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+@app.get("/api/bi/query")
+async def query_bi_base(cpf: Optional[str] = None, equipe: Optional[str] = None, nome: Optional[str] = None,
+                        start: Optional[str] = None, end: Optional[str] = None, report: Optional[str] = None,
+                        columns: Optional[str] = None, sort: Optional[str] = None,
+                        group_by: Optional[str] = None, metrics: Optional[str] = None,
+                        limit: int = 100, cursor: Optional[str] = None):
+    """
+    Consulta a base consolidada sem baixar o arquivo inteiro
+    
+    Filtros por CPF, equipe, nome, período (AAAA-MM-DD) e relatório de origem;
+    columns, group_by e metrics separados por vírgula (ex: metrics=count,max:Data).
+    Páginas seguintes: repetir a consulta com cursor=next_cursor.
+    """
+    try:
+        return await run_in_threadpool(
+            bi_service.query_base,
+            cpf=cpf, equipe=equipe, nome=nome, start=start, end=end, report=report,
+            columns=_split_param(columns), sort=sort, group_by=_split_param(group_by),
+            metrics=_split_param(metrics), limit=limit, cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/bi/rollups")
+async def get_bi_rollups(equipe: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None):
+    """
+    Agregados por equipe e mês da base analítica (ausências, horas, banco de horas,
+    horas extras e espelhos assinados); start/end no formato AAAA-MM
+    """
+    try:
+        df = await run_in_threadpool(bi_service.rollup_service.frame, equipe, start, end)
+        return {"rows": df.astype(object).where(df.notna(), None).to_dict('records'), "count": len(df)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/bi/rollups/refresh")
+async def refresh_bi_rollups(force: bool = False):
+    """
+    Recalcula os agregados dos meses com arquivos novos, alterados ou removidos
+    da base analítica (force=true recalcula todos) e regrava rollup_equipe_mes.csv
+    """
+    try:
+        stats = await run_in_threadpool(bi_service.refresh_rollups, force)
+        add_log("info", f"SISTEMA - Agregados por equipe: {len(stats['months'])} mês(es) recalculado(s)")
+        return {"success": True, **stats}
+    except Exception as e:
+        add_log("error", f"✗ Erro ao atualizar agregados por equipe: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/bi/employees")
+async def get_bi_employees(cpf: Optional[str] = None, nome: Optional[str] = None):
+    """
+    Colaboradores da dimensão usada na mesclagem (CPF, nomes e histórico de equipes)
+    por CPF ou por nome
+    """
+    try:
+        employees = await run_in_threadpool(bi_service.employee_service.lookup, cpf, nome)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not employees:
+        raise HTTPException(status_code=404, detail="Colaborador não encontrado na dimensão")
+    return {"employees": employees, "count": len(employees)}
+
 @app.get("/api/bi/download/{filename}")
-async def download_bi_file(filename: str):
-    """Download do arquivo consolidado da Base BI"""
+async def download_bi_file(filename: str, request: Request):
+    """
+    Download do arquivo consolidado da Base BI
+    
+    Suporta Range (206), ETag/If-None-Match (304) e Accept-Encoding: gzip
+    (serve o .gz pré-comprimido gerado na exportação do CSV).
+    """
+    if os.path.basename(filename) != filename:
+        raise HTTPException(status_code=400, detail="Nome de arquivo inválido")
+    
     try:
         # Busca o arquivo na pasta raiz configurada
         config = config_service.load_config()
@@ -525,11 +760,9 @@ async def download_bi_file(filename: str):
         if not os.path.exists(filepath):
             raise HTTPException(status_code=404, detail="Arquivo não encontrado")
         
-        return FileResponse(
-            filepath,
-            media_type="text/csv",
-            filename=filename
-        )
+        return download_service.file_response(filepath, request.headers, filename=filename)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
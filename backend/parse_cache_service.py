@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando a leitura/normalização mudar, para invalidar frames antigos
+PARSER_VERSION = 2
+
+
+class ParseCacheService:
+    """
+    Manifesto de arquivos já lidos pela Base BI
+
+    Cada arquivo é identificado por caminho, tamanho, mtime e hash do conteúdo.
+    O DataFrame lido e normalizado fica em disco (pickle) e é reaproveitado
+    enquanto o arquivo de origem não mudar.
+    """
+
+    def __init__(self, cache_dir: str = "cache/bi"):
+        self.cache_dir = Path(cache_dir)
+        self.frames_dir = self.cache_dir / "frames"
+        self.manifest_path = self.cache_dir / "manifest.json"
+        self.lock = threading.Lock()
+        self._manifest = None
+        # Entradas ainda não gravadas no manifesto (gravadas de uma vez por flush)
+        self._dirty = False
+
+    def _load_manifest(self) -> Dict:
+        if self._manifest is None:
+            self._manifest = {}
+            if self.manifest_path.exists():
+                try:
+                    with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get('parser_version') == PARSER_VERSION:
+                        self._manifest = data.get('files', {})
+                    else:
+                        logger.info("Versão do leitor mudou, cache de arquivos será refeito")
+                except Exception as e:
+                    logger.warning(f"Manifesto de cache inválido, recriando: {str(e)}")
+        return self._manifest
+
+    def _save_manifest(self):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.manifest_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'parser_version': PARSER_VERSION, 'files': self._manifest}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar manifesto de cache: {str(e)}")
+
+    def flush(self):
+        """Grava o manifesto se alguma entrada mudou desde a última gravação (uma vez por mesclagem)"""
+        with self.lock:
+            if self._dirty:
+                self._save_manifest()
+                self._dirty = False
+
+    def _content_hash(self, filepath: str) -> str:
+        """Hash do conteúdo do arquivo (lido em blocos)"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _frame_path(self, key: str) -> Path:
+        name = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        return self.frames_dir / f"{name}.pkl"
+
+    def load(self, filepath: str) -> Optional[pd.DataFrame]:
+        """
+        Retorna o DataFrame em cache se o arquivo não mudou desde a última leitura
+
+        Tamanho e mtime iguais bastam; se só o mtime mudou (ex: cópia para o
+        compartilhamento), o hash do conteúdo decide.
+        """
+        key = os.path.abspath(filepath)
+        stat = os.stat(filepath)
+
+        with self.lock:
+            entry = self._load_manifest().get(key)
+        if not entry or entry.get('size') != stat.st_size:
+            return None
+
+        if entry.get('mtime') != stat.st_mtime_ns:
+            if self._content_hash(filepath) != entry.get('hash'):
+                return None
+            with self.lock:
+                entry['mtime'] = stat.st_mtime_ns
+                self._dirty = True
+
+        frame_path = self._frame_path(key)
+        try:
+            return pd.read_pickle(frame_path)
+        except Exception as e:
+            logger.warning(f"Frame em cache ilegível para {os.path.basename(filepath)}: {str(e)}")
+            return None
+
+    def known_rows(self, filepath: str, size: int, mtime_ns: int) -> Optional[int]:
+        """Linhas do arquivo na última leitura, se ele não mudou desde então (sem ler o disco)"""
+        with self.lock:
+            entry = self._load_manifest().get(os.path.abspath(filepath))
+        if not entry or entry.get('size') != size or entry.get('mtime') != mtime_ns:
+            return None
+        return entry.get('rows')
+    
+    def store(self, filepath: str, df: pd.DataFrame):
+        """Grava o DataFrame lido e registra o arquivo no manifesto (gravado no próximo flush)"""
+        key = os.path.abspath(filepath)
+        try:
+            stat = os.stat(filepath)
+            content_hash = self._content_hash(filepath)
+            frame_path = self._frame_path(key)
+            frame_path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_pickle(frame_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar cache de {os.path.basename(filepath)}: {str(e)}")
+            return
+
+        with self.lock:
+            self._load_manifest()[key] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'hash': content_hash,
+                'rows': len(df),
+                'columns': len(df.columns),
+            }
+            self._dirty = True
+
+    def prune(self) -> int:
+        """Remove do cache arquivos que não existem mais na origem"""
+        with self.lock:
+            manifest = self._load_manifest()
+            missing = [key for key in manifest if not os.path.exists(key)]
+            for key in missing:
+                manifest.pop(key, None)
+                try:
+                    self._frame_path(key).unlink()
+                except OSError:
+                    pass
+            if missing:
+                self._dirty = True
+        return len(missing)
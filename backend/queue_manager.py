@@ -1,94 +1,429 @@
 import threading
-import queue
+import heapq
+import itertools
+import time
 import json
 import uuid
-from datetime import datetime
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Níveis de prioridade (maior executa antes)
+PRIORITY_LOW = -1     # Agendamentos e lotes
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 1     # Pedidos interativos da interface
+# Espera que vale um nível de prioridade (envelhecimento: tarefas baixas não ficam paradas para sempre)
+AGING_SECONDS = 30 * 60
+
+# Recurso usado por cada tipo de tarefa
+TASK_RESOURCES = {
+    'report': 'browser',
+    'rescisao': 'browser',
+    'db_query': 'database',
+    'bi_merge': 'cpu',
+    'queue_batch': 'io',
+}
+DEFAULT_RESOURCE = 'io'
+# Tarefas simultâneas por recurso (browser: o que o PontoMais tolera com o mesmo login)
+DEFAULT_RESOURCE_LIMITS = {
+    'browser': 1,
+    'database': 2,
+    'cpu': 1,
+    'io': 2,
+}
+# Tarefas que voltam para a fila se o serviço parou durante a execução (as demais ficam 'interrupted')
+RESTARTABLE_TASKS = {'report', 'db_query', 'bi_merge'}
+# Intervalo de gravação do progresso na base (write-behind)
+PROGRESS_FLUSH_SECONDS = 2
+# Tarefas iguais já em execução recebem os novos pedidos (as demais só se agrupam enquanto pendentes)
+COALESCE_RUNNING_TASKS = {'report', 'db_query'}
+# Dados que identificam quem pediu, não o que é feito (fora da impressão digital)
+FINGERPRINT_IGNORED_KEYS = {'scheduled', 'schedule_name'}
+# Retenção do registro de tarefas: finalizadas além das últimas RETENTION_TASKS ou com mais de
+# RETENTION_DAYS dias saem da memória, das mais antigas para as mais novas (0 = sem limite).
+# Pendentes e em execução nunca saem. Com spill_to_disk as retiradas continuam na base até RETENTION_DAYS.
+RETENTION_TASKS = 500
+RETENTION_DAYS = 7
+
+
+def task_fingerprint(task_type, task_data):
+    """
+    Impressão digital da tarefa: tipo + JSON canônico dos dados (chaves ordenadas, sem
+    metadados de origem e sem valores vazios, então date_ranges None ou ausente é igual)
+    """
+    payload = {
+        key: value for key, value in (task_data or {}).items()
+        if key not in FINGERPRINT_IGNORED_KEYS and value not in (None, [], {}, '')
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha1(f"{task_type}\n{canonical}".encode('utf-8')).hexdigest()
+
+
 class QueueManager:
     """Gerenciador de fila de tarefas com processamento assíncrono"""
     
-    def __init__(self):
-        self.task_queue = queue.Queue()
-        self.current_task = None
+    def __init__(self, aging_seconds=AGING_SECONDS, resource_limits=None, store=None, retention=None):
+        # Um heap de (ordem, sequência, tarefa) por recurso: a sequência desempata na ordem de chegada
+        self.task_queue = {}
+        self.aging_seconds = aging_seconds
+        self._sequence = itertools.count()
+        self.resource_limits = dict(DEFAULT_RESOURCE_LIMITS)
+        self.running = {}  # task_id -> tarefa em execução
+        self.running_by_resource = {}  # recurso -> quantidade em execução
+        self.active_fingerprints = {}  # impressão digital -> task_id pendente ou em execução
         self.task_history = []
-        self.tasks_status = {}  # task_id -> status
-        self.worker_thread = None
+        self.tasks_status = {}  # task_id -> status, na ordem de criação (índice da listagem, sem ordenar)
+        self.finished = OrderedDict()  # task_id das finalizadas, na ordem de conclusão (próximas a sair)
+        self.retention_tasks = RETENTION_TASKS
+        self.retention_days = RETENTION_DAYS
+        self.spill_to_disk = True
+        self.worker_threads = []
         self.is_running = False
         self.lock = threading.Lock()
+        self.task_ready = threading.Condition(self.lock)
+        
+        # Persistência (QueueStoreService): estados gravados na hora, progresso em lote
+        self.store = None
+        self._dirty_progress = set()
+        # Foto e gravação juntas: a gravação mais recente é sempre a do estado mais recente
+        self._persist_lock = threading.Lock()
+        self._flush_stop = threading.Event()
+        self.flush_thread = None
         
         # Callback para processar tarefas
         self.task_processor = None
         
+        if resource_limits:
+            self.set_resource_limits(resource_limits)
+        if retention:
+            self.set_retention(retention)
+        if store:
+            self.set_store(store)
+    
     def set_task_processor(self, processor):
         """Define a função que processará as tarefas"""
         self.task_processor = processor
+    
+    def set_resource_limits(self, limits):
+        """Define quantas tarefas de cada recurso rodam ao mesmo tempo (chamar antes de start_worker)"""
+        with self.lock:
+            for resource, limit in (limits or {}).items():
+                try:
+                    self.resource_limits[resource] = max(1, int(limit))
+                except (TypeError, ValueError):
+                    logger.warning(f"Limite inválido para o recurso {resource}: {limit}")
+        logger.info(f"Limites por recurso: {self.resource_limits}")
+    
+    def set_retention(self, settings):
+        """Define a retenção do registro: {'tasks': N, 'days': D, 'spill_to_disk': bool}"""
+        settings = settings or {}
+        with self.lock:
+            try:
+                if 'tasks' in settings:
+                    self.retention_tasks = max(0, int(settings['tasks']))
+                if 'days' in settings:
+                    self.retention_days = max(0, float(settings['days']))
+            except (TypeError, ValueError):
+                logger.warning(f"Retenção inválida para a fila: {settings}")
+            if 'spill_to_disk' in settings:
+                self.spill_to_disk = bool(settings['spill_to_disk'])
+            evicted, cutoff = self._evict()
+        self._drop_evicted(evicted, cutoff)
+        logger.info(f"Retenção da fila: {self.retention_tasks} tarefas, {self.retention_days} dias, "
+                    f"spill_to_disk={self.spill_to_disk}")
+    
+    def set_store(self, store):
+        """Liga a fila à base persistida e recupera as tarefas gravadas (chamar antes de start_worker)"""
+        self._recover(store)
+        self.store = store
+        with self.lock:
+            evicted, cutoff = self._evict()
+        self._drop_evicted(evicted, cutoff)
+    
+    def _recover(self, store):
+        """
+        Recarrega as tarefas da base: pendentes voltam para a fila com a espera já acumulada,
+        tarefas que estavam em execução são reenfileiradas (RESTARTABLE_TASKS) ou marcadas
+        como 'interrupted', e as finalizadas voltam ao histórico
+        """
+        tasks = store.load()
+        now = datetime.now()
+        requeued = interrupted = 0
+        changed = []
+        finished = []
         
-    def add_task(self, task_type, task_data, priority=0):
+        with self.lock:
+            for task in tasks:
+                task['resource'] = task.get('resource') or TASK_RESOURCES.get(task['type'], DEFAULT_RESOURCE)
+                task['priority'] = task.get('priority') or 0
+                task['fingerprint'] = task_fingerprint(task['type'], task['data'])
+                task['coalesced'] = 0
+                
+                if task['status'] == 'processing':
+                    if task['type'] in RESTARTABLE_TASKS:
+                        task.update({'status': 'pending', 'progress': 0, 'started_at': None,
+                                     'message': 'Reenfileirada após reinício do serviço'})
+                        requeued += 1
+                    else:
+                        task.update({'status': 'interrupted', 'completed_at': now.isoformat(),
+                                     'message': 'Interrompida pelo reinício do serviço',
+                                     'error': 'Serviço reiniciado durante a execução'})
+                        interrupted += 1
+                    changed.append(dict(task))
+                
+                self.tasks_status[task['id']] = task
+                if task['status'] == 'pending':
+                    self.active_fingerprints[task['fingerprint']] = task['id']
+                    waited = (now - datetime.fromisoformat(task['created_at'])).total_seconds()
+                    heap = self.task_queue.setdefault(task['resource'], [])
+                    heapq.heappush(heap, (self._schedule_key(task['priority'], waited), next(self._sequence), task))
+                else:
+                    self.task_history.append(task)
+                    finished.append(task)
+            self.task_history = self.task_history[-100:]
+            for task in sorted(finished, key=lambda x: x['completed_at'] or x['created_at']):
+                self.finished[task['id']] = None
+            pending = sum(len(heap) for heap in self.task_queue.values())
+        
+        for task in changed:
+            store.save(task)
+        if tasks:
+            logger.info(f"Fila recuperada: {pending} pendentes ({requeued} reenfileiradas), "
+                        f"{interrupted} interrompidas, {len(tasks)} tarefas na base")
+    
+    def _evict(self):
+        """
+        Retira da memória as finalizadas mais antigas além de retention_tasks ou com mais de
+        retention_days (chamar com o lock). Percorre só o início de finished, então o custo
+        é proporcional ao que sai. Retorna (ids retirados, corte em ISO ou None).
+        """
+        cutoff = None
+        if self.retention_days:
+            cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        evicted = []
+        while self.finished:
+            task_id = next(iter(self.finished))
+            task = self.tasks_status.get(task_id)
+            if task is not None:
+                over_limit = self.retention_tasks and len(self.tasks_status) > self.retention_tasks
+                expired = cutoff and (task['completed_at'] or task['created_at']) < cutoff
+                if not (over_limit or expired):
+                    break
+                del self.tasks_status[task_id]
+                evicted.append(task_id)
+            del self.finished[task_id]
+        return evicted, cutoff
+    
+    def _drop_evicted(self, evicted, cutoff):
+        """
+        Aplica a retenção na base: sem spill_to_disk as retiradas saem dela também; com
+        spill_to_disk ficam consultáveis por id e só as mais antigas que retention_days são apagadas
+        """
+        if not evicted:
+            return
+        logger.info(f"{len(evicted)} tarefas finalizadas retiradas da memória")
+        if not self.store:
+            return
+        try:
+            with self._persist_lock:
+                if not self.spill_to_disk:
+                    self.store.delete(evicted)
+                elif cutoff:
+                    self.store.delete_finished_before(cutoff)
+        except Exception as e:
+            logger.error(f"Erro ao aplicar a retenção na base da fila: {str(e)}")
+    
+    def _persist(self, task):
+        """
+        Grava o estado atual da tarefa na base (se houver). A foto é tirada já com a vez
+        de gravar: uma gravação mais lenta não sobrescreve um estado mais novo.
+        """
+        if not self.store:
+            return
+        with self._persist_lock:
+            with self.lock:
+                snapshot = dict(task)
+                self._dirty_progress.discard(task['id'])
+            try:
+                self.store.save(snapshot)
+            except Exception as e:
+                logger.error(f"Erro ao gravar tarefa {task['id']}: {str(e)}")
+    
+    def _flush_progress(self):
+        """Grava de uma vez o progresso acumulado desde o último lote"""
+        with self._persist_lock:
+            with self.lock:
+                updates = [
+                    (task_id, self.tasks_status[task_id]['progress'], self.tasks_status[task_id]['message'])
+                    for task_id in self._dirty_progress if task_id in self.tasks_status
+                ]
+                self._dirty_progress = set()
+            try:
+                self.store.save_progress(updates)
+            except Exception as e:
+                logger.error(f"Erro ao gravar progresso da fila: {str(e)}")
+    
+    def _flush_loop(self):
+        while not self._flush_stop.wait(PROGRESS_FLUSH_SECONDS):
+            self._flush_progress()
+    
+    def add_task(self, task_type, task_data, priority=0, return_coalesced=False):
         """
-        Adiciona tarefa à fila
+        Adiciona tarefa à fila. Se uma tarefa igual (mesmo tipo e dados) já está pendente,
+        ou em execução para COALESCE_RUNNING_TASKS, o pedido é agrupado nela.
         
         Args:
-            task_type: 'report', 'rescisao', 'queue_batch'
+            task_type: 'report', 'rescisao', 'db_query', 'bi_merge', 'queue_batch'
             task_data: Dados específicos da tarefa
-            priority: Prioridade (0 = normal, 1 = alta)
+            priority: Prioridade (PRIORITY_LOW = -1 agendada, 0 = normal, PRIORITY_HIGH = 1 interativa)
+            return_coalesced: Se True, retorna (task_id, agrupado) em vez de só o ID
         
         Returns:
-            task_id: ID único da tarefa
+            task_id: ID único da tarefa (o da tarefa existente, quando agrupado)
         """
-        task_id = str(uuid.uuid4())
-        
-        task = {
-            'id': task_id,
-            'type': task_type,
-            'data': task_data,
-            'status': 'pending',
-            'progress': 0,
-            'message': 'Aguardando processamento',
-            'created_at': datetime.now().isoformat(),
-            'started_at': None,
-            'completed_at': None,
-            'error': None,
-            'priority': priority,
-            'result': None
-        }
+        fingerprint = task_fingerprint(task_type, task_data)
         
+        # Registro e entrada no heap na mesma seção crítica: um pedido igual nunca vê
+        # a tarefa registrada e ainda fora da fila
         with self.lock:
-            self.tasks_status[task_id] = task
-            self.task_queue.put((priority, task))
+            task = self._coalesce(fingerprint, priority)
+            coalesced = task is not None
+            if not coalesced:
+                task = {
+                    'id': str(uuid.uuid4()),
+                    'type': task_type,
+                    'data': task_data,
+                    'status': 'pending',
+                    'progress': 0,
+                    'message': 'Aguardando processamento',
+                    'created_at': datetime.now().isoformat(),
+                    'started_at': None,
+                    'completed_at': None,
+                    'error': None,
+                    'priority': priority,
+                    'resource': TASK_RESOURCES.get(task_type, DEFAULT_RESOURCE),
+                    'fingerprint': fingerprint,
+                    'coalesced': 0,
+                    'result': None
+                }
+                self.tasks_status[task['id']] = task
+                self.active_fingerprints[fingerprint] = task['id']
+                heap = self.task_queue.setdefault(task['resource'], [])
+                heapq.heappush(heap, (self._schedule_key(priority), next(self._sequence), task))
+                self.task_ready.notify()
+            requests = task['coalesced'] + 1
+        
+        self._persist(task)
+        
+        if coalesced:
+            logger.info(f"Tarefa agrupada em {task['id']} ({task_type}, {requests} pedidos)")
+        else:
+            logger.info(f"Tarefa adicionada à fila: {task['id']} ({task_type})")
         
-        logger.info(f"Tarefa adicionada à fila: {task_id} ({task_type})")
+        if return_coalesced:
+            return task['id'], coalesced
+        return task['id']
+    
+    def _coalesce(self, fingerprint, priority):
+        """
+        Tarefa ativa com a mesma impressão digital que pode receber o pedido (chamar com o lock).
+        Pendente com prioridade menor sobe para a do novo pedido, mantendo a espera acumulada.
+        """
+        task = self.tasks_status.get(self.active_fingerprints.get(fingerprint))
+        if task is None:
+            return None
+        if task['status'] == 'processing' and task['type'] not in COALESCE_RUNNING_TASKS:
+            return None
+        if task['status'] not in ('pending', 'processing'):
+            return None
         
-        return task_id
+        task['coalesced'] += 1
+        if task['status'] == 'pending' and priority > task['priority']:
+            heap = self.task_queue[task['resource']]
+            for idx, (key, seq, queued) in enumerate(heap):
+                if queued is task:
+                    heap[idx] = (key - (priority - task['priority']), seq, task)
+                    heapq.heapify(heap)
+                    break
+            task['priority'] = priority
+        return task
+    
+    def _schedule_key(self, priority, waited=0.0):
+        """
+        Ordem de execução com envelhecimento: a prioridade efetiva cresce um nível a cada
+        aging_seconds de espera. Como todas envelhecem no mesmo ritmo, comparar
+        priority + espera / aging_seconds equivale a comparar chegada / aging_seconds - priority,
+        que não muda com o tempo e pode ficar no heap. waited: espera anterior (tarefas recuperadas).
+        """
+        return (time.monotonic() - waited) / self.aging_seconds - priority
+    
+    def _pending_entries(self):
+        """Entradas de todos os recursos na ordem de execução (chamar com o lock)"""
+        entries = [entry for heap in self.task_queue.values() for entry in heap]
+        return sorted(entries, key=lambda entry: entry[:2])
     
     def get_task_status(self, task_id):
-        """Retorna status de uma tarefa específica"""
+        """Retorna status de uma tarefa específica (retirada da memória: lida da base, com spill_to_disk)"""
         with self.lock:
-            return self.tasks_status.get(task_id)
+            task = self.tasks_status.get(task_id)
+        if task is None and self.store and self.spill_to_disk:
+            try:
+                task = self.store.get(task_id)
+            except Exception as e:
+                logger.error(f"Erro ao ler tarefa {task_id} da base: {str(e)}")
+        return task
     
     def get_queue_size(self):
         """Retorna tamanho da fila"""
-        return self.task_queue.qsize()
+        with self.lock:
+            return sum(len(heap) for heap in self.task_queue.values())
     
     def get_queue_items(self):
-        """Retorna lista de itens na fila"""
+        """Retorna lista de itens na fila, na ordem em que serão executados"""
         with self.lock:
-            pending = [t for t in self.tasks_status.values() if t['status'] == 'pending']
-            return sorted(pending, key=lambda x: (x['priority'], x['created_at']), reverse=True)
+            return [task for _, _, task in self._pending_entries()]
     
-    def get_current_task(self):
-        """Retorna tarefa atual sendo processada"""
+    def get_queue_position(self, task_id):
+        """Posição da tarefa na ordem de execução (1 = próxima), None se não estiver na fila"""
         with self.lock:
-            return self.current_task
+            for position, (_, _, task) in enumerate(self._pending_entries(), start=1):
+                if task['id'] == task_id:
+                    return position
+            return None
     
-    def get_all_tasks(self):
-        """Retorna todas as tarefas (histórico + fila + atual)"""
+    def can_start_now(self, task_id):
+        """True se a tarefa já está em execução ou é a próxima do seu recurso e há vaga nele"""
         with self.lock:
-            all_tasks = list(self.tasks_status.values())
-            return sorted(all_tasks, key=lambda x: x['created_at'], reverse=True)
+            if task_id in self.running:
+                return True
+            task = self.tasks_status.get(task_id)
+            if not task or task['status'] != 'pending':
+                return False
+            heap = self.task_queue.get(task['resource'])
+            return bool(heap) and heap[0][2]['id'] == task_id and self._has_slot(task['resource'])
+    
+    def get_current_tasks(self):
+        """Retorna as tarefas em execução, da mais antiga para a mais recente"""
+        with self.lock:
+            return sorted(self.running.values(), key=lambda x: x['started_at'])
+    
+    def get_all_tasks(self, offset=0, limit=None):
+        """
+        Retorna as tarefas em memória (histórico + fila + atual), da mais recente para a mais antiga.
+        tasks_status já está na ordem de criação: a página é lida de trás para frente, sem ordenar.
+        """
+        stop = None if limit is None else offset + limit
+        with self.lock:
+            return list(itertools.islice(reversed(self.tasks_status.values()), offset, stop))
+    
+    def get_task_count(self):
+        """Quantidade de tarefas em memória"""
+        with self.lock:
+            return len(self.tasks_status)
     
     def update_task_progress(self, task_id, progress, message=None):
         """Atualiza progresso de uma tarefa"""
@@ -97,38 +432,101 @@ class QueueManager:
                 self.tasks_status[task_id]['progress'] = progress
                 if message:
                     self.tasks_status[task_id]['message'] = message
+                if self.store:
+                    self._dirty_progress.add(task_id)
                 logger.info(f"Tarefa {task_id}: {progress}% - {message}")
     
     def start_worker(self):
-        """Inicia worker thread para processar fila"""
+        """Inicia os workers: um por vaga somando os limites de todos os recursos"""
         if not self.is_running:
             self.is_running = True
-            self.worker_thread = threading.Thread(target=self._process_queue, daemon=True)
-            self.worker_thread.start()
-            logger.info("Worker thread iniciado")
+            workers = sum(self.resource_limits.values())
+            self.worker_threads = [
+                threading.Thread(target=self._process_queue, name=f"queue-worker-{idx + 1}", daemon=True)
+                for idx in range(workers)
+            ]
+            for thread in self.worker_threads:
+                thread.start()
+            if self.store:
+                self._flush_stop.clear()
+                self.flush_thread = threading.Thread(target=self._flush_loop, name="queue-progress", daemon=True)
+                self.flush_thread.start()
+            logger.info(f"{workers} workers iniciados")
     
     def stop_worker(self):
-        """Para worker thread"""
+        """Para os workers"""
         self.is_running = False
-        if self.worker_thread:
-            self.worker_thread.join(timeout=5)
-        logger.info("Worker thread parado")
+        with self.lock:
+            self.task_ready.notify_all()
+        for thread in self.worker_threads:
+            thread.join(timeout=5)
+        self.worker_threads = []
+        if self.flush_thread:
+            self._flush_stop.set()
+            self.flush_thread.join(timeout=5)
+            self.flush_thread = None
+            self._flush_progress()
+        logger.info("Workers parados")
+    
+    def _has_slot(self, resource):
+        return self.running_by_resource.get(resource, 0) < self.resource_limits.get(resource, 1)
+    
+    def _pop_runnable(self):
+        """Retira a tarefa de maior prioridade entre os recursos com vaga (chamar com o lock)"""
+        best = None
+        for resource, heap in self.task_queue.items():
+            if heap and self._has_slot(resource) and (best is None or heap[0][:2] < self.task_queue[best][0][:2]):
+                best = resource
+        if best is None:
+            return None
+        
+        _, _, task = heapq.heappop(self.task_queue[best])
+        self.running[task['id']] = task
+        self.running_by_resource[best] = self.running_by_resource.get(best, 0) + 1
+        task['status'] = 'processing'
+        task['started_at'] = datetime.now().isoformat()
+        return task
+    
+    def _next_task(self, timeout):
+        """Reserva a próxima tarefa executável (None se nenhuma ficar disponível no timeout)"""
+        with self.task_ready:
+            task = self._pop_runnable()
+            if task is None:
+                self.task_ready.wait(timeout)
+                task = self._pop_runnable()
+        if task is not None:
+            self._persist(task)
+        return task
+    
+    def _release(self, task):
+        """Libera a vaga do recurso da tarefa e guarda no histórico"""
+        with self.lock:
+            self.running.pop(task['id'], None)
+            self.running_by_resource[task['resource']] -= 1
+            if self.active_fingerprints.get(task['fingerprint']) == task['id']:
+                del self.active_fingerprints[task['fingerprint']]
+            self.task_history.append(task)
+            # Mantém apenas últimas 100 tarefas no histórico
+            if len(self.task_history) > 100:
+                self.task_history.pop(0)
+            self.finished[task['id']] = None
+            evicted, cutoff = self._evict()
+            self.task_ready.notify()
+        self._persist(task)
+        self._drop_evicted(evicted, cutoff)
     
     def _process_queue(self):
-        """Processa fila em background (roda em thread separada)"""
+        """Processa fila em background (roda em cada thread do pool)"""
         logger.info("Iniciando processamento da fila")
         
         while self.is_running:
             try:
                 # Pega próxima tarefa (timeout para permitir parada)
-                priority, task = self.task_queue.get(timeout=1)
-                
-                with self.lock:
-                    self.current_task = task
-                    task['status'] = 'processing'
-                    task['started_at'] = datetime.now().isoformat()
+                task = self._next_task(timeout=1)
+                if task is None:
+                    continue
                 
-                logger.info(f"Processando tarefa: {task['id']} ({task['type']})")
+                logger.info(f"Processando tarefa: {task['id']} ({task['type']}, recurso {task['resource']})")
                 
                 try:
                     # Executa tarefa
@@ -145,7 +543,7 @@ class QueueManager:
                         logger.info(f"Tarefa concluída: {task['id']}")
                     else:
                         raise Exception("Task processor não configurado")
-                        
+                
                 except Exception as e:
                     logger.error(f"Erro ao processar tarefa {task['id']}: {str(e)}")
                     
@@ -156,18 +554,8 @@ class QueueManager:
                         task['completed_at'] = datetime.now().isoformat()
                 
                 finally:
-                    with self.lock:
-                        self.current_task = None
-                        self.task_history.append(task)
-                        # Mantém apenas últimas 100 tarefas no histórico
-                        if len(self.task_history) > 100:
-                            self.task_history.pop(0)
-                    
-                    self.task_queue.task_done()
-                    
-            except queue.Empty:
-                # Timeout - continua loop
-                continue
+                    self._release(task)
+            
             except Exception as e:
                 logger.error(f"Erro no worker thread: {str(e)}")
                 continue
@@ -177,11 +565,15 @@ class QueueManager:
     def clear_completed_tasks(self):
         """Remove tarefas concluídas do histórico"""
         with self.lock:
+            removed = [k for k, v in self.tasks_status.items() if v['status'] not in ['pending', 'processing']]
             self.tasks_status = {
-                k: v for k, v in self.tasks_status.items() 
+                k: v for k, v in self.tasks_status.items()
                 if v['status'] in ['pending', 'processing']
             }
             self.task_history = []
+            self.finished.clear()
+        if self.store:
+            self.store.delete(removed)
         logger.info("Tarefas concluídas removidas")
 
 # Instância global
@@ -0,0 +1,155 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Colunas da tabela tarefas -> chave da tarefa em memória (dados e resultado em JSON)
+TASK_COLUMNS = {
+    'id': 'id',
+    'tipo': 'type',
+    'dados': 'data',
+    'status': 'status',
+    'progresso': 'progress',
+    'mensagem': 'message',
+    'criado_em': 'created_at',
+    'iniciado_em': 'started_at',
+    'concluido_em': 'completed_at',
+    'erro': 'error',
+    'prioridade': 'priority',
+    'recurso': 'resource',
+    'resultado': 'result',
+}
+JSON_COLUMNS = {'dados', 'resultado'}
+
+
+class QueueStoreService:
+    """
+    Persistência da fila de tarefas (SQLite em modo WAL)
+
+    Cada tarefa é uma linha da tabela tarefas, gravada a cada mudança de
+    estado (entrada na fila, início, conclusão). O progresso é gravado em
+    lote pelo QueueManager, sem uma escrita por chamada de update_task_progress.
+    Finalizadas retiradas da memória pela retenção do QueueManager continuam aqui
+    (consulta por id) até delete_finished_before.
+    """
+
+    def __init__(self, db_path: str = "Config/queue.sqlite3"):
+        self.db_path = Path(db_path)
+        self.lock = threading.Lock()
+        self._initialized = False
+
+    def connect(self) -> sqlite3.Connection:
+        """Nova conexão (uma por operação)"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tarefas (
+                    id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    dados TEXT,
+                    status TEXT NOT NULL,
+                    progresso INTEGER NOT NULL DEFAULT 0,
+                    mensagem TEXT,
+                    criado_em TEXT NOT NULL,
+                    iniciado_em TEXT,
+                    concluido_em TEXT,
+                    erro TEXT,
+                    prioridade INTEGER NOT NULL DEFAULT 0,
+                    recurso TEXT,
+                    resultado TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_criado_em ON tarefas (criado_em)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_concluido_em ON tarefas (concluido_em)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Conexão com commit ao final (rollback em caso de erro), fechada na saída"""
+        conn = self.connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _row_values(self, task: Dict) -> List:
+        values = []
+        for column, key in TASK_COLUMNS.items():
+            value = task.get(key)
+            if column in JSON_COLUMNS:
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            values.append(value)
+        return values
+
+    def save(self, task: Dict):
+        """Grava a tarefa inteira (inclusão ou mudança de estado)"""
+        columns = ', '.join(TASK_COLUMNS)
+        placeholders = ', '.join('?' for _ in TASK_COLUMNS)
+        with self.lock, self.transaction() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO tarefas ({columns}) VALUES ({placeholders})", self._row_values(task))
+
+    def save_progress(self, updates: Iterable[Tuple[str, int, str]]):
+        """
+        Grava progresso e mensagem de várias tarefas em uma transação.
+        Só altera tarefas ainda em execução: um lote atrasado não sobrescreve a conclusão.
+        """
+        updates = list(updates)
+        if not updates:
+            return
+        with self.lock, self.transaction() as conn:
+            conn.executemany(
+                "UPDATE tarefas SET progresso = ?, mensagem = ? WHERE id = ? AND status = 'processing'",
+                [(progress, message, task_id) for task_id, progress, message in updates]
+            )
+
+    def _row_task(self, row) -> Dict:
+        task = {}
+        for (column, key), value in zip(TASK_COLUMNS.items(), row):
+            if column in JSON_COLUMNS and value is not None:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    logger.warning(f"Valor inválido em {column} da tarefa {row[0]}")
+                    value = None
+            task[key] = value
+        return task
+
+    def load(self) -> List[Dict]:
+        """Todas as tarefas gravadas, da mais antiga para a mais recente"""
+        with self.transaction() as conn:
+            rows = conn.execute(f"SELECT {', '.join(TASK_COLUMNS)} FROM tarefas ORDER BY criado_em, rowid").fetchall()
+        return [self._row_task(row) for row in rows]
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        """Uma tarefa pelo id (inclusive as já retiradas da memória), None se não existir"""
+        with self.transaction() as conn:
+            row = conn.execute(f"SELECT {', '.join(TASK_COLUMNS)} FROM tarefas WHERE id = ?", (task_id,)).fetchone()
+        return self._row_task(row) if row else None
+
+    def delete(self, task_ids: Iterable[str]):
+        """Remove tarefas da base"""
+        task_ids = [(task_id,) for task_id in task_ids]
+        if not task_ids:
+            return
+        with self.lock, self.transaction() as conn:
+            conn.executemany("DELETE FROM tarefas WHERE id = ?", task_ids)
+
+    def delete_finished_before(self, cutoff: str) -> int:
+        """Remove tarefas finalizadas antes de cutoff (ISO); pendentes e em execução ficam"""
+        with self.lock, self.transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM tarefas WHERE concluido_em < ? AND status NOT IN ('pending', 'processing')", (cutoff,)
+            )
+            return cursor.rowcount
@@ -6,6 +6,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import logging
 
+from queue_manager import PRIORITY_LOW
+
 logger = logging.getLogger(__name__)
 
 class SchedulerService:
@@ -112,7 +114,7 @@ class SchedulerService:
                         'scheduled': True,
                         'schedule_name': schedule_config.get('name')
                     }
-                    self.queue_manager.add_task('db_query', task_data)
+                    self.queue_manager.add_task('db_query', task_data, priority=PRIORITY_LOW)
                     logger.info(f"Consulta BD '{report_name}' adicionada à fila (agendado)")
                 else:
                     task_data = {
@@ -125,7 +127,7 @@ class SchedulerService:
                     if report_id not in no_date_reports:
                         task_data['date_ranges'] = [{'start_date': start_date, 'end_date': end_date}]
                     
-                    self.queue_manager.add_task('report', task_data)
+                    self.queue_manager.add_task('report', task_data, priority=PRIORITY_LOW)
                     logger.info(f"Relatório '{report_name}' adicionado à fila (agendado)")
                 
         except Exception as e:
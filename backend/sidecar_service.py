@@ -0,0 +1,126 @@
+import os
+import json
+from typing import Iterator, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+from parse_cache_service import PARSER_VERSION
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+# Chave dos metadados do Parquet com a identificação do arquivo de origem
+SOURCE_METADATA_KEY = b'pontomais_source'
+
+
+def to_parquet_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Prepara o frame para o Parquet: colunas texto e de tipos mistos viram texto"""
+    out = pd.DataFrame(index=pd.RangeIndex(len(df)))
+    for pos, col in enumerate(df.columns):
+        values = df.iloc[:, pos].reset_index(drop=True)
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            values = values.astype(object).where(values.isna(), values.astype(str)).astype(object)
+            values = values.where(values.notna(), None)
+        out[col] = values
+    return out
+
+
+class SidecarService:
+    """
+    Sidecar Parquet ao lado de cada relatório baixado
+
+    Ex: Pontomais_-_Faltas_(...).csv -> Pontomais_-_Faltas_(...).csv.parquet
+    O sidecar guarda o frame já normalizado (tipado e comprimido) e os dados
+    do arquivo de origem (tamanho/mtime); só é usado enquanto a origem não mudar.
+    """
+
+    SUFFIX = '.parquet'
+
+    def __init__(self):
+        self._warned = False
+
+    def is_available(self) -> bool:
+        if not PARQUET_AVAILABLE and not self._warned:
+            logger.warning("pyarrow não instalado: sidecars Parquet desativados")
+            self._warned = True
+        return PARQUET_AVAILABLE
+
+    def sidecar_path(self, filepath: str) -> str:
+        return filepath + self.SUFFIX
+
+    def _source_info(self, filepath: str) -> dict:
+        stat = os.stat(filepath)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'parser_version': PARSER_VERSION}
+
+    def is_fresh(self, filepath: str) -> bool:
+        """Sidecar existe e foi gerado a partir da versão atual do arquivo de origem"""
+        sidecar = self.sidecar_path(filepath)
+        if not self.is_available() or not os.path.exists(sidecar):
+            return False
+        try:
+            metadata = pq.read_schema(sidecar).metadata or {}
+            source = json.loads(metadata.get(SOURCE_METADATA_KEY, b'{}'))
+            return source == self._source_info(filepath)
+        except Exception as e:
+            logger.warning(f"Sidecar ilegível {os.path.basename(sidecar)}: {str(e)}")
+            return False
+
+    def load(self, filepath: str, columns: Optional[list] = None) -> Optional[pd.DataFrame]:
+        """Lê o sidecar se estiver atualizado (com projeção opcional de colunas)"""
+        if not self.is_fresh(filepath):
+            return None
+        try:
+            df = pq.read_table(self.sidecar_path(filepath), columns=columns).to_pandas()
+        except Exception as e:
+            logger.warning(f"Erro ao ler sidecar de {os.path.basename(filepath)}: {str(e)}")
+            return None
+        return self._restore_missing(df)
+
+    def iter_batches(self, filepath: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+        """Lê o sidecar em blocos de até batch_rows linhas (chamar após is_fresh)"""
+        parquet_file = pq.ParquetFile(self.sidecar_path(filepath))
+        for batch in parquet_file.iter_batches(batch_size=batch_rows):
+            yield self._restore_missing(pa.Table.from_batches([batch]).to_pandas())
+
+    def _restore_missing(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Parquet devolve None em colunas de texto; o restante do serviço trabalha com NaN"""
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].where(df[col].notna(), np.nan)
+        return df
+
+    def write(self, filepath: str, df: pd.DataFrame) -> bool:
+        """Grava o sidecar de forma atômica; falhas (ex: pasta só leitura) não interrompem a leitura"""
+        if not self.is_available() or df.empty:
+            return False
+        if df.columns.duplicated().any() or not all(isinstance(c, str) for c in df.columns):
+            # Cabeçalhos repetidos/vazios (ex: Jornada mal formada) não cabem em um schema Parquet
+            return False
+
+        sidecar = self.sidecar_path(filepath)
+        tmp_path = sidecar + '.tmp'
+        try:
+            table = pa.Table.from_pandas(to_parquet_frame(df), preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[SOURCE_METADATA_KEY] = json.dumps(self._source_info(filepath)).encode('utf-8')
+            table = table.replace_schema_metadata(metadata)
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, sidecar)
+            return True
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar sidecar de {os.path.basename(filepath)}: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
@@ -1,19 +1,39 @@
+import os
 import logging
 from bot_service import PontoMaisBot
 from config_service import ConfigService
 from file_service import FileService
 from db_service import DBService
+from queue_manager import PRIORITY_LOW
 
 logger = logging.getLogger(__name__)
 
+# Faixa de progresso (%) de cada etapa da mesclagem da Base BI
+BI_STAGE_PROGRESS = {
+    'leitura': (5, 45),
+    'consolidacao': (45, 80),
+    'preenchimento': (80, 88),
+}
+# No modo streaming a leitura já consolida os blocos
+BI_STREAMING_STAGE_PROGRESS = {
+    'leitura': (5, 80),
+    'preenchimento': (80, 88),
+}
+BI_STAGE_LABELS = {
+    'leitura': "Lendo relatórios",
+    'consolidacao': "Consolidando pastas",
+    'preenchimento': "Preenchendo valores em branco",
+}
+
 class TaskProcessor:
     """Processa diferentes tipos de tarefas"""
     
-    def __init__(self, config_service, file_service, queue_manager, log_callback=None):
+    def __init__(self, config_service, file_service, queue_manager, log_callback=None, bi_service=None):
         self.config_service = config_service
         self.file_service = file_service
         self.queue_manager = queue_manager
         self.log_callback = log_callback
+        self.bi_service = bi_service
     
     def log(self, level, message):
         """Helper para adicionar logs"""
@@ -44,6 +64,8 @@ class TaskProcessor:
             return self._process_db_query(task)
         elif task_type == 'queue_batch':
             return self._process_queue_batch(task)
+        elif task_type == 'bi_merge':
+            return self._process_bi_merge(task)
         else:
             raise ValueError(f"Tipo de tarefa desconhecido: {task_type}")
     
@@ -247,6 +269,117 @@ class TaskProcessor:
         finally:
             db_service.close()
     
+    def _process_bi_merge(self, task):
+        """Processa mesclagem da Base BI"""
+        return self.run_bi_merge(task['data'], task_id=task['id'])
+    
+    def run_bi_merge(self, data, task_id=None):
+        """
+        Mescla os relatórios da Base BI e exporta o CSV consolidado
+        
+        Usado pela tarefa 'bi_merge' e pelo modo síncrono de /api/bi/merge.
+        
+        Args:
+            data: selected_files, vectorized, use_cache, streaming e export_format (como em BIMergeRequest)
+            task_id: Tarefa da fila que recebe o progresso (None = sem progresso)
+        """
+        if self.bi_service is None:
+            raise Exception("Serviço da Base BI não configurado")
+        
+        streaming = data.get('streaming', False)
+        stage_progress = BI_STREAMING_STAGE_PROGRESS if streaming else BI_STAGE_PROGRESS
+        
+        def update(progress, message):
+            if task_id:
+                self.queue_manager.update_task_progress(task_id, int(progress), message)
+        
+        def stage_callback(stage, done, total):
+            start, end = stage_progress.get(stage, (0, 0))
+            if end:
+                update(start + (end - start) * done / max(total, 1),
+                       f"{BI_STAGE_LABELS.get(stage, stage)} ({done + 1}/{total})" if total > 1
+                       else BI_STAGE_LABELS.get(stage, stage))
+        
+        self.log('info', "Iniciando mesclagem de dados para Base BI")
+        update(1, "Listando arquivos...")
+        
+        # Estatísticas e métricas desta mesclagem (last_merge_* podem ser de outra em paralelo)
+        df, stats, metrics = self.bi_service.merge_reports(
+            data.get('selected_files'),
+            progress_callback=lambda message: self.log('info', message),
+            vectorized=data.get('vectorized', False),
+            use_cache=data.get('use_cache', True),
+            streaming=streaming,
+            stage_callback=stage_callback,
+            return_stats=True
+        )
+        
+        if df.empty:
+            self.log('warning', "Nenhum dado foi consolidado")
+            update(100, "Nenhum dado encontrado")
+            return {'success': False, 'message': "Nenhum dado encontrado para consolidar"}
+        
+        update(90, "Exportando base consolidada...")
+        self.log('info', "Exportando base consolidada...")
+        output_path = self.bi_service.export_merged_data(df, export_format=data.get('export_format', 'csv'),
+                                                         metrics=metrics)
+        
+        if metrics is not None:
+            # Etapas com a exportação; detalhe por arquivo em GET /api/bi/metrics
+            summary = metrics.summary()
+            stats['stages'] = summary['stages']
+            stats['folders'] = summary['folders']
+            slowest = max(summary['stages'].items(), key=lambda item: item[1]['wall_s'], default=None)
+            if slowest:
+                self.log('info', f"Etapa mais lenta da mesclagem: {slowest[0]} ({slowest[1]['wall_s']:.2f}s)")
+        self.log('success', f"✓ Base BI consolidada: {len(df)} registros únicos, {len(df.columns)} colunas")
+        self.log('success', f"✓ Arquivo salvo em: {output_path}")
+        self.log('info', f"Pico de memória da mesclagem: {stats.get('peak_rss_mb')} MB")
+        
+        try:
+            # Base indexada para /api/bi/query (recarregada só se o arquivo exportado mudou)
+            self.bi_service.load_query_base(df, output_path)
+        except Exception as e:
+            self.log('warning', f"Erro ao carregar base para consultas: {str(e)}")
+        
+        settings = self.bi_service.get_settings()
+        store_stats = None
+        if settings.get('analytics_store', True):
+            # Frames recém-lidos estão no cache: só arquivos novos/alterados são gravados
+            update(95, "Atualizando base analítica...")
+            try:
+                store_stats = self.bi_service.refresh_store(use_cache=data.get('use_cache', True))
+                self.log('info', f"Base analítica: {store_stats['ingested']} arquivo(s) ingerido(s), "
+                                 f"{store_stats['removed']} removido(s)")
+            except Exception as e:
+                self.log('warning', f"Erro ao atualizar base analítica: {str(e)}")
+        
+        rollup_stats = None
+        if store_stats is not None and settings.get('team_rollups', True):
+            # Só os meses de arquivos novos/alterados/removidos são recalculados
+            update(98, "Atualizando agregados por equipe...")
+            try:
+                rollup_stats = self.bi_service.refresh_rollups()
+                if rollup_stats['months']:
+                    self.log('info', f"Agregados por equipe recalculados: {', '.join(rollup_stats['months'])}")
+            except Exception as e:
+                self.log('warning', f"Erro ao atualizar agregados por equipe: {str(e)}")
+        update(100, "Concluído!")
+        
+        return {
+            'success': True,
+            'records': len(df),
+            'columns': len(df.columns),
+            'output_file': os.path.basename(output_path),
+            'full_path': output_path,
+            'export_format': data.get('export_format', 'csv'),
+            'peak_rss_mb': stats.get('peak_rss_mb'),
+            'stats': stats,
+            'store': store_stats,
+            'rollups': rollup_stats,
+            'message': f"Base consolidada com sucesso: {len(df)} registros"
+        }
+    
     def _process_queue_batch(self, task):
         """Processa lote de itens da fila antiga"""
         task_id = task['id']
@@ -273,7 +406,8 @@ class TaskProcessor:
                 {
                     'report_name': item['reportName'],
                     'date_ranges': item.get('dateRanges')
-                }
+                },
+                priority=PRIORITY_LOW
             )
             
             results.append(subtask_id)
@@ -0,0 +1,187 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from bi_service import BIService, BIRun
+from dialect_service import DialectService
+from bi_store_service import BIStoreService
+from bi_employee_service import BIEmployeeService
+
+# Dimensão de colaboradores (bi_employee_service.py): histórico de equipes e resolução de CPF na mesclagem.
+# Uso: python -m pytest test_bi_employee.py  (ou python test_bi_employee.py)
+
+
+DAY_NS = 86400 * 10 ** 9
+
+
+def _source(path, report_type, day):
+    return {'full_path': path, 'report_type': report_type, 'size_bytes': 1, 'mtime_ns': (20000 + day) * DAY_NS}
+
+
+def _colaboradores(equipe_ana):
+    return pd.DataFrame({
+        'Nome': ['Ana Sílva', 'BRUNO COSTA', 'CARLA SOUZA', 'CARLA SOUZA'],
+        'Equipe': [equipe_ana, 'LOJA 2', 'LOJA 1', 'LOJA 2'],
+        'CPF': ['111.111.111-11', '22222222222', '33333333333', '44444444444'],
+        'E-mail': ['1001@empresa.com.br', '1002@empresa.com.br', np.nan, np.nan],
+    })
+
+
+def test_dimension_keeps_names_and_team_history():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        frames = {'colaboradores.csv': _colaboradores('LOJA 1')}
+        # Trainee ligado pelo login e pelo nome cortado em 30 caracteres
+        frames['trainee.csv'] = pd.DataFrame({
+            'login': [1002, 9999],
+            'apelido': ['BRUNO COSTA', 'CARLA SOUZA'],
+            'Loja Cadastro': ['LOJA 3', 'LOJA 9'],
+        })
+        sources = [_source('trainee.csv', 'Consulta trainee', 1), _source('colaboradores.csv', 'Colaboradores', 1)]
+
+        def load(path):
+            # Leitura sem o lock da base analítica: atualizações e consultas não esperam por ela
+            assert not service.store.lock.locked()
+            return frames[path]
+
+        stats = service.refresh(sources, load)
+        assert (stats['updated'], stats['employees']) == (2, 4)
+        assert service.refresh(sources, frames.get)['skipped'] == 2
+
+        # Nova versão do cadastro: ANA muda de equipe, a anterior fica no histórico
+        frames['colaboradores.csv'] = _colaboradores('153 - LOJA 2')
+        assert service.refresh([_source('colaboradores.csv', 'Colaboradores', 2)], frames.get)['updated'] == 1
+
+        ana = service.lookup(cpf='111.111.111-11')[0]
+        assert ana['nome'] == 'Ana Sílva' and ana['nomes'] == ['ANA SILVA'] and ana['login'] == '1001'
+        assert [team['equipe'] for team in ana['equipes']] == ['LOJA 1', '153 - LOJA 2']
+        assert [team['equipe'] for team in service.lookup(cpf='22222222222')[0]['equipes']] == ['LOJA 3', 'LOJA 2']
+        # Homônimos: o trainee sem login conhecido não é ligado a nenhum dos dois
+        assert len(service.lookup(nome='carla souza')) == 2
+
+        resolver = service.resolver()
+        resolved = resolver.resolve(pd.Series(['ana silva', 'ANA SILVA', 'CARLA SOUZA', 'CARLA SOUZA', 'ZECA', None]),
+                                    pd.Series(['LOJA 1', 'LOJA 2', 'LOJA 2', 'LOJA 5', 'LOJA 1', 'LOJA 1']))
+        assert list(resolved.fillna('-')) == ['11111111111', '11111111111', '44444444444', '-', '-', '-']
+        assert resolver.resolve_one('Carla Souza', 'LOJA 1') == '33333333333'
+
+
+def test_merge_resolves_cpf_by_name():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService()
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        service.employee_service.refresh([_source('colaboradores.csv', 'Colaboradores', 1)],
+                                         {'colaboradores.csv': _colaboradores('LOJA 1')}.get)
+        folders = {
+            'Colaboradores': _colaboradores('LOJA 1').assign(_arquivo_fonte='colaboradores.csv'),
+            # ANA aparece com a equipe antiga e a nova; CARLA só resolve pela equipe
+            'Faltas': pd.DataFrame({
+                'Nome': ['ANA SILVA', 'Ana Silva', 'CARLA SOUZA', 'ZECA LIMA'],
+                'Equipe': ['LOJA 1', 'LOJA 7', 'LOJA 2', 'LOJA 1'],
+                'Motivo': ['FALTA', 'ATESTADO', 'FALTA', 'FALTA'],
+                '_arquivo_fonte': 'faltas.csv',
+            }),
+        }
+
+        run = BIRun(service.get_settings(), employee_resolver=service.employee_service.resolver())
+        results = [service._consolidate_rows({k: v.copy() for k, v in folders.items()}, 2, run=run),
+                   service._consolidate_vectorized({k: v.copy() for k, v in folders.items()}, 2, run=run)]
+        # Sem a resolução da chamada, ANA com a equipe nova fica com a chave por nome
+        assert 'COMP:ANA SILVA|LOJA 7' in service._consolidate_vectorized(
+            {k: v.copy() for k, v in folders.items()}, 2).index
+        for df in results:
+            assert list(df.index) == ['CPF:11111111111', 'CPF:22222222222', 'CPF:33333333333',
+                                      'CPF:44444444444', 'COMP:ZECA LIMA|LOJA 1']
+            assert df.loc['CPF:11111111111', 'Motivo_Faltas'] == 'FALTA'
+            assert df.loc['CPF:44444444444', 'Motivo_Faltas'] == 'FALTA'
+            assert pd.isna(df.loc['COMP:ZECA LIMA|LOJA 1', 'CPF'])
+        assert results[0].to_csv() == results[1][results[0].columns].to_csv()
+
+
+class _Config:
+    """config.json com a pasta raiz do teste; employee_dimension alterável no meio da mesclagem"""
+    def __init__(self, root):
+        self.root = root
+        self.employee_dimension = True
+
+    def load_config(self):
+        return {'pontomais': {'destine': self.root},
+                'bi': {'parse_mode': 'thread', 'parquet_sidecars': False,
+                       'employee_dimension': self.employee_dimension}}
+
+
+def test_concurrent_merges_keep_their_own_resolver():
+    with tempfile.TemporaryDirectory() as root:
+        config = _Config(root)
+        service = BIService(config)
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        for folder, df in {
+            # Arquivos com mais de 200 bytes (menores são tratados como vazios)
+            'Faltas': pd.DataFrame({'Nome': ['ANA SILVA'] + [f'ZECA LIMA {idx}' for idx in range(20)],
+                                    'Equipe': 'LOJA 7', 'Motivo': 'FALTA'}),
+            'Colaboradores': pd.concat([_colaboradores('LOJA 1')] * 3),
+        }.items():
+            os.makedirs(os.path.join(root, folder))
+            df.to_csv(os.path.join(root, folder, f"Pontomais_-_{folder}.csv"), index=False)
+
+        # Mesclagem sem a dimensão no meio de outra com ela: cada uma fica com a sua resolução
+        inner = []
+
+        def stage_callback(stage, done, total):
+            if stage == 'leitura' and done == 1 and not inner:
+                config.employee_dimension = False
+                inner.append(service.merge_reports(use_cache=False))
+
+        outer = service.merge_reports(use_cache=False, stage_callback=stage_callback)
+        assert 'COMP:ANA SILVA|LOJA 7' in inner[0].index
+        assert 'COMP:ANA SILVA|LOJA 7' not in outer.index
+        assert outer.loc['CPF:11111111111', 'Motivo_Faltas'] == 'FALTA'
+
+
+def test_merge_modes_agree_with_dimension():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService(_Config(root))
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        # Relatórios soltos na raiz, como na amostra: a Auditoria não tem Equipe e só parte
+        # dos nomes está no cadastro
+        nomes = ['ANA SILVA', 'Bruno Costa', 'CARLA SOUZA', 'ZECA LIMA']
+        reports = {
+            'Pontomais_-_Colaboradores.csv': pd.concat([_colaboradores('LOJA 1')] * 3),
+            'Pontomais_-_Faltas.csv': pd.DataFrame({
+                'Nome': [nomes[i % 4] for i in range(40)],
+                'Equipe': [['LOJA 1', 'LOJA 2', 'LOJA 7'][i % 3] for i in range(40)],
+                'Motivo': [f"FALTA {i}" for i in range(40)],
+            }),
+            'Pontomais_-_Auditoria.csv': pd.DataFrame({
+                'Nome': [nomes[i % 4] for i in range(60)],
+                'Ocorrência': [f"Ajuste {i}" for i in range(60)],
+                'Valor': [f"0{i % 9}:00" for i in range(60)],
+            }),
+        }
+        for filename, df in reports.items():
+            df.to_csv(os.path.join(root, filename), index=False)
+
+        expected = service.merge_reports(vectorized=True, use_cache=False)
+        assert 'CPF:11111111111' in expected.index and 'COMP:ZECA LIMA|NAN' in expected.index
+        assert expected.loc['CPF:11111111111', 'Ocorrência'] == 'Ajuste 0'
+        rows = service.merge_reports(use_cache=False)
+        service._stream_chunk_rows = lambda filepath, run: 7
+        streaming = service.merge_reports(streaming=True, use_cache=False)
+        for actual in (rows, streaming):
+            assert list(actual.index) == list(expected.index)
+            assert actual[expected.columns].to_csv() == expected.to_csv()
+
+
+if __name__ == "__main__":
+    test_dimension_keeps_names_and_team_history()
+    print("✓ Dimensão com nomes e histórico de equipes")
+    test_merge_resolves_cpf_by_name()
+    print("✓ Mesclagem resolve o CPF pelo nome")
+    test_concurrent_merges_keep_their_own_resolver()
+    print("✓ Mesclagens simultâneas com a própria resolução de nomes")
+    test_merge_modes_agree_with_dimension()
+    print("✓ Mesclagem linha a linha, colunar e em blocos iguais com a dimensão")
@@ -0,0 +1,609 @@
+import os
+import random
+import re
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bi_service import BIService
+from timeline_service import TIMELINE_BASENAME
+from bi_rollup_service import ROLLUP_BASENAME
+from bi_dtypes import optimize_dtypes
+from dialect_service import DialectService
+from parse_cache_service import ParseCacheService
+from bi_employee_service import BIEmployeeService
+from bi_store_service import BIStoreService
+
+# Compara as implementações colunares da Base BI com as originais em dados gerados.
+# Uso: python -m pytest test_bi_merge.py  (ou python test_bi_merge.py)
+
+NOMES = ['ANA SILVA', 'BRUNO COSTA', 'CARLA SOUZA', 'DIEGO LIMA', 'ELISA ROCHA', 'FABIO NUNES']
+EQUIPES = ['ULTRA POPULAR CODO C02', 'MEGA POPULAR BELEM ICOARACI', 'HIPER FARMA ACAILANDIA C03']
+DIAS = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+
+def _cpf(rng, idx):
+    digits = f"{idx:011d}"
+    # Alterna entre CPF formatado, sem formatação, inválido e vazio
+    return rng.choice([
+        f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}",
+        digits,
+        digits[:9],
+        np.nan,
+    ])
+
+
+def _data(rng):
+    return f"{rng.choice(DIAS)}, {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"
+
+
+def _generate_folders(seed=0, rows=400):
+    """Gera frames no formato de _merge_files_from_same_folder para várias pastas"""
+    rng = random.Random(seed)
+    folders = {}
+
+    colaboradores = []
+    for i in range(rows // 4):
+        colaboradores.append({
+            'Nome': rng.choice(NOMES) if i % 7 else 'TOTAL',
+            'Cargo': rng.choice(['OPERADOR DE CAIXA', 'BALCONISTA', '']),
+            'Equipe': rng.choice(EQUIPES + [np.nan]),
+            'CPF': _cpf(rng, i % 9 + 1),
+            'Data de admissão': rng.choice([_data(rng), '04/08/2025', np.nan]),
+            '_arquivo_fonte': 'Pontomais_-_Colaboradores.csv',
+        })
+    folders['Colaboradores'] = pd.DataFrame(colaboradores)
+
+    faltas = []
+    for i in range(rows):
+        faltas.append({
+            'Nome': rng.choice(NOMES + ['123', '']),
+            'Equipe': rng.choice(EQUIPES + ['']),
+            'Data': _data(rng) if i % 5 else '',
+            'Motivo': rng.choice(['FOLGA/ESCALA', 'ATESTADO', np.nan]),
+            '_arquivo_fonte': rng.choice(['Faltas_(01.09.2025).csv', 'Faltas_(01.10.2025).csv']),
+        })
+    folders['Faltas'] = pd.DataFrame(faltas)
+
+    afastamentos = []
+    for i in range(rows // 2):
+        afastamentos.append({
+            'Nome': rng.choice(NOMES),
+            'Equipe': rng.choice(EQUIPES),
+            'Data de início': _data(rng),
+            'Quant. de dias': rng.randint(1, 30),
+            'Notas': rng.choice(['FERIAS', 'BENEFICIO', '']),
+            '_arquivo_fonte': 'Afastamentos.csv',
+        })
+    folders['Afastamentos e férias'] = pd.DataFrame(afastamentos)
+
+    # Arquivos soltos na pasta raiz não recebem sufixo de pasta
+    raiz = []
+    for i in range(rows // 4):
+        raiz.append({
+            'Nome': rng.choice(NOMES),
+            'Equipe': rng.choice(EQUIPES),
+            'Data': rng.choice([_data(rng), '03/10/2025']),
+            'Saldo': rng.choice(['02:13', '-01:20', np.nan]),
+            '_arquivo_fonte': 'solto.csv',
+        })
+    folders[''] = pd.DataFrame(raiz)
+
+    # Exportações com ',' e ';' na mesma pasta: só "Dia, DD/MM/AAAA" é data do PontoMais;
+    # textos fora do padrão na coluna de datas e datas no início de outro texto
+    auditoria = []
+    for i in range(rows // 2):
+        auditoria.append({
+            'Nome': rng.choice(NOMES),
+            'Equipe': rng.choice(EQUIPES),
+            'Data': rng.choice([_data(rng), _data(rng).replace(',', ';'), 'Total', '']),
+            'Ocorrência': rng.choice(['Falta', f"{_data(rng)} troca de folga", np.nan]),
+            '_arquivo_fonte': rng.choice(['Auditoria_virgula.csv', 'Auditoria_ponto_e_virgula.csv']),
+        })
+    folders['Auditoria'] = pd.DataFrame(auditoria)
+
+    return folders
+
+
+def _consolidate_reference(service, folders):
+    """
+    Consolidação original de merge_reports (laço por linha, regex de data por célula),
+    usada como referência; sem a dimensão de colaboradores
+    """
+    consolidated_data = {}
+    for folder, df in folders.items():
+        df = service._filter_invalid_rows(df)
+        has_cpf, has_nome, has_equipe = 'CPF' in df.columns, 'Nome' in df.columns, 'Equipe' in df.columns
+        for _, row in df.iterrows():
+            key = None
+            if has_cpf:
+                cpf = service._extract_cpf(row.get('CPF'))
+                if cpf:
+                    key = f"CPF:{cpf}"
+            if not key and has_nome and has_equipe:
+                composite = service._create_composite_key(row)
+                if composite:
+                    key = f"COMP:{composite}"
+            if not key:
+                continue
+            
+            if key not in consolidated_data:
+                consolidated_data[key] = {
+                    'CPF': service._extract_cpf(row.get('CPF')) if has_cpf else None,
+                    'Nome': row.get('Nome', ''),
+                    'Equipe': row.get('Equipe', ''),
+                    '_source_files': [],
+                }
+            source_label = folder if folder != 'root' else 'Raiz'
+            if source_label not in consolidated_data[key]['_source_files']:
+                consolidated_data[key]['_source_files'].append(source_label)
+            if folder and folder != 'root':
+                consolidated_data[key].setdefault(f"Arquivo_{folder}", set())
+                if row.get('_arquivo_fonte', ''):
+                    consolidated_data[key][f"Arquivo_{folder}"].add(row.get('_arquivo_fonte'))
+            
+            for col in df.columns:
+                if col in ['Nome', 'Equipe', 'CPF', '_arquivo_fonte']:
+                    continue
+                value = row.get(col)
+                if pd.isna(value) or value == '':
+                    continue
+                is_date_col = isinstance(value, str) and re.match(
+                    r'^(Seg|Ter|Qua|Qui|Sex|Sáb|Sab|Dom),?\s*\d{2}/\d{2}/\d{4}', value)
+                col_name = 'Data' if is_date_col else (f"{col}_{folder}" if folder else col)
+                if col_name not in consolidated_data[key]:
+                    consolidated_data[key][col_name] = value
+    
+    result_df = pd.DataFrame.from_dict(consolidated_data, orient='index')
+    for col in result_df.columns:
+        if col == '_source_files' or col.startswith('Arquivo_'):
+            result_df[col] = result_df[col].apply(lambda x: '; '.join(sorted(x)) if isinstance(x, (list, set)) else x)
+    return result_df
+
+
+def _fill_missing_values_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementação original de BIService._fill_missing_values (laço por chave), usada como referência"""
+    if df.empty:
+        return df
+    
+    # Cria cópia para não modificar o original
+    df_filled = df.copy()
+    
+    # Agrupa por CPF (quando existe e não é nulo)
+    if 'CPF' in df_filled.columns:
+        # Para cada CPF único
+        for cpf in df_filled['CPF'].dropna().unique():
+            if not cpf or cpf == '':
+                continue
+            
+            # Pega todas as linhas com esse CPF
+            mask = df_filled['CPF'] == cpf
+            group = df_filled[mask]
+            
+            if len(group) > 1:
+                # Para cada coluna, preenche valores vazios com o primeiro valor não-vazio do grupo
+                for col in df_filled.columns:
+                    if col in ['CPF', '_source_files']:
+                        continue
+                    
+                    # Pega o primeiro valor não-vazio
+                    non_empty = group[col].dropna()
+                    non_empty = non_empty[non_empty != '']
+                    
+                    if len(non_empty) > 0:
+                        fill_value = non_empty.iloc[0]
+                        # Preenche valores vazios neste grupo
+                        df_filled.loc[mask, col] = df_filled.loc[mask, col].fillna(fill_value)
+                        df_filled.loc[mask & (df_filled[col] == ''), col] = fill_value
+    
+    # Agrupa por Nome+Equipe (para registros sem CPF)
+    if 'Nome' in df_filled.columns and 'Equipe' in df_filled.columns:
+        # Cria chave temporária
+        df_filled['_temp_key'] = df_filled['Nome'].astype(str) + '|' + df_filled['Equipe'].astype(str)
+        
+        for key in df_filled['_temp_key'].unique():
+            if not key or key == '|':
+                continue
+            
+            mask = df_filled['_temp_key'] == key
+            group = df_filled[mask]
+            
+            if len(group) > 1:
+                for col in df_filled.columns:
+                    if col in ['Nome', 'Equipe', 'CPF', '_source_files', '_temp_key']:
+                        continue
+                    
+                    non_empty = group[col].dropna()
+                    non_empty = non_empty[non_empty != '']
+                    
+                    if len(non_empty) > 0:
+                        fill_value = non_empty.iloc[0]
+                        df_filled.loc[mask, col] = df_filled.loc[mask, col].fillna(fill_value)
+                        df_filled.loc[mask & (df_filled[col] == ''), col] = fill_value
+        
+        # Remove chave temporária
+        df_filled = df_filled.drop(columns=['_temp_key'])
+    
+    return df_filled
+
+
+def _generate_consolidated(seed=0, people=300):
+    """Gera uma base já consolidada, com CPFs/Nome+Equipe repetidos e células vazias"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(people):
+        person = rng.randint(0, people // 3)
+        rows.append({
+            'CPF': rng.choice([f"{person:011d}", None, '']),
+            'Nome': NOMES[person % len(NOMES)] + f" {person}",
+            'Equipe': rng.choice(EQUIPES + ['']),
+            'Data': rng.choice([_data(rng), np.nan, '']),
+            'Arquivo_Faltas': rng.choice(['Faltas.csv', np.nan]),
+            '_source_files': 'Faltas',
+            'Motivo_Faltas': rng.choice(['FOLGA/ESCALA', 'ATESTADO', np.nan, '']),
+            'Quant. de dias_Afastamentos e férias': rng.choice([float(rng.randint(1, 30)), np.nan]),
+        })
+    return pd.DataFrame(rows, index=[f"K{i}" for i in range(people)])
+
+
+def _consolidate(service, folders, vectorized):
+    frames = {folder: df.copy() for folder, df in folders.items()}
+    if vectorized:
+        return service._consolidate_vectorized(frames, len(frames))
+    return service._consolidate_rows(frames, len(frames))
+
+
+def _assert_same(expected, actual):
+    assert list(expected.index) == list(actual.index)
+    assert sorted(expected.columns) == sorted(actual.columns)
+    actual = actual[expected.columns]
+    pd.testing.assert_frame_equal(
+        expected.astype(object).where(expected.notna(), None),
+        actual.astype(object).where(actual.notna(), None),
+        check_dtype=False,
+    )
+
+
+def test_vectorized_consolidation_matches_rows():
+    service = BIService()
+    for seed in range(5):
+        folders = _generate_folders(seed)
+        expected = _consolidate_reference(service, {folder: df.copy() for folder, df in folders.items()})
+        _assert_same(expected, _consolidate(service, folders, vectorized=False))
+        _assert_same(expected, _consolidate(service, folders, vectorized=True))
+
+
+def test_fill_missing_values_matches_reference():
+    service = BIService()
+    for seed in range(5):
+        df = _generate_consolidated(seed)
+        expected = _fill_missing_values_reference(df)
+        actual = service._fill_missing_values(df)
+        _assert_same(expected, actual)
+
+
+def _write_folders(root, folders):
+    """Grava cada pasta gerada como dois CSVs (metade das linhas em cada) e retorna a seleção de arquivos"""
+    selected = []
+    for folder, df in folders.items():
+        folder = folder or 'root'
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        half = len(df) // 2
+        for part, rows in enumerate([df.iloc[:half], df.iloc[half:]]):
+            filename = f"Pontomais_-_{folder}_{part}.csv"
+            full_path = os.path.join(root, folder, filename)
+            rows.drop(columns=['_arquivo_fonte']).to_csv(full_path, index=False)
+            selected.append({'filename': filename, 'full_path': full_path, 'folder': folder})
+    return selected
+
+
+def test_streaming_matches_in_memory():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService()
+        service._root_folder = root
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        selected = _write_folders(root, _generate_folders(seed=3))
+        
+        expected = service.merge_reports(selected, vectorized=True, use_cache=False)
+        # Blocos pequenos para que cada arquivo seja incorporado em várias partes
+        service._stream_chunk_rows = lambda filepath, run: 37
+        actual = service.merge_reports(selected, streaming=True, use_cache=False)
+        
+        _assert_same(expected, actual)
+        assert service.last_merge_stats['mode'] == 'streaming'
+        
+        # Consolidação original sobre os mesmos arquivos lidos
+        run = service._new_run()
+        files_by_folder = {}
+        for file_info in selected:
+            files_by_folder.setdefault(file_info['folder'], []).append(file_info)
+        read = {folder: service._merge_files_from_same_folder(files, folder, run, use_cache=False)
+                for folder, files in files_by_folder.items()}
+        reference = service._order_columns(service._fill_missing_values(_consolidate_reference(service, read)))
+        _assert_same(reference, actual)
+
+
+def test_streaming_with_inference_changing_between_chunks():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService()
+        service._root_folder = root
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.parse_cache = ParseCacheService(os.path.join(root, 'cache'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        os.makedirs(os.path.join(root, 'Faltas'))
+        path = os.path.join(root, 'Faltas', 'Pontomais_-_Faltas.csv')
+        # Horas vazia no primeiro bloco e inteira depois; Código inteiro no primeiro bloco e texto depois
+        pd.DataFrame({
+            'Nome': [f"{NOMES[i % len(NOMES)]} {i}" for i in range(100)],
+            'Equipe': [EQUIPES[i % len(EQUIPES)] for i in range(100)],
+            'Horas': [None] * 40 + list(range(60)),
+            'Código': list(range(50)) + [f"X{i}" for i in range(50)],
+        }).to_csv(path, index=False)
+        selected = [{'filename': os.path.basename(path), 'full_path': path, 'folder': 'Faltas'}]
+
+        expected = service.merge_reports(selected, vectorized=True, use_cache=False)
+        service._stream_chunk_rows = lambda filepath, run: 37
+        actual = service.merge_reports(selected, streaming=True, use_cache=False)
+        assert actual[expected.columns].to_csv() == expected.to_csv()
+
+        # Com cache o streaming lê o sidecar em lotes, nunca o frame inteiro do cache local
+        service.merge_reports(selected, vectorized=True)
+        service.parse_cache.load = lambda filepath: (_ for _ in ()).throw(AssertionError("frame inteiro"))
+        actual = service.merge_reports(selected, streaming=True)
+        assert actual[expected.columns].to_csv() == expected.to_csv()
+
+
+def test_streaming_with_mixed_schemas_in_one_folder():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService()
+        service._root_folder = root
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        # Relatórios soltos na raiz: a Auditoria não tem Equipe (chave COMP:NOME|NAN na concatenação)
+        # e Horas, inteira na Faltas, fica vazia nas linhas da Auditoria
+        faltas = pd.DataFrame({
+            'Nome': [f"{NOMES[i % len(NOMES)]} {i % 30}" for i in range(90)],
+            'Equipe': [EQUIPES[i % len(EQUIPES)] for i in range(90)],
+            'Data': [_data(random.Random(i)) for i in range(90)],
+            'Horas': list(range(90)),
+        })
+        auditoria = pd.DataFrame({
+            'Nome': [f"{NOMES[i % len(NOMES)]} {i % 40}" for i in range(120)],
+            'Data': [_data(random.Random(1000 + i)) for i in range(120)],
+            'Ocorrência': [f"Ajuste {i}" for i in range(120)],
+            'Valor': [f"0{i % 9}:00" for i in range(120)],
+        })
+        selected = []
+        for filename, df in [('Pontomais_-_Faltas.csv', faltas), ('Pontomais_-_Auditoria.csv', auditoria)]:
+            path = os.path.join(root, filename)
+            df.to_csv(path, index=False)
+            selected.append({'filename': filename, 'full_path': path, 'folder': 'root'})
+        
+        expected = service.merge_reports(selected, vectorized=True, use_cache=False)
+        assert {'Ocorrência_root', 'Valor_root'} <= set(expected.columns)
+        assert service.merge_reports(selected, use_cache=False)[expected.columns].to_csv() == expected.to_csv()
+        service._stream_chunk_rows = lambda filepath, run: 37
+        actual = service.merge_reports(selected, streaming=True, use_cache=False)
+        assert list(actual.index) == list(expected.index)
+        assert actual[expected.columns].to_csv() == expected.to_csv()
+
+
+def test_optimized_dtypes_keep_exported_values():
+    service = BIService()
+    for seed in range(3):
+        folders = _generate_folders(seed)
+        optimized = {folder: optimize_dtypes(df) for folder, df in folders.items()}
+        assert any(isinstance(dtype, pd.CategoricalDtype) for df in optimized.values() for dtype in df.dtypes)
+        for vectorized in (False, True):
+            expected = _consolidate(service, folders, vectorized)
+            actual = _consolidate(service, optimized, vectorized)
+            # Mesmo texto no CSV com e sem a otimização de tipos
+            assert optimize_dtypes(actual).to_csv() == expected.to_csv()
+
+
+def test_date_values_routed_per_cell():
+    service = BIService()
+    folders = {
+        # Exportações com ',' e ';' na mesma pasta (metade das datas fora do padrão do PontoMais)
+        'Auditoria': pd.DataFrame({
+            'Nome': ['ANA SILVA', 'ANA SILVA', 'BRUNO COSTA', 'BRUNO COSTA'],
+            'Equipe': ['LOJA 1', 'LOJA 1', 'LOJA 2', 'LOJA 2'],
+            'Data': ['Dom; 12/01/2025', 'Sex, 07/02/2025', 'Sex, 07/02/2025', 'Dom; 12/01/2025'],
+            '_arquivo_fonte': ['auditoria_pv.csv', 'auditoria.csv', 'auditoria.csv', 'auditoria_pv.csv'],
+        }),
+        # Coluna só com datas e um texto fora do padrão; data no início de outro texto
+        'Faltas': pd.DataFrame({
+            'Nome': ['CARLA SOUZA'] * 3 + ['DIEGO LIMA'],
+            'Equipe': ['LOJA 3'] * 4,
+            'Data': ['Total'] + [_data(random.Random(i)) for i in range(3)],
+            'Motivo': ['Sex, 03/10/2025 troca de folga', 'FOLGA', 'FOLGA', 'FOLGA'],
+            '_arquivo_fonte': 'faltas.csv',
+        }),
+    }
+    expected = _consolidate_reference(service, {folder: df.copy() for folder, df in folders.items()})
+    assert expected.loc['COMP:ANA SILVA|LOJA 1', 'Data_Auditoria'] == 'Dom; 12/01/2025'
+    assert expected.loc['COMP:ANA SILVA|LOJA 1', 'Data'] == 'Sex, 07/02/2025'
+    assert expected.loc['COMP:CARLA SOUZA|LOJA 3', 'Data_Faltas'] == 'Total'
+    assert expected.loc['COMP:CARLA SOUZA|LOJA 3', 'Data'] == 'Sex, 03/10/2025 troca de folga'
+    
+    for vectorized in (False, True):
+        _assert_same(expected, _consolidate(service, folders, vectorized))
+
+
+def test_merge_records_stage_metrics():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService()
+        service._root_folder = root
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        selected = _write_folders(root, _generate_folders(seed=4))
+        
+        df = service.merge_reports(selected, vectorized=True, use_cache=False)
+        service.export_merged_data(df, metrics=service.last_merge_metrics)
+        summary = service.metrics_summary()['last']
+        
+        stages = summary['stages']
+        for stage in ('dialeto', 'leitura_arquivo', 'concat_pasta', 'chaves', 'consolidacao',
+                      'preenchimento', 'ordenacao_colunas', 'exportacao'):
+            assert stages[stage]['calls'] >= 1 and stages[stage]['wall_s'] >= 0, stage
+        assert stages['leitura_arquivo']['calls'] == len(selected)
+        assert stages['preenchimento']['rows_out'] == len(df)
+        assert stages['concat_pasta']['rows_in'] == stages['leitura_arquivo']['rows_out']
+        assert set(summary['folders']) == {f['folder'] for f in selected}
+        assert service.last_merge_stats['stages']['consolidacao']['calls'] == len(summary['folders'])
+
+
+class _Config:
+    """config.json com a pasta raiz do teste e leitura paralela mesmo em máquina de um núcleo"""
+    def __init__(self, root):
+        self.root = root
+        self.bi = {'parse_mode': 'thread', 'parse_workers': 4, 'parquet_sidecars': False}
+
+    def load_config(self):
+        return {'pontomais': {'destine': self.root}, 'bi': dict(self.bi)}
+
+
+def test_calls_during_merge_keep_their_own_state():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService(_Config(root))
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.store_service = BIStoreService(os.path.join(root, 'base_bi.sqlite'))
+        service.employee_service = BIEmployeeService(service.store_service)
+        selected = _write_folders(root, _generate_folders(seed=5))
+        expected = service.merge_reports(selected, vectorized=True, use_cache=False)
+
+        # Endpoints da Base BI chamados no meio da leitura (pool de leitura da mesclagem ativo)
+        def stage_callback(stage, done, total):
+            if stage == 'leitura' and done == 1:
+                service.build_daily_timeline(use_cache=False)
+                service.refresh_store(use_cache=False)
+                service.merge_reports(selected[:2], use_cache=False)
+
+        actual, stats, metrics = service.merge_reports(selected, vectorized=True, use_cache=False,
+                                                       stage_callback=stage_callback, return_stats=True)
+        _assert_same(expected, actual)
+        assert stats['records'] == len(actual)
+        assert metrics.summary()['stages']['leitura_arquivo']['calls'] == len(selected)
+
+
+def test_store_refresh_in_parallel_with_merge():
+    with tempfile.TemporaryDirectory() as root:
+        config = _Config(root)
+        service = BIService(config)
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.store_service = BIStoreService(os.path.join(root, 'base_bi.sqlite'))
+        service.employee_service = BIEmployeeService(service.store_service)
+        selected = _write_folders(root, _generate_folders(seed=7))
+        expected = service.merge_reports(selected, vectorized=True, use_cache=False)
+
+        # Atualização da base analítica em outra thread, com outras opções, no meio da leitura:
+        # o pool dela é fechado ao terminar sem fechar o da mesclagem
+        refreshes = []
+        refreshed = threading.Event()
+
+        def refresh():
+            refreshes.append(service.refresh_store(use_cache=False))
+            refreshed.set()
+
+        def stage_callback(stage, done, total):
+            if stage == 'leitura' and done == 1:
+                config.bi = {'parse_mode': 'thread', 'parse_workers': 2, 'parquet_sidecars': False}
+                threading.Thread(target=refresh).start()
+                assert refreshed.wait(30)
+
+        actual = service.merge_reports(selected, vectorized=True, use_cache=False, stage_callback=stage_callback)
+        _assert_same(expected, actual)
+        assert refreshes[0]['ingested'] == len(service.get_available_files()) and refreshes[0]['failed'] == 0
+
+
+def test_memory_report_only_when_requested():
+    with tempfile.TemporaryDirectory() as root:
+        config = _Config(root)
+        service = BIService(config)
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        selected = _write_folders(root, _generate_folders(seed=8))
+
+        # Sem bi.memory_report os tipos são otimizados sem medir a memória (memory_usage deep)
+        _, stats, _ = service.merge_reports(selected, vectorized=True, use_cache=False, return_stats=True)
+        assert 'memory' not in stats and stats['stages']['otimizacao_tipos']['calls'] >= 1
+
+        config.bi['memory_report'] = True
+        _, stats, _ = service.merge_reports(selected, vectorized=True, use_cache=False, return_stats=True)
+        assert set(stats['memory']['folders']) == {f['folder'] for f in selected}
+        assert stats['memory']['result']['after_mb'] > 0
+
+
+def test_cache_manifest_saved_once_per_merge():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService(_Config(root))
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.parse_cache = ParseCacheService(os.path.join(root, 'cache'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        selected = _write_folders(root, _generate_folders(seed=9))
+        saves = []
+        save_manifest = service.parse_cache._save_manifest
+        service.parse_cache._save_manifest = lambda: saves.append(1) or save_manifest()
+
+        # Frames de todos os arquivos no cache, manifesto gravado uma vez no fim
+        expected = service.merge_reports(selected, vectorized=True)
+        assert len(saves) == 1
+        cached = ParseCacheService(os.path.join(root, 'cache'))
+        assert all(cached.load(f['full_path']) is not None for f in selected)
+
+        # Tudo vindo do cache: nada a gravar
+        actual = service.merge_reports(selected, vectorized=True)
+        assert len(saves) == 1
+        _assert_same(expected, actual)
+
+
+def test_generated_outputs_are_not_read_back():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService(_Config(root))
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        _write_folders(root, _generate_folders(seed=6))
+        expected = service.merge_reports(use_cache=False)
+
+        # Base, relatório diário e agregados exportados na raiz não podem voltar como relatório "Raiz"
+        service.export_merged_data(expected)
+        timeline = pd.DataFrame({'CPF': ['99999999999'], 'NOME': ['ZECA LIMA'], 'DATA': ['2025-10-03']})
+        service.export_merged_data(timeline, TIMELINE_BASENAME + '.csv')
+        rollup = pd.DataFrame({'mes': ['2025-10'], 'equipe': ['LOJA 1'], 'colaboradores': [12], 'faltas': [3]})
+        service.export_merged_data(rollup, ROLLUP_BASENAME + '.csv')
+        assert not [f for f in service.get_available_files() if f['folder'] == '']
+
+        actual = service.merge_reports(use_cache=False)
+        assert len(actual) == len(expected) and list(actual.columns) == list(expected.columns)
+
+
+if __name__ == "__main__":
+    test_vectorized_consolidation_matches_rows()
+    print("✓ Consolidação colunar equivalente à consolidação linha a linha")
+    test_fill_missing_values_matches_reference()
+    print("✓ Preenchimento por groupby equivalente à implementação original")
+    test_streaming_matches_in_memory()
+    print("✓ Mesclagem em blocos equivalente à mesclagem em memória")
+    test_streaming_with_inference_changing_between_chunks()
+    print("✓ Blocos com tipos fixados pela leitura inteira")
+    test_streaming_with_mixed_schemas_in_one_folder()
+    print("✓ Blocos de arquivos com esquemas diferentes na mesma pasta")
+    test_optimized_dtypes_keep_exported_values()
+    print("✓ Tipos otimizados exportam os mesmos valores")
+    test_date_values_routed_per_cell()
+    print("✓ Datas do PontoMais identificadas por valor, como no caminho original")
+    test_merge_records_stage_metrics()
+    print("✓ Métricas por etapa da mesclagem")
+    test_calls_during_merge_keep_their_own_state()
+    print("✓ Chamadas durante a mesclagem não trocam o estado dela")
+    test_store_refresh_in_parallel_with_merge()
+    print("✓ Base analítica atualizada em paralelo com a mesclagem")
+    test_memory_report_only_when_requested()
+    print("✓ Memória da otimização de tipos medida só quando pedida")
+    test_cache_manifest_saved_once_per_merge()
+    print("✓ Manifesto do cache gravado uma vez por mesclagem")
+    test_generated_outputs_are_not_read_back()
+    print("✓ Arquivos gerados pela Base BI não voltam para a mesclagem")
@@ -0,0 +1,103 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from bi_store_service import BIStoreService
+from bi_query_service import BIQueryService
+from bi_dtypes import optimize_dtypes
+
+# Consultas à base consolidada (bi_query_service.py): filtros, cursor e agregação.
+# Uso: python -m pytest test_bi_query.py  (ou python test_bi_query.py)
+
+
+def _base():
+    return pd.DataFrame({
+        'CPF': ['06435064385', '06435064385', '11122233344', None],
+        'Nome': ['Ana Sílva', 'Ana Sílva', 'BRUNO LIMA', 'CARLA'],
+        'Equipe': ['LOJA 1', 'LOJA 1', 'LOJA 2', 'LOJA 2'],
+        'Data': ['Sex, 03/10/2025', 'Seg, 29/09/2025', 'Sex, 03/10/2025', None],
+        'Motivo_Faltas': ['FOLGA', None, 'ATESTADO', None],
+        '_source_files': ['Faltas; Jornada', 'Jornada', 'Faltas', 'Colaboradores'],
+    })
+
+
+def test_filters_sort_and_cursor_pages():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIQueryService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        assert service.load_base(_base(), 'v1') is True
+        assert service.load_base(_base(), 'v1') is False
+
+        result = service.query(cpf='064.350.643-85', columns=['Nome', 'Data'], sort='Data')
+        assert [row['Data'] for row in result['rows']] == ['Seg, 29/09/2025', 'Sex, 03/10/2025']
+
+        assert service.query(nome='ana silva')['count'] == 2
+        assert service.query(nome='BRU*', columns=['CPF'])['rows'] == [{'CPF': '11122233344'}]
+        assert service.query(start='2025-10-01', end='2025-10-31')['count'] == 2
+        assert service.query(report='Faltas', columns=['Nome'])['count'] == 2
+
+        names, cursor = [], None
+        while True:
+            page = service.query(columns=['Nome'], sort='-Motivo_Faltas', limit=1, cursor=cursor)
+            names += [row['Nome'] for row in page['rows']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        assert names == ['Ana Sílva', 'BRUNO LIMA', 'CARLA', 'Ana Sílva']
+
+
+def test_date_filters_with_typed_columns():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIQueryService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        # bi.typed_columns: Data em datetime64 (exportada como "2025-10-03")
+        typed = optimize_dtypes(_base(), typed=True)
+        assert pd.api.types.is_datetime64_any_dtype(typed['Data'])
+        service.load_base(typed, 'typed')
+        assert service.query(start='2025-10-01')['count'] == 2
+        assert service.query(end='2025-09-30', columns=['Data'])['rows'] == [{'Data': '2025-09-29'}]
+
+        # Base lida de volta do CSV: datas em texto ISO
+        service.load_base(_base().assign(Data=['2025-10-03', '2025-09-29', '2025-10-03', None]), 'iso')
+        assert service.query(start='2025-10-01', end='2025-10-31')['count'] == 2
+
+
+def test_aggregation_and_invalid_parameters():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIQueryService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        try:
+            service.query()
+            assert False, "consulta sem base deveria falhar"
+        except LookupError:
+            pass
+
+        service.load_base(_base(), 'v1')
+        result = service.query(group_by=['Equipe'], metrics=['count', 'count_distinct:Nome'], sort='-count')
+        assert result['rows'] == [
+            {'Equipe': 'LOJA 1', 'count': 2, 'count_distinct:Nome': 1},
+            {'Equipe': 'LOJA 2', 'count': 2, 'count_distinct:Nome': 2},
+        ]
+
+        # Datas "Dia, DD/MM/AAAA" pela data ISO (como texto, "Dom, 04/06/2023" seria o mínimo)
+        dates = _base().assign(Data=['Ter, 17/05/2022', 'Dom, 04/06/2023', 'Sex, 03/10/2025', None],
+                               Saldo=['08:30', '-01:15', '212:40', '1,5'])
+        service.load_base(dates, 'v2')
+        result = service.query(metrics=['min:Data', 'max:Data', 'sum:Saldo'])
+        assert result['rows'] == [{'min:Data': '2022-05-17', 'max:Data': '2025-10-03', 'sum:Saldo': 510 - 75 + 12760 + 1.5}]
+        assert service.query(group_by=['Equipe'], metrics=['avg:Saldo'])['rows'][0] == {'Equipe': 'LOJA 1', 'avg:Saldo': 217.5}
+
+        for params in ({'columns': ['Inexistente']}, {'cpf': '123'}, {'start': '03/10/2025'},
+                       {'metrics': ['median:Data']}, {'cursor': 'xx'}):
+            try:
+                service.query(**params)
+                assert False, f"parâmetros inválidos aceitos: {params}"
+            except ValueError:
+                pass
+
+
+if __name__ == "__main__":
+    test_filters_sort_and_cursor_pages()
+    print("✓ Filtros, ordenação e páginas por cursor")
+    test_date_filters_with_typed_columns()
+    print("✓ Filtros de data com colunas tipadas")
+    test_aggregation_and_invalid_parameters()
+    print("✓ Agregação e parâmetros inválidos")
@@ -0,0 +1,133 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from bi_store_service import BIStoreService, normalize_names
+from bi_rollup_service import BIRollupService, ROLLUP_BASENAME, hours_to_minutes
+from bi_service import BIService
+
+# Agregados por equipe e mês (bi_rollup_service.py): valores e recálculo só dos meses alterados.
+# Uso: python -m pytest test_bi_rollup.py  (ou python test_bi_rollup.py)
+
+
+def _facts(nomes, equipe, datas, **columns):
+    nomes = pd.Series(nomes)
+    return pd.DataFrame({
+        'cpf': None,
+        'nome': nomes,
+        'nome_norm': normalize_names(nomes),
+        'equipe': equipe,
+        'data': datas,
+        **columns,
+    })
+
+
+def _describe(filename):
+    period = {'abs_out.csv': '2025-10-01', 'ass_out.csv': '2025-10-01'}.get(filename)
+    return {'period_start': period}
+
+
+def _rollup(service, mes, equipe):
+    df = service.frame(equipe=equipe, start=mes, end=mes)
+    assert len(df) == 1
+    return df.iloc[0]
+
+
+def test_team_month_aggregates():
+    with tempfile.TemporaryDirectory() as root:
+        store = BIStoreService(os.path.join(root, 'base_bi.sqlite'))
+        path = lambda name: os.path.join(root, name)
+        store.ingest(path('faltas.csv'), 'Faltas', _facts(
+            ['ANA', 'ANA', 'BRUNO', 'CARLA'], 'LOJA 1', ['2025-10-03', '2025-10-04', '2025-10-05', '2025-11-02'],
+            Motivo=['FALTA', 'FOLGA/ESCALA', 'ATESTADO MEDICO', 'FALTA']), size=1, mtime_ns=1)
+        # Saldo do fim do mês de cada colaborador: ANA 01:30, BRUNO -02:15
+        store.ingest(path('bh.csv'), 'Banco de horas', _facts(
+            ['ANA', 'ANA', 'BRUNO'], 'LOJA 1', ['2025-10-01', '2025-10-31', '2025-10-31'],
+            **{'Saldo BH': ['-10:00', '01:30', '-02:15']}), size=1, mtime_ns=1)
+        store.ingest(path('abs_out.csv'), 'Absenteísmo', _facts(
+            ['ANA', 'BRUNO'], 'LOJA 1', None, Previsto=['100:00', '100:00'], **{'Ausência': ['05:00', '15:00']}),
+            size=1, mtime_ns=1)
+        # Assinaturas: nome em "Colaborador" e equipe com o código da loja
+        store.ingest(path('ass_out.csv'), 'Assinaturas', _facts(
+            [None, None], '153 - LOJA 1', None, Colaborador=['ANA', 'BRUNO'], **{'Assinado?': ['Sim', 'Não']}),
+            size=1, mtime_ns=1)
+        store.ingest(path('jornada.csv'), 'Jornada', _facts(
+            ['ANA', 'ANA'], None, ['2025-10-03', '2025-10-04'], **{'Total de H. extras': ['01:10', '00:20']}),
+            size=1, mtime_ns=1)
+        store.ingest(path('colaboradores.csv'), 'Colaboradores', _facts(['ANA'], 'LOJA 1', None), size=1, mtime_ns=1)
+
+        service = BIRollupService(store, describe=_describe)
+        stats = service.refresh()
+        assert stats['months'] == ['2025-10', '2025-11']
+
+        outubro = _rollup(service, '2025-10', 'loja 1')
+        assert outubro['colaboradores'] == 2
+        assert (outubro['ausencias'], outubro['faltas'], outubro['atestados']) == (2, 1, 1)
+        assert (outubro['previsto_min'], outubro['ausencia_min'], outubro['absenteismo_pct']) == (12000, 1200, 10.0)
+        assert (outubro['saldo_bh_min'], outubro['bh_negativo']) == (90 - 135, 1)
+        # Jornada sem equipe: equipe do cadastro de Colaboradores
+        assert outubro['horas_extras_min'] == 90
+        assert (outubro['espelhos'], outubro['espelhos_assinados'], outubro['assinatura_pct']) == (2, 1, 50.0)
+        assert _rollup(service, '2025-11', 'LOJA 1')['faltas'] == 1
+
+        assert list(hours_to_minutes(pd.Series(['212:40', '-46:34', 'x', None])).fillna(-1)) == [12760, -2794, -1, -1]
+
+
+def test_only_changed_months_are_recomputed():
+    with tempfile.TemporaryDirectory() as root:
+        store = BIStoreService(os.path.join(root, 'base_bi.sqlite'))
+        outubro = os.path.join(root, 'faltas_out.csv')
+        novembro = os.path.join(root, 'faltas_nov.csv')
+        store.ingest(outubro, 'Faltas', _facts(['ANA'], 'LOJA 1', ['2025-10-03'], Motivo=['FALTA']), size=1, mtime_ns=1)
+        store.ingest(novembro, 'Faltas', _facts(['ANA'], 'LOJA 1', ['2025-11-03'], Motivo=['FALTA']), size=1, mtime_ns=1)
+
+        service = BIRollupService(store)
+        assert service.refresh()['months'] == ['2025-10', '2025-11']
+        assert service.refresh()['months'] == []
+
+        # Nova versão do arquivo de novembro: outubro não é recalculado
+        store.ingest(novembro, 'Faltas', _facts(['ANA', 'BRUNO'], 'LOJA 1', ['2025-11-03', '2025-11-04'],
+                                                Motivo=['FALTA', 'FALTA']), size=2, mtime_ns=2)
+        assert service.refresh() == {'months': ['2025-11'], 'files': 1, 'rows': 1}
+        assert _rollup(service, '2025-11', 'LOJA 1')['faltas'] == 2
+
+        # Arquivo removido da origem: o mês fica sem agregados
+        store.remove_missing([novembro])
+        assert service.refresh()['months'] == ['2025-10']
+        assert list(service.frame()['mes']) == ['2025-11']
+
+        try:
+            service.frame(start='2025-13')
+            assert False, "mês inválido aceito"
+        except ValueError:
+            pass
+
+
+def test_rollup_csv_written_without_precompressed_copy():
+    with tempfile.TemporaryDirectory() as root:
+        service = BIService()
+        service._root_folder = root
+        store = BIStoreService(os.path.join(root, 'base_bi.sqlite'))
+        service.rollup_service = BIRollupService(store)
+        store.ingest(os.path.join(root, 'faltas.csv'), 'Faltas',
+                     _facts(['ANA'], 'LOJA 1', ['2025-10-03'], Motivo=['FALTA']), size=1, mtime_ns=1)
+
+        assert service.refresh_rollups()['output_file'] == ROLLUP_BASENAME + '.csv'
+        output_path = os.path.join(root, ROLLUP_BASENAME + '.csv')
+        assert list(pd.read_csv(output_path, encoding='utf-8-sig')['faltas']) == [1]
+        assert not [name for name in os.listdir(root) if name.endswith(('.gz', '.tmp'))]
+
+        # Mesmo conteúdo: o arquivo não é regravado
+        mtime = os.stat(output_path).st_mtime_ns
+        service.refresh_rollups(force=True)
+        assert os.stat(output_path).st_mtime_ns == mtime
+
+
+if __name__ == "__main__":
+    test_team_month_aggregates()
+    print("✓ Agregados por equipe e mês")
+    test_only_changed_months_are_recomputed()
+    print("✓ Recálculo só dos meses alterados")
+    test_rollup_csv_written_without_precompressed_copy()
+    print("✓ rollup_equipe_mes.csv gravado sem cópia pré-comprimida")
@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+from bi_store_service import BIStoreService, fact_table_name, normalize_names
+
+# Base analítica local (bi_store_service.py): ingestão incremental e remoção de arquivos.
+# Uso: python -m pytest test_bi_store.py  (ou python test_bi_store.py)
+
+
+def _facts(nomes, motivo):
+    nomes = pd.Series(nomes)
+    return pd.DataFrame({
+        'cpf': [None] * len(nomes),
+        'nome': nomes,
+        'nome_norm': normalize_names(nomes),
+        'equipe': 'LOJA 1',
+        'data': '2025-10-03',
+        'Motivo': motivo,
+    })
+
+
+def test_ingest_replaces_file_rows_and_removes_missing_files():
+    with tempfile.TemporaryDirectory() as root:
+        store = BIStoreService(os.path.join(root, 'base_bi.sqlite'))
+        outubro = os.path.join(root, 'Faltas_outubro.csv')
+        novembro = os.path.join(root, 'Faltas_novembro.csv')
+
+        store.ingest(outubro, 'Faltas', _facts(['Ana  Sílva', 'BRUNO'], 'FOLGA'), size=10, mtime_ns=1)
+        store.ingest(novembro, 'Faltas', _facts(['ANA SILVA'], 'ATESTADO'), size=20, mtime_ns=2)
+        # Nova versão do arquivo substitui as linhas anteriores, com coluna nova
+        store.ingest(outubro, 'Faltas', _facts(['ANA SILVA'], 'FOLGA').assign(Obs='x'), size=11, mtime_ns=3)
+
+        assert store.ingested_files()[os.path.abspath(outubro)]['mtime_ns'] == 3
+        conn = sqlite3.connect(store.db_path)
+        rows = conn.execute("SELECT nome_norm, Motivo, Obs FROM fato_faltas ORDER BY Motivo").fetchall()
+        assert rows == [('ANA SILVA', 'ATESTADO', None), ('ANA SILVA', 'FOLGA', 'x')]
+
+        assert store.remove_missing([novembro]) == 1
+        assert conn.execute("SELECT COUNT(*) FROM fato_faltas").fetchone()[0] == 1
+        status = store.status()
+        assert status['tables']['fato_faltas']['rows'] == 1 and status['tables']['fato_faltas']['files'] == 1
+        conn.close()
+
+
+def test_fact_table_names():
+    assert fact_table_name('Banco de horas') == 'fato_banco_de_horas'
+    assert fact_table_name('Solicitações') == 'fato_solicitacoes'
+    assert fact_table_name('Afastamentos e férias') == 'fato_afastamentos_e_ferias'
+
+
+if __name__ == "__main__":
+    test_ingest_replaces_file_rows_and_removes_missing_files()
+    print("✓ Ingestão incremental e remoção de arquivos")
+    test_fact_table_names()
+    print("✓ Nomes das tabelas fato")
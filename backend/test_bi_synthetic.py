@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+from bi_service import BIService
+from bi_synthetic import SyntheticReportGenerator, TRAINEE_FOLDER, load_structure
+from dialect_service import DialectService
+from bi_employee_service import BIEmployeeService
+from bi_store_service import BIStoreService
+
+# Relatórios sintéticos (bi_synthetic.py): os arquivos gerados são lidos pela Base BI.
+# Uso: python -m pytest test_bi_synthetic.py  (ou python test_bi_synthetic.py)
+
+
+def test_generated_reports_are_read_and_merged():
+    with tempfile.TemporaryDirectory() as root:
+        files = SyntheticReportGenerator(people=40, months=2, seed=5, jornada_quirk=0.5).generate(root)
+        structure = load_structure()
+        assert {f['folder'] for f in files} == set(structure) | {TRAINEE_FOLDER}
+
+        service = BIService()
+        service._root_folder = root
+        service.dialect_service = DialectService(os.path.join(root, 'dialetos.json'))
+        service.employee_service = BIEmployeeService(BIStoreService(os.path.join(root, 'base_bi.sqlite')))
+        saves = []
+        save_cache = service.dialect_service._save_cache
+        service.dialect_service._save_cache = lambda: saves.append(1) or save_cache()
+        for file_info in files:
+            df = service._read_file_safe(file_info['full_path'])
+            assert len(df) > 0, file_info['filename']
+            expected = structure.get(file_info['folder'], ['login'])[0]
+            # Jornada no layout "Colaborador" só traz Data e Nome
+            assert expected in df.columns or 'Nome' in df.columns, (file_info['filename'], list(df.columns))
+
+        merged = service.merge_reports(files, vectorized=True, use_cache=False)
+        assert len(merged) > 0 and merged['Nome'].notna().all()
+
+        # Dialetos aprendidos gravados de uma vez no fim da mesclagem, não a cada arquivo
+        assert len(saves) == 1
+        cached = DialectService(os.path.join(root, 'dialetos.json'))
+        assert all(cached.cached_dialect(f['full_path']) for f in files if f['filename'].endswith('.csv'))
+
+
+def test_same_seed_generates_same_files():
+    contents = []
+    for _ in range(2):
+        with tempfile.TemporaryDirectory() as root:
+            files = SyntheticReportGenerator(people=10, months=1, seed=7).generate(root)
+            contents.append([(f['filename'], open(f['full_path'], 'rb').read()) for f in files])
+    assert contents[0] == contents[1]
+
+
+if __name__ == "__main__":
+    test_generated_reports_are_read_and_merged()
+    print("✓ Relatórios gerados lidos e mesclados")
+    test_same_seed_generates_same_files()
+    print("✓ Mesma semente, mesmos arquivos")
@@ -0,0 +1,85 @@
+import pandas as pd
+
+from timeline_service import TimelineService
+
+# Relatório diário operacional (timeline_service.py) em frames pequenos montados à mão.
+# Uso: python -m pytest test_bi_timeline.py  (ou python test_bi_timeline.py)
+
+
+def _reports():
+    banco = pd.DataFrame({
+        'Nome': ['BRUNO COSTA', 'ANA SILVA', 'ANA SILVA', 'Totais'],
+        'Equipe': ['LOJA 2', 'LOJA 1', 'LOJA 1', ''],
+        'Data': ['Qui, 02/10/2025', 'Qua, 01/10/2025', 'Qui, 02/10/2025', ''],
+        'Saldo BH': ['01:00', '02:13', '02:20', '03:33'],
+    })
+    faltas = pd.DataFrame({
+        'Nome': ['ANA SILVA', '12345'],
+        'Equipe': ['LOJA 1', 'LOJA 1'],
+        'Data': ['"Sex, 03/10/2025"', 'Sex, 03/10/2025'],
+        'Motivo': ['FOLGA/ESCALA', 'FOLGA/ESCALA'],
+    })
+    auditoria = pd.DataFrame({
+        'Nome': ['ANA SILVA', 'ANA SILVA', 'ANA SILVA', ' BRUNO COSTA '],
+        'Data': ['Qua, 01/10/2025', 'Qua, 01/10/2025', 'Qua, 01/10/2025', 'Qui, 02/10/2025'],
+        'Ocorrência': ['Falta', 'Horas Faltantes', 'Falta', 'Falta'],
+        'Valor': ['Abonada', '00:11', 'Abonada', None],
+    })
+    colaboradores = pd.DataFrame({
+        'Nome': ['ANA SILVA', 'BRUNO COSTA'],
+        'CPF': ['012.345.678-90', '98765432100'],
+        'Equipe': ['LOJA 1', 'LOJA 2'],
+    })
+    return {'Banco de horas': banco, 'Faltas': faltas, 'Auditoria': auditoria}, colaboradores
+
+
+def test_timeline_one_row_per_collaborator_and_day():
+    reports, colaboradores = _reports()
+    timeline = TimelineService().build(reports, colaboradores)
+
+    assert list(timeline.columns[:4]) == ['DATA', 'CPF', 'NOME', 'EQUIPE_CADASTRO']
+    rows = [(row.NOME, row.DATA.strftime('%d/%m')) for row in timeline.itertuples()]
+    assert rows == [('ANA SILVA', '01/10'), ('ANA SILVA', '02/10'), ('ANA SILVA', '03/10'), ('BRUNO COSTA', '02/10')]
+
+    ana = timeline.iloc[0]
+    assert ana['CPF'] == '01234567890' and ana['EQUIPE_CADASTRO'] == 'LOJA 1'
+    # Linha repetida conta uma vez; ocorrências diferentes no mesmo dia são unidas na ordem
+    assert ana['OCORRÊNCIA_AUDIT'] == 'Falta | Horas Faltantes'
+    assert ana['VALOR_AUDIT'] == 'Abonada | 00:11'
+    assert timeline.iloc[2]['MOTIVO_FALTA'] == 'FOLGA/ESCALA'
+    assert pd.isna(timeline.iloc[2]['SALDO BH_BH'])
+    assert 'EQUIPE_BH' not in timeline.columns
+
+
+def test_timeline_period_filter_and_date_formats():
+    service = TimelineService()
+    dates = service.parse_dates(pd.Series(['Sex, 03/10/2025', '03/10/2025', '"Sáb, 04/10/2025"', 'Totais', None]))
+    assert [d.strftime('%Y-%m-%d') if not pd.isna(d) else None for d in dates] == \
+        ['2025-10-03', '2025-10-03', '2025-10-04', None, None]
+
+    reports, colaboradores = _reports()
+    timeline = service.build(reports, colaboradores, start=pd.Timestamp('2025-10-02'), end=pd.Timestamp('2025-10-02'))
+    assert list(timeline['NOME']) == ['ANA SILVA', 'BRUNO COSTA']
+
+
+def test_timeline_drops_dates_outside_key_range():
+    reports, colaboradores = _reports()
+    # Data antiga (antes de 1970) cairia no dia de outro nome da chave inteira
+    reports['Faltas'] = pd.concat([reports['Faltas'], pd.DataFrame({
+        'Nome': ['BRUNO COSTA'], 'Equipe': ['LOJA 2'], 'Data': ['Seg, 01/01/1900'], 'Motivo': ['FALTA'],
+    })], ignore_index=True)
+    timeline = TimelineService().build(reports, colaboradores)
+
+    rows = [(row.NOME, row.DATA.strftime('%Y-%m-%d')) for row in timeline.itertuples()]
+    assert rows == [('ANA SILVA', '2025-10-01'), ('ANA SILVA', '2025-10-02'), ('ANA SILVA', '2025-10-03'),
+                    ('BRUNO COSTA', '2025-10-02')]
+    assert list(timeline['MOTIVO_FALTA'].dropna()) == ['FOLGA/ESCALA']
+
+
+if __name__ == "__main__":
+    test_timeline_one_row_per_collaborator_and_day()
+    print("✓ Uma linha por colaborador e dia")
+    test_timeline_period_filter_and_date_formats()
+    print("✓ Filtro de período e formatos de data")
+    test_timeline_drops_dates_outside_key_range()
+    print("✓ Datas fora do intervalo da chave descartadas")
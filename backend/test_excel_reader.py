@@ -0,0 +1,99 @@
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import Workbook
+
+from bi_service import BIService
+import excel_reader
+from excel_reader import read_excel_fast, detect_header_row, CALAMINE_AVAILABLE
+
+# Leitura única de planilhas (excel_reader.py): cabeçalho após o preâmbulo e mesmo resultado do pd.read_excel.
+# Uso: python -m pytest test_excel_reader.py  (ou python test_excel_reader.py)
+
+
+ENGINES = ['openpyxl', 'pandas'] + (['calamine'] if CALAMINE_AVAILABLE else [])
+
+
+def _workbook(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def test_header_after_report_preamble():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'Pontomais_-_Faltas.xlsx')
+        _workbook(path, [
+            ['Relatório de Faltas'],
+            ['Por SISTEMA BOT em 08/11/2025'],
+            [],
+            ['Nome', 'CPF', 'Equipe', 'Data', 'Motivo'],
+            ['ANA SILVA', '111.111.111-11', 'LOJA 1', datetime(2025, 10, 3), 'FALTA'],
+            ['BRUNO COSTA', '222.222.222-22', 'LOJA 2', datetime(2025, 10, 4), None],
+            [None, None, None, None, None],
+        ])
+        expected = pd.read_excel(path, skiprows=3)
+        for engine in ENGINES:
+            df = read_excel_fast(path, engine=engine)
+            pd.testing.assert_frame_equal(df, expected)
+        assert list(expected.columns) == ['Nome', 'CPF', 'Equipe', 'Data', 'Motivo'] and len(expected) == 2
+
+        service = BIService()
+        df = service._read_file_safe(path)
+        assert list(df['Nome']) == ['ANA SILVA', 'BRUNO COSTA']
+
+        # Sem preâmbulo o cabeçalho é a primeira linha; sem Nome/CPF, a primeira com mais de uma célula
+        assert detect_header_row([['Nome', 'Equipe'], ['ANA', 'LOJA 1']]) == 0
+        assert detect_header_row([['Relatório de Horas', ''], ['', ''], ['Loja', 'Total'], ['1', '2']]) == 2
+
+
+def test_same_frame_as_read_excel():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'Nomes.xlsx')
+        _workbook(path, [
+            ['Nome', 'Admissão', 'Demissão', 'Código', 'Horas'],
+            ['ANA SILVA', datetime(2020, 1, 2), None, 1001, 7.5],
+            ['BRUNO COSTA', '15/03/2021', datetime(2025, 6, 30), 1002.0, 8],
+            [None, None, None, None, None],
+            ['CARLA SOUZA', datetime(2022, 5, 1), None, None, '#N/A'],
+        ])
+        dtype = {'Nome': str, 'Admissão': str, 'Demissão': str}
+        for kwargs in ({}, {'dtype': dtype}):
+            expected = pd.read_excel(path, **kwargs)
+            for engine in ENGINES:
+                pd.testing.assert_frame_equal(read_excel_fast(path, engine=engine, **kwargs), expected)
+
+
+def test_without_pandas_text_parser():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'Pontomais_-_Faltas.xlsx')
+        _workbook(path, [
+            ['Relatório de Faltas'],
+            [],
+            ['Nome', 'CPF', 'Data', 'Horas'],
+            ['ANA SILVA', '111.111.111-11', datetime(2025, 10, 3), 8],
+            ['BRUNO COSTA', '222.222.222-22', '04/10/2025', None],
+        ])
+        expected = read_excel_fast(path, dtype={'CPF': str})
+
+        # pandas sem o parser interno: mesmo frame pelo pd.read_excel a partir do cabeçalho
+        text_parser = excel_reader.TextParser
+        excel_reader.TextParser = None
+        try:
+            for engine in ENGINES:
+                pd.testing.assert_frame_equal(read_excel_fast(path, dtype={'CPF': str}, engine=engine), expected)
+        finally:
+            excel_reader.TextParser = text_parser
+
+
+if __name__ == "__main__":
+    test_header_after_report_preamble()
+    print("✓ Cabeçalho após o preâmbulo do relatório")
+    test_same_frame_as_read_excel()
+    print("✓ Mesmo resultado do pd.read_excel")
+    test_without_pandas_text_parser()
+    print("✓ Leitura sem o parser interno do pandas")
@@ -0,0 +1,320 @@
+import os
+import time
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from queue_manager import QueueManager, task_fingerprint, PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH
+from queue_store_service import QueueStoreService
+
+# Fila de tarefas (queue_manager.py): ordem por prioridade, chegada como desempate, envelhecimento
+# limite de tarefas simultâneas por recurso, persistência (queue_store_service.py), agrupamento de pedidos iguais
+# e retenção do registro de tarefas.
+# Uso: python -m pytest test_queue_manager.py  (ou python test_queue_manager.py)
+
+
+def _names(tasks):
+    return [task['data']['report_name'] for task in tasks]
+
+
+def test_priority_with_fifo_tiebreak():
+    manager = QueueManager()
+    for idx in range(40):
+        manager.add_task('report', {'report_name': f'lote {idx}'}, priority=PRIORITY_LOW)
+    manager.add_task('bi_merge', {'report_name': 'mesclagem'})
+    interactive = manager.add_task('report', {'report_name': 'interativo'}, priority=PRIORITY_HIGH)
+
+    # A fila mostra a mesma ordem em que as tarefas serão executadas
+    items = manager.get_queue_items()
+    assert _names(items[:4]) == ['interativo', 'mesclagem', 'lote 0', 'lote 1']
+    assert _names(items[-1:]) == ['lote 39']
+    assert manager.get_queue_position(interactive) == 1 and manager.get_queue_size() == 42
+
+    executed = []
+    while manager.get_queue_size():
+        executed.append(manager._next_task(timeout=0))
+        manager._release(executed[-1])
+    assert _names(executed) == _names(items)
+    assert manager._next_task(timeout=0) is None and manager.get_queue_position(interactive) is None
+
+
+def test_aging_prevents_starvation():
+    manager = QueueManager(aging_seconds=0.05)
+    manager.add_task('report', {'report_name': 'agendado'}, priority=PRIORITY_LOW)
+    time.sleep(0.2)
+    # Após mais de dois níveis de espera, o agendado passa à frente de pedidos novos
+    manager.add_task('report', {'report_name': 'interativo'}, priority=PRIORITY_HIGH)
+    manager.add_task('report', {'report_name': 'normal'}, priority=PRIORITY_NORMAL)
+    assert _names(manager.get_queue_items()) == ['agendado', 'interativo', 'normal']
+
+
+def test_worker_runs_in_priority_order():
+    manager = QueueManager()
+    executed = []
+    release = threading.Event()
+
+    def processor(task):
+        release.wait(5)
+        executed.append(task['data']['report_name'])
+        return {'success': True}
+
+    manager.set_task_processor(processor)
+    manager.start_worker()
+    try:
+        first = manager.add_task('report', {'report_name': 'primeiro'}, priority=PRIORITY_LOW)
+        deadline = time.time() + 5
+        while not manager.get_current_tasks() and time.time() < deadline:
+            time.sleep(0.01)
+        manager.add_task('report', {'report_name': 'lote'}, priority=PRIORITY_LOW)
+        last = manager.add_task('report', {'report_name': 'interativo'}, priority=PRIORITY_HIGH)
+        release.set()
+
+        while manager.get_task_status(last)['status'] != 'completed' and time.time() < deadline:
+            time.sleep(0.01)
+        while manager.get_queue_size() and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        manager.stop_worker()
+
+    assert executed[:2] == ['primeiro', 'interativo']
+    assert manager.get_task_status(first)['status'] == 'completed'
+
+
+def test_resources_run_in_parallel_within_limits():
+    manager = QueueManager(resource_limits={'browser': 1, 'database': 2})
+    lock = threading.Lock()
+    running = {}
+    peak = {}
+    release = threading.Event()
+
+    def processor(task):
+        with lock:
+            running[task['resource']] = running.get(task['resource'], 0) + 1
+            peak[task['resource']] = max(peak.get(task['resource'], 0), running[task['resource']])
+        release.wait(5)
+        with lock:
+            running[task['resource']] -= 1
+        return {'success': True}
+
+    manager.set_task_processor(processor)
+    browser = [manager.add_task('report', {'report_name': f'lote {idx}'}, priority=PRIORITY_LOW) for idx in range(3)]
+    queries = [manager.add_task('db_query', {'query_type': f'consulta {idx}'}) for idx in range(3)]
+    manager.start_worker()
+    try:
+        # Consultas ao banco não esperam o navegador: uma de cada recurso (até o limite) em paralelo
+        deadline = time.time() + 5
+        while len(manager.get_current_tasks()) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        current = manager.get_current_tasks()
+        assert sorted(task['resource'] for task in current) == ['browser', 'database', 'database']
+        assert manager.can_start_now(current[0]['id']) and not manager.can_start_now(browser[1])
+        release.set()
+
+        tasks = browser + queries
+        while any(manager.get_task_status(t)['status'] != 'completed' for t in tasks) and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        manager.stop_worker()
+
+    assert all(manager.get_task_status(t)['status'] == 'completed' for t in browser + queries)
+    assert peak == {'browser': 1, 'database': 2}
+    assert manager.get_current_tasks() == []
+
+
+def test_duplicate_requests_are_coalesced():
+    manager = QueueManager()
+    ranges = [{'start_date': '01/10/2025', 'end_date': '31/10/2025'}]
+    scheduled = manager.add_task('report', {'report_name': 'Faltas', 'date_ranges': ranges,
+                                            'scheduled': True, 'schedule_name': 'Diário'}, priority=PRIORITY_LOW)
+    other = manager.add_task('report', {'report_name': 'Assinaturas', 'date_ranges': ranges}, priority=PRIORITY_LOW)
+    # Mesmo relatório e período pedido pela interface: mesma tarefa, com a prioridade do pedido interativo
+    assert manager.add_task('report', {'date_ranges': ranges, 'report_name': 'Faltas'}, priority=PRIORITY_HIGH) == scheduled
+    november, coalesced = manager.add_task('report', {'report_name': 'Faltas', 'date_ranges': [
+        {'start_date': '01/11/2025', 'end_date': '30/11/2025'}]}, return_coalesced=True)
+    assert november != scheduled and not coalesced
+    assert manager.add_task('report', {'report_name': 'Faltas', 'date_ranges': [
+        {'start_date': '01/11/2025', 'end_date': '30/11/2025'}]}, return_coalesced=True) == (november, True)
+    assert manager.get_task_status(scheduled)['priority'] == PRIORITY_HIGH
+    assert manager.get_task_status(scheduled)['coalesced'] == 1
+    assert manager.get_task_status(november)['coalesced'] == 1
+    assert [task['id'] for task in manager.get_queue_items()] == [scheduled, november, other]
+    assert manager.get_queue_size() == 3
+    assert task_fingerprint('report', {'report_name': 'Turnos', 'date_ranges': None}) == \
+        task_fingerprint('report', {'report_name': 'Turnos'})
+
+    # Em execução o relatório continua recebendo pedidos; rescisão pendente também é agrupada
+    running = manager._next_task(timeout=0)
+    assert running['id'] == scheduled
+    assert manager.add_task('report', {'report_name': 'Faltas', 'date_ranges': ranges}) == scheduled
+    rescisao = manager.add_task('rescisao', {})
+    assert manager.add_task('rescisao', {}) == rescisao
+
+    # Concluída: um novo pedido cria outra tarefa
+    manager._release(running)
+    assert manager.add_task('report', {'report_name': 'Faltas', 'date_ranges': ranges}) != scheduled
+
+
+class _SlowStore(QueueStoreService):
+    """Base cuja gravação da primeira tarefa espera a liberação do teste"""
+    
+    def __init__(self, path):
+        super().__init__(path)
+        self.saving = threading.Event()
+        self.release = threading.Event()
+    
+    def save(self, task):
+        if not self.saving.is_set():
+            self.saving.set()
+            self.release.wait(5)
+        super().save(task)
+
+
+def test_duplicate_while_first_is_persisting():
+    with tempfile.TemporaryDirectory() as root:
+        store = _SlowStore(os.path.join(root, 'queue.sqlite3'))
+        manager = QueueManager(store=store)
+        results = {}
+        first = threading.Thread(target=lambda: results.update(
+            first=manager.add_task('report', {'report_name': 'Faltas'}, priority=PRIORITY_LOW, return_coalesced=True)))
+        first.start()
+        assert store.saving.wait(5)
+
+        # Pedido igual enquanto a primeira gravação não terminou: já encontra a tarefa na fila
+        duplicate = threading.Thread(target=lambda: results.update(
+            duplicate=manager.add_task('report', {'report_name': 'Faltas'}, priority=PRIORITY_HIGH, return_coalesced=True)))
+        duplicate.start()
+        task_id = manager.get_queue_items()[0]['id']
+        while manager.get_task_status(task_id)['coalesced'] == 0 and duplicate.is_alive():
+            time.sleep(0.01)
+        store.release.set()
+        first.join(5)
+        duplicate.join(5)
+        assert results == {'first': (task_id, False), 'duplicate': (task_id, True)}
+        assert manager.get_task_status(task_id)['priority'] == PRIORITY_HIGH
+        assert manager._next_task(timeout=0)['id'] == task_id
+
+
+def test_slow_save_does_not_overwrite_newer_state():
+    with tempfile.TemporaryDirectory() as root:
+        store = _SlowStore(os.path.join(root, 'queue.sqlite3'))
+        manager = QueueManager(store=store)
+        adding = threading.Thread(target=manager.add_task, args=('report', {'report_name': 'Faltas'}))
+        adding.start()
+        assert store.saving.wait(5)
+
+        # O worker pega a tarefa enquanto a gravação de 'pending' ainda não terminou
+        starting = threading.Thread(target=manager._next_task, args=(0,))
+        starting.start()
+        starting.join(0.2)
+        store.release.set()
+        adding.join(5)
+        starting.join(5)
+        assert [task['status'] for task in store.load()] == ['processing']
+
+
+def _stored(store):
+    return {task['id']: task for task in store.load()}
+
+
+def test_restart_recovers_queue():
+    with tempfile.TemporaryDirectory() as root:
+        store = QueueStoreService(os.path.join(root, 'queue.sqlite3'))
+        manager = QueueManager(store=store)
+        report = manager.add_task('report', {'report_name': 'Faltas', 'date_ranges': None}, priority=PRIORITY_HIGH)
+        rescisao = manager.add_task('rescisao', {})
+        query = manager.add_task('db_query', {'query_type': 'trainees'})
+        pending = manager.add_task('report', {'report_name': 'Turnos'}, priority=PRIORITY_LOW)
+        done = manager.add_task('bi_merge', {'export_format': 'csv'})
+
+        # Execução simulada: report e consulta em andamento, mesclagem concluída
+        started = [manager._next_task(timeout=0) for _ in range(3)]
+        assert sorted(task['id'] for task in started) == sorted([report, query, done])
+        merge = manager.get_task_status(done)
+        merge.update({'status': 'completed', 'result': {'records': 10}})
+        manager._release(merge)
+
+        # Progresso só chega à base no lote (write-behind)
+        manager.update_task_progress(report, 60, 'Baixando Faltas...')
+        assert _stored(store)[report]['progress'] == 0
+        manager._flush_progress()
+        assert (_stored(store)[report]['progress'], _stored(store)[report]['status']) == (60, 'processing')
+
+        # A rescisão também estava em execução quando o serviço caiu
+        store.save(dict(manager.get_task_status(rescisao), status='processing'))
+
+        restarted = QueueManager(store=QueueStoreService(os.path.join(root, 'queue.sqlite3')))
+        # Reenfileiradas com prioridade e espera preservadas; a rescisão não é repetida
+        assert [task['id'] for task in restarted.get_queue_items()] == [report, query, pending]
+        assert restarted.get_task_status(report)['status'] == 'pending'
+        assert restarted.get_task_status(report)['data']['report_name'] == 'Faltas'
+        assert restarted.get_task_status(rescisao)['status'] == 'interrupted'
+        assert restarted.get_task_status(done)['result'] == {'records': 10}
+        assert _stored(store)[rescisao]['status'] == 'interrupted'
+
+        restarted.clear_completed_tasks()
+        assert sorted(_stored(store)) == sorted([report, query, pending])
+
+
+def _finish(manager, count, status='completed'):
+    for _ in range(count):
+        task = manager._next_task(timeout=0)
+        task.update({'status': status, 'completed_at': datetime.now().isoformat()})
+        manager._release(task)
+
+
+def test_retention_evicts_oldest_finished_tasks():
+    with tempfile.TemporaryDirectory() as root:
+        store = QueueStoreService(os.path.join(root, 'queue.sqlite3'))
+        manager = QueueManager(store=store, retention={'tasks': 3, 'days': 7})
+        ids = [manager.add_task('db_query', {'query_type': f'consulta {idx}'}) for idx in range(5)]
+        _finish(manager, 4)
+
+        # Ficam as 3 mais recentes (a pendente sempre fica); a página sai na ordem de criação inversa
+        assert [task['id'] for task in manager.get_all_tasks()] == ids[:1:-1]
+        assert [task['id'] for task in manager.get_all_tasks(offset=1, limit=1)] == [ids[3]]
+        assert manager.get_task_count() == 3 and manager.get_task_status(ids[4])['status'] == 'pending'
+
+        # Retiradas da memória continuam na base (spill_to_disk) e consultáveis por id
+        assert manager.get_task_status(ids[0])['status'] == 'completed'
+        assert sorted(_stored(store)) == sorted(ids)
+
+        # Finalizadas há mais de retention_days saem da memória e da base
+        old = (datetime.now() - timedelta(days=8)).isoformat()
+        store.save(dict(store.get(ids[0]), completed_at=old))
+        task = manager.get_task_status(ids[2])
+        task['completed_at'] = old
+        store.save(task)
+        manager.set_retention({'tasks': 0, 'spill_to_disk': True})
+        assert [task['id'] for task in manager.get_all_tasks()] == [ids[4], ids[3]]
+        assert sorted(_stored(store)) == sorted([ids[1], ids[3], ids[4]])
+
+        # Sem spill_to_disk a retirada apaga a tarefa da base
+        manager.set_retention({'tasks': 1, 'spill_to_disk': False})
+        assert manager.get_task_status(ids[3]) is None
+        assert sorted(_stored(store)) == sorted([ids[1], ids[4]])
+
+        # Após reinício a retenção vale para as finalizadas recuperadas
+        restarted = QueueManager(retention={'tasks': 2})
+        restarted.set_store(QueueStoreService(os.path.join(root, 'queue.sqlite3')))
+        assert [task['id'] for task in restarted.get_all_tasks()] == [ids[4], ids[1]]
+
+
+if __name__ == "__main__":
+    test_priority_with_fifo_tiebreak()
+    print("✓ Prioridade com desempate pela ordem de chegada")
+    test_aging_prevents_starvation()
+    print("✓ Envelhecimento evita que tarefas baixas fiquem paradas")
+    test_worker_runs_in_priority_order()
+    print("✓ Worker executa na ordem de prioridade")
+    test_resources_run_in_parallel_within_limits()
+    print("✓ Recursos em paralelo dentro dos limites")
+    test_duplicate_requests_are_coalesced()
+    print("✓ Pedidos iguais agrupados na mesma tarefa")
+    test_duplicate_while_first_is_persisting()
+    print("✓ Pedido igual durante a gravação da primeira tarefa")
+    test_slow_save_does_not_overwrite_newer_state()
+    print("✓ Gravação lenta não sobrescreve estado mais novo")
+    test_restart_recovers_queue()
+    print("✓ Fila recuperada após reinício")
+    test_retention_evicts_oldest_finished_tasks()
+    print("✓ Retenção retira as tarefas finalizadas mais antigas")
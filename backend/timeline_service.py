@@ -0,0 +1,236 @@
+from typing import Dict, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Relatórios diários da linha do tempo (tipo de relatório -> sufixo das colunas), na ordem do join
+TIMELINE_REPORTS = {
+    'Jornada': '',
+    'Banco de horas': 'BH',
+    'Faltas': 'FALTA',
+    'Auditoria': 'AUDIT',
+}
+TIMELINE_KEYS = ['NOME', 'DATA']
+TIMELINE_BASENAME = "relatorio_diario_operacional"
+
+# Linhas de totais/resumos e IDs numéricos soltos no lugar do nome
+INVALID_NAME_PATTERN = r'RESUMO|TOTAL|SISTEMA'
+NUMERIC_NAME_PATTERN = r'^[\d\.,]+$'
+
+# Separador dos valores de linhas repetidas (ex: várias ocorrências da Auditoria no mesmo dia)
+VALUES_SEPARATOR = ' | '
+
+# Chave inteira do join: código do nome * DAY_SLOTS + dias desde 1970-01-01
+# (datas fora de [1970-01-01, 1970 + DAY_SLOTS dias) ficam fora da linha do tempo)
+DAY_SLOTS = 1 << 20
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+class TimelineService:
+    """
+    Relatório diário operacional: uma linha por colaborador e dia
+
+    Junta Jornada, Banco de horas, Faltas e Auditoria por NOME+DATA (outer join)
+    e completa CPF e equipe pelo cadastro de Colaboradores. Cada relatório vira
+    um frame indexado por uma chave inteira (nome, dia), ordenado e sem chaves
+    repetidas, e os frames são unidos pelo índice.
+    """
+
+    def _normalize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        df = df.copy()
+        df.columns = [str(c).strip().upper() for c in df.columns]
+        if 'NOME' not in df.columns and 'COLABORADOR' in df.columns:
+            df = df.rename(columns={'COLABORADOR': 'NOME'})
+        # Colunas repetidas (ex: arquivos de layouts diferentes) ficam com a primeira
+        return df.loc[:, ~df.columns.duplicated()]
+
+    def _valid_names(self, names: pd.Series) -> pd.Series:
+        """Nomes de colaboradores (sem totais, resumos e IDs numéricos), sem espaços nas pontas"""
+        # Cada nome se repete em todos os dias: valida só os valores distintos
+        codes, uniques = pd.factorize(names.astype(object))
+        text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+        invalid = (
+            (text == '')
+            | text.str.upper().str.contains(INVALID_NAME_PATTERN, regex=True, na=False)
+            | text.str.match(NUMERIC_NAME_PATTERN, na=False)
+        )
+        cleaned = text.where(~invalid).to_numpy(dtype=object)
+        return pd.Series(np.where(codes >= 0, cleaned[codes], None), index=names.index, dtype=object)
+
+    def parse_dates(self, values: pd.Series) -> pd.Series:
+        """
+        Datas dos relatórios ("Sex, 03/10/2025", "03/10/2025" ou datas do Excel) -> datetime64
+
+        Formato explícito: os últimos 10 caracteres são DD/MM/AAAA; o que não
+        seguir esse formato é procurado no texto. Valores inválidos viram NaT.
+        Só os valores distintos são convertidos (um ano tem 365 datas).
+        """
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            return values.dt.normalize()
+
+        codes, uniques = pd.factorize(values.astype(object))
+        text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+        text = text.str.replace('"', '', regex=False).str.replace("'", '', regex=False)
+        dates = pd.to_datetime(text.str.slice(-10), format='%d/%m/%Y', errors='coerce')
+
+        retry = dates.isna() & (text != '')
+        if retry.any():
+            found = text[retry].str.extract(r'(\d{2}/\d{2}/\d{4})', expand=False)
+            dates[retry] = pd.to_datetime(found, format='%d/%m/%Y', errors='coerce')
+
+        parsed = dates.to_numpy(dtype='datetime64[ns]')
+        return pd.Series(np.where(codes >= 0, parsed[codes], np.datetime64('NaT')), index=values.index)
+
+    def _clean(self, df: pd.DataFrame, suffix: str) -> Optional[pd.DataFrame]:
+        """NOME/DATA válidos e colunas de valores do relatório (None se não tiver NOME e DATA)"""
+        df = self._normalize_columns(df)
+        if 'NOME' not in df.columns or 'DATA' not in df.columns:
+            return None
+
+        df['NOME'] = self._valid_names(df['NOME'])
+        df['DATA'] = self.parse_dates(df['DATA'])
+        df = df.dropna(subset=TIMELINE_KEYS)
+
+        # CPF vem do cadastro; equipe só da Jornada (os demais repetem a do cadastro)
+        dropped = ['CPF'] if not suffix else ['CPF', 'EQUIPE']
+        return df[TIMELINE_KEYS + [c for c in df.columns if c not in TIMELINE_KEYS and c not in dropped]]
+
+    def _join_values(self, keys: np.ndarray, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Uma linha por chave: valores não vazios de cada coluna unidos por ' | '
+
+        Linhas idênticas (ex: períodos sobrepostos) contam uma vez; as demais
+        mantêm a ordem, então a n-ésima ocorrência corresponde ao n-ésimo valor.
+        """
+        df = df.assign(_key=keys).drop_duplicates()
+        order = np.argsort(df['_key'].to_numpy(), kind='stable')
+        df = df.iloc[order]
+        sorted_keys = df.pop('_key').to_numpy()
+
+        result = pd.DataFrame(index=pd.Index(np.unique(sorted_keys), name='_key'), columns=df.columns, dtype=object)
+        for col in df.columns:
+            values = df[col]
+            filled = values.notna().to_numpy()
+            text = values[filled].astype(str).str.strip()
+            not_empty = (text != '').to_numpy()
+            col_keys = sorted_keys[filled][not_empty]
+            if not len(col_keys):
+                continue
+            items = text[not_empty].tolist()
+            # Chaves ordenadas: cada grupo é uma fatia contígua
+            starts = np.flatnonzero(np.r_[True, col_keys[1:] != col_keys[:-1]])
+            ends = np.r_[starts[1:], len(col_keys)]
+            joined = [VALUES_SEPARATOR.join(items[a:b]) if b - a > 1 else items[a] for a, b in zip(starts, ends)]
+            result.loc[col_keys[starts], col] = joined
+        return result
+
+    def prepare(self, df: pd.DataFrame, names: pd.Index, suffix: str = '') -> pd.DataFrame:
+        """
+        Frame limpo (ver _clean) indexado pela chave inteira de (NOME, DATA), ordenado e com chaves únicas
+
+        Dias fora de [0, DAY_SLOTS) desde 1970-01-01 (datas antigas ou malformadas)
+        são descartados: cairiam na chave de outro nome ou de outro dia.
+
+        Args:
+            names: Nomes de todos os relatórios, ordenados (define a chave)
+        """
+        days = (df['DATA'].to_numpy().astype('datetime64[D]') - EPOCH).astype(np.int64)
+        in_range = (days >= 0) & (days < DAY_SLOTS)
+        if not in_range.all():
+            logger.warning(f"Linha do tempo: {int((~in_range).sum())} linha(s) com data fora do intervalo "
+                           f"{EPOCH} a {EPOCH + DAY_SLOTS - 1} descartada(s)")
+            df = df[in_range]
+            days = days[in_range]
+        name_codes = names.get_indexer(df['NOME']).astype(np.int64)
+        keys = name_codes * DAY_SLOTS + days
+        values = df.drop(columns=TIMELINE_KEYS)
+
+        repeated = pd.Index(keys).duplicated(keep=False)
+        if repeated.any():
+            # Ex: Auditoria com várias ocorrências no mesmo dia
+            unique_rows = values[~repeated].set_axis(pd.Index(keys[~repeated], name='_key'))
+            joined = self._join_values(keys[repeated], values[repeated])
+            values = pd.concat([unique_rows, joined])
+        else:
+            values = values.set_axis(pd.Index(keys, name='_key'))
+
+        if suffix:
+            values = values.rename(columns={c: f"{c}_{suffix}" for c in values.columns})
+        return values.sort_index()
+
+    def _registry_maps(self, colaboradores: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """NOME -> CPF (só dígitos) e EQUIPE_CADASTRO pelo cadastro de Colaboradores"""
+        if colaboradores is None or colaboradores.empty:
+            return pd.DataFrame(columns=['CPF', 'EQUIPE_CADASTRO'])
+
+        df = self._normalize_columns(colaboradores)
+        if 'NOME' not in df.columns:
+            return pd.DataFrame(columns=['CPF', 'EQUIPE_CADASTRO'])
+        df['NOME'] = self._valid_names(df['NOME'])
+        df = df.dropna(subset=['NOME']).drop_duplicates(subset=['NOME'], keep='last')
+
+        registry = pd.DataFrame(index=pd.Index(df['NOME'].to_numpy(), name='NOME'))
+        if 'CPF' in df.columns:
+            cpf = df['CPF'].astype(object).where(df['CPF'].notna())
+            cpf = cpf.where(cpf.isna(), cpf.astype(str).str.replace(r'\D', '', regex=True))
+            registry['CPF'] = cpf.where(cpf != '').to_numpy()
+        else:
+            registry['CPF'] = None
+        registry['EQUIPE_CADASTRO'] = df['EQUIPE'].to_numpy() if 'EQUIPE' in df.columns else None
+        return registry
+
+    def build(self, reports: Dict[str, pd.DataFrame], colaboradores: Optional[pd.DataFrame] = None,
+              start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        Monta a linha do tempo diária
+
+        Args:
+            reports: Tipo de relatório (chaves de TIMELINE_REPORTS) -> frame com todos os períodos
+            colaboradores: Cadastro de Colaboradores (CPF e equipe)
+            start, end: Limita os dias (inclusive)
+
+        Returns:
+            DataFrame com DATA, CPF, NOME, EQUIPE_CADASTRO e as colunas dos relatórios,
+            ordenado por NOME e DATA
+        """
+        cleaned = {}
+        for report_type, suffix in TIMELINE_REPORTS.items():
+            df = reports.get(report_type)
+            if df is None or df.empty:
+                continue
+            df = self._clean(df, suffix)
+            if df is None:
+                logger.warning(f"Relatório {report_type} sem colunas NOME e DATA, fora da linha do tempo")
+                continue
+            if start is not None:
+                df = df[df['DATA'] >= start]
+            if end is not None:
+                df = df[df['DATA'] <= end]
+            cleaned[report_type] = df
+
+        if not cleaned:
+            return pd.DataFrame(columns=['DATA', 'CPF', 'NOME', 'EQUIPE_CADASTRO'])
+
+        # Códigos dos nomes em ordem alfabética: ordenar pela chave = ordenar por NOME e DATA
+        names = pd.Index(sorted(set().union(*(df['NOME'].unique() for df in cleaned.values()))))
+
+        joined = None
+        for report_type, df in cleaned.items():
+            prepared = self.prepare(df, names, TIMELINE_REPORTS[report_type])
+            logger.info(f"Linha do tempo: {report_type} com {len(prepared)} dias de colaboradores")
+            joined = prepared if joined is None else joined.join(prepared, how='outer', sort=True)
+
+        keys = joined.index.to_numpy()
+        timeline = joined.reset_index(drop=True)
+        timeline.insert(0, 'NOME', names.to_numpy()[keys // DAY_SLOTS])
+        timeline.insert(0, 'DATA', (EPOCH + (keys % DAY_SLOTS).astype('timedelta64[D]')).astype('datetime64[ns]'))
+
+        registry = self._registry_maps(colaboradores)
+        timeline['CPF'] = timeline['NOME'].map(registry['CPF'])
+        timeline['EQUIPE_CADASTRO'] = timeline['NOME'].map(registry['EQUIPE_CADASTRO'])
+
+        cols = ['DATA', 'CPF', 'NOME', 'EQUIPE_CADASTRO']
+        return timeline[cols + [c for c in timeline.columns if c not in cols]]
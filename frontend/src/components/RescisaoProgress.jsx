@@ -18,7 +18,7 @@ const RescisaoProgress = ({ isProcessing }) => {
       const interval = setInterval(async () => {
         try {
           const response = await axios.get(`${API_URL}/api/queue/status`)
-          const task = response.data.current_task
+          const task = (response.data.current_tasks || []).find(t => t.type === 'rescisao')
           
           if (task && task.type === 'rescisao') {
             setCurrentTask(task)
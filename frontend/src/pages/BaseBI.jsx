@@ -12,6 +12,7 @@ const BaseBI = () => {
   const [progress, setProgress] = useState(0)
   const [progressMessage, setProgressMessage] = useState('')
   const [lastMergeResult, setLastMergeResult] = useState(null)
+  const [exportFormat, setExportFormat] = useState('csv')
 
   useEffect(() => {
     loadFiles()
@@ -49,6 +50,14 @@ const BaseBI = () => {
     }
   }
 
+  const finishMerge = () => {
+    setTimeout(() => {
+      setProcessing(false)
+      setProgress(0)
+      setProgressMessage('')
+    }, 2000)
+  }
+
   const handleMerge = async () => {
     if (selectedFiles.length === 0) {
       toast.warning('Selecione pelo menos um arquivo para mesclar')
@@ -63,38 +72,56 @@ const BaseBI = () => {
       // Filtra apenas os arquivos selecionados
       const selectedFileObjects = files.filter(f => selectedFiles.includes(f.relative_path))
       
-      // Simula progresso enquanto processa
-      const progressInterval = setInterval(() => {
-        setProgress(prev => {
-          if (prev >= 95) return prev
-          return prev + 5
-        })
-      }, 500)
-      
+      // A mesclagem roda na fila; a API retorna o ID da tarefa imediatamente
       const response = await axios.post(`${API_URL}/api/bi/merge`, {
-        selected_files: selectedFileObjects
+        selected_files: selectedFileObjects,
+        export_format: exportFormat
       })
-      
-      clearInterval(progressInterval)
-      setProgress(100)
-      setProgressMessage('Consolidação concluída!')
+      const taskId = response.data.task_id
 
-      if (response.data.success) {
-        setLastMergeResult(response.data)
-        toast.success(response.data.message)
-      } else {
-        toast.warning(response.data.message)
+      if (!response.data.processing_immediately) {
+        toast.info(response.data.message, { autoClose: 5000 })
       }
+
+      // Acompanha o progresso da tarefa
+      const pollInterval = setInterval(async () => {
+        try {
+          const statusResponse = await axios.get(`${API_URL}/api/queue/task/${taskId}`)
+          const task = statusResponse.data
+
+          setProgress(task.progress || 0)
+          setProgressMessage(task.message || '')
+
+          if (task.status === 'completed') {
+            clearInterval(pollInterval)
+            setProgress(100)
+            setProgressMessage('Consolidação concluída!')
+
+            if (task.result?.success) {
+              setLastMergeResult(task.result)
+              toast.success(task.result.message)
+            } else {
+              toast.warning(task.result?.message || 'Nenhum dado encontrado para consolidar')
+            }
+            finishMerge()
+          } else if (task.status === 'error') {
+            clearInterval(pollInterval)
+            setProgress(0)
+            setProgressMessage('')
+            toast.error('Erro ao mesclar dados: ' + task.error)
+            finishMerge()
+          }
+        } catch (error) {
+          clearInterval(pollInterval)
+          toast.error('Erro ao acompanhar mesclagem: ' + error.message)
+          finishMerge()
+        }
+      }, 1000)
     } catch (error) {
       setProgress(0)
       setProgressMessage('')
       toast.error('Erro ao mesclar dados: ' + error.message)
-    } finally {
-      setTimeout(() => {
-        setProcessing(false)
-        setProgress(0)
-        setProgressMessage('')
-      }, 2000)
+      finishMerge()
     }
   }
 
@@ -157,7 +184,7 @@ const BaseBI = () => {
           <li>• Selecione os arquivos CSV que deseja consolidar</li>
           <li>• O sistema usa o <strong>CPF</strong> como chave primária para mesclar os dados</li>
           <li>• Quando o CPF não existe, usa <strong>Nome + Equipe</strong> como chave alternativa</li>
-          <li>• Todos os dados são consolidados em um único arquivo CSV</li>
+          <li>• Todos os dados são consolidados em um único arquivo (CSV, CSV comprimido ou Parquet)</li>
         </ul>
       </div>
 
@@ -246,23 +273,37 @@ const BaseBI = () => {
               Clique para mesclar os arquivos selecionados
             </p>
           </div>
-          <button
-            onClick={handleMerge}
-            disabled={processing || selectedFiles.length === 0}
-            className="flex items-center px-6 py-3 bg-primary-600 text-white rounded-lg hover:bg-primary-700 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
-          >
-            {processing ? (
-              <>
-                <FiRefreshCw className="mr-2 animate-spin" size={18} />
-                Processando...
-              </>
-            ) : (
-              <>
-                <FiDatabase className="mr-2" size={18} />
-                Consolidar Dados
-              </>
-            )}
-          </button>
+          <div className="flex items-center space-x-3">
+            <select
+              value={exportFormat}
+              onChange={(e) => setExportFormat(e.target.value)}
+              disabled={processing}
+              className="px-3 py-3 border border-gray-300 rounded-lg text-sm text-gray-700 focus:ring-2 focus:ring-primary-500 focus:border-primary-500"
+              title="Formato do arquivo consolidado"
+            >
+              <option value="csv">CSV</option>
+              <option value="csv.gz">CSV (gzip)</option>
+              <option value="csv.zst">CSV (zstd)</option>
+              <option value="parquet">Parquet</option>
+            </select>
+            <button
+              onClick={handleMerge}
+              disabled={processing || selectedFiles.length === 0}
+              className="flex items-center px-6 py-3 bg-primary-600 text-white rounded-lg hover:bg-primary-700 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              {processing ? (
+                <>
+                  <FiRefreshCw className="mr-2 animate-spin" size={18} />
+                  Processando...
+                </>
+              ) : (
+                <>
+                  <FiDatabase className="mr-2" size={18} />
+                  Consolidar Dados
+                </>
+              )}
+            </button>
+          </div>
         </div>
         
         {/* Barra de Progresso */}
@@ -46,6 +46,7 @@ const Dashboard = () => {
       case 'report': return 'Relatório'
       case 'rescisao': return 'Rescisão'
       case 'db_query': return 'Consulta BD'
+      case 'bi_merge': return 'Base BI'
       default: return type
     }
   }
@@ -84,27 +85,31 @@ const Dashboard = () => {
                 <FiClock className="mr-2" size={18} />
                 <span className="font-medium">Processando</span>
               </div>
-              {queueStatus.current_task ? (
-                <div>
-                  <p className="text-sm opacity-90">
-                    {queueStatus.current_task.type === 'db_query'
-                      ? 'Colaboradores Trainee'
-                      : queueStatus.current_task.data?.report_name || getTaskTypeLabel(queueStatus.current_task.type)
-                    }
-                  </p>
-                  {queueStatus.current_task.progress !== undefined && (
-                    <div className="mt-2">
-                      <div className="w-full bg-white/20 rounded-full h-2">
-                        <div 
-                          className="bg-white h-2 rounded-full transition-all"
-                          style={{ width: `${queueStatus.current_task.progress}%` }}
-                        />
-                      </div>
-                      <p className="text-xs mt-1 opacity-75">
-                        {queueStatus.current_task.progress}%
+              {queueStatus.current_tasks?.length > 0 ? (
+                <div className="space-y-3">
+                  {queueStatus.current_tasks.map(task => (
+                    <div key={task.id}>
+                      <p className="text-sm opacity-90">
+                        {task.type === 'db_query'
+                          ? 'Colaboradores Trainee'
+                          : task.data?.report_name || getTaskTypeLabel(task.type)
+                        }
                       </p>
+                      {task.progress !== undefined && (
+                        <div className="mt-2">
+                          <div className="w-full bg-white/20 rounded-full h-2">
+                            <div 
+                              className="bg-white h-2 rounded-full transition-all"
+                              style={{ width: `${task.progress}%` }}
+                            />
+                          </div>
+                          <p className="text-xs mt-1 opacity-75">
+                            {task.progress}%
+                          </p>
+                        </div>
+                      )}
                     </div>
-                  )}
+                  ))}
                 </div>
               ) : (
                 <p className="text-sm opacity-75">Nenhuma tarefa</p>
@@ -6,7 +6,7 @@ import { API_URL } from '../config'
 import ScheduleModal from '../components/ScheduleModal'
 
 const Queue = () => {
-  const [currentTask, setCurrentTask] = useState(null)
+  const [currentTasks, setCurrentTasks] = useState([])
   const [queueItems, setQueueItems] = useState([])
   const [allTasks, setAllTasks] = useState([])
   const [loading, setLoading] = useState(false)
@@ -50,11 +50,11 @@ const Queue = () => {
       const response = await axios.get(`${API_URL}/api/queue/all`)
       setAllTasks(response.data.tasks || [])
       
-      // Separa tarefa atual e fila
-      const current = response.data.tasks.find(t => t.status === 'processing')
+      // Separa tarefas em execução e fila
+      const current = response.data.tasks.filter(t => t.status === 'processing')
       const pending = response.data.tasks.filter(t => t.status === 'pending')
       
-      setCurrentTask(current)
+      setCurrentTasks(current)
       setQueueItems(pending)
     } catch (error) {
       console.error('Erro ao carregar fila:', error)
@@ -135,6 +135,8 @@ const Queue = () => {
         return 'Consulta BD'
       case 'queue_batch':
         return 'Lote'
+      case 'bi_merge':
+        return 'Base BI'
       default:
         return type
     }
@@ -233,30 +235,34 @@ const Queue = () => {
         </div>
       </div>
 
-      {/* Tarefa Atual */}
-      {currentTask && (
+      {/* Tarefas em Execução */}
+      {currentTasks.length > 0 && (
         <div className="bg-white rounded-lg shadow-sm border-2 border-blue-500 p-6">
           <h3 className="text-lg font-semibold text-gray-900 mb-4 flex items-center">
             <FiLoader className="animate-spin mr-2 text-blue-600" size={20} />
             Processando Agora
           </h3>
-          <div className="space-y-3">
-            <div className="flex items-center justify-between">
-              <span className="text-sm font-medium text-gray-700">
-                {currentTask.type === 'db_query' 
-                  ? (currentTask.result?.query_type || 'Colaboradores Trainee')
-                  : `${getTaskTypeName(currentTask.type)}${currentTask.data?.report_name ? `: ${currentTask.data.report_name}` : ''}`
-                }
-              </span>
-              <span className="text-sm text-gray-600">{currentTask.progress}%</span>
-            </div>
-            <div className="w-full bg-gray-200 rounded-full h-3">
-              <div
-                className="bg-blue-600 h-3 rounded-full transition-all duration-300"
-                style={{ width: `${currentTask.progress}%` }}
-              />
-            </div>
-            <p className="text-sm text-gray-600">{currentTask.message}</p>
+          <div className="space-y-5">
+            {currentTasks.map(task => (
+              <div key={task.id} className="space-y-3">
+                <div className="flex items-center justify-between">
+                  <span className="text-sm font-medium text-gray-700">
+                    {task.type === 'db_query' 
+                      ? (task.result?.query_type || 'Colaboradores Trainee')
+                      : `${getTaskTypeName(task.type)}${task.data?.report_name ? `: ${task.data.report_name}` : ''}`
+                    }
+                  </span>
+                  <span className="text-sm text-gray-600">{task.progress}%</span>
+                </div>
+                <div className="w-full bg-gray-200 rounded-full h-3">
+                  <div
+                    className="bg-blue-600 h-3 rounded-full transition-all duration-300"
+                    style={{ width: `${task.progress}%` }}
+                  />
+                </div>
+                <p className="text-sm text-gray-600">{task.message}</p>
+              </div>
+            ))}
           </div>
         </div>
       )}
@@ -112,10 +112,10 @@ const Rescisao = () => {
         try {
           // Verifica se a tarefa ainda está ativa
           const response = await axios.get(`${API_URL}/api/queue/status`)
-          const currentTask = response.data.current_task
+          const currentTask = (response.data.current_tasks || []).find(t => t.id === taskId)
           
-          // Verifica se a tarefa atual é de rescisão
-          if (currentTask && currentTask.type === 'rescisao' && currentTask.id === taskId) {
+          // Verifica se a tarefa de rescisão está entre as em execução
+          if (currentTask && currentTask.type === 'rescisao') {
             setProcessing(true)
             setCurrentTaskId(taskId)
             